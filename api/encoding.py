@@ -0,0 +1,129 @@
+"""Columnar encodings of window lists, negotiated through the Accept header.
+
+Instead of one JSON object per window, the windows go out as two arrays of
+epoch milliseconds (UTC), ``start_ms`` and ``end_ms``. Responses holding
+several window lists add ``offsets``, delimiting list i as
+``offsets[i]:offsets[i + 1]``. The JSON form uses orjson when it is
+installed, and MessagePack is offered when msgpack is.
+"""
+
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd  # type:ignore
+
+try:
+    import orjson  # type:ignore
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack  # type:ignore
+except ImportError:
+    msgpack = None
+
+COLUMNAR_JSON = "application/vnd.cassia.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.cassia.columnar+msgpack"
+# Also accepted for MessagePack, with the columnar layout.
+MSGPACK_ALIASES = ("application/msgpack", "application/x-msgpack")
+
+Windows = Sequence[Tuple[pd.Timestamp, pd.Timestamp]]
+
+
+def available_media_types() -> List[str]:
+    media_types = [COLUMNAR_JSON]
+    if msgpack is not None:
+        media_types.append(COLUMNAR_MSGPACK)
+    return media_types
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    # The columnar media type to answer with, or None for the default JSON:
+    # when nothing columnar is asked for, or it is ranked below JSON.
+    if not accept:
+        return None
+
+    ranked: Dict[str, float] = {}
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.lower()
+        if media_type in MSGPACK_ALIASES:
+            media_type = COLUMNAR_MSGPACK
+        ranked[media_type] = max(quality, ranked.get(media_type, 0.0))
+
+    default = max(
+        ranked.get("application/json", 0.0),
+        ranked.get("application/*", 0.0),
+        ranked.get("*/*", 0.0),
+    )
+    best, best_quality = None, default
+    for media_type in available_media_types():
+        quality = ranked.get(media_type, 0.0)
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
+
+
+def window_columns(windows: Windows) -> Tuple[np.ndarray, np.ndarray]:
+    # Starts and ends in epoch milliseconds, without building DatetimeIndexes.
+    count = len(windows)
+    starts = np.fromiter((start.value for start, _ in windows), np.int64, count)
+    ends = np.fromiter((end.value for _, end in windows), np.int64, count)
+    return starts // 1_000_000, ends // 1_000_000
+
+
+def columnar(windows: Windows, **fields) -> dict:
+    starts, ends = window_columns(windows)
+    return {"start_ms": starts, "end_ms": ends, **fields}
+
+
+def columnar_groups(groups: Sequence[Windows], **fields) -> dict:
+    payload = columnar([window for windows in groups for window in windows], **fields)
+    payload["offsets"] = np.concatenate(
+        ([0], np.cumsum([len(windows) for windows in groups]))
+    ).astype(np.int64)
+    return payload
+
+
+def columnar_fleet(fleet_windows, **fields) -> dict:
+    # A FleetTidalWindows, grouped by draught, straight from its indexes.
+    order = np.argsort(fleet_windows.vessel_index, kind="stable")
+    counts = np.bincount(
+        fleet_windows.vessel_index, minlength=len(fleet_windows.draughts)
+    )
+    return {
+        "start_ms": _milliseconds(fleet_windows.start)[order],
+        "end_ms": _milliseconds(fleet_windows.end)[order],
+        "offsets": np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        **fields,
+    }
+
+
+def encode(media_type: str, payload: dict) -> bytes:
+    if media_type == COLUMNAR_MSGPACK:
+        return msgpack.packb(_to_lists(payload))
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_to_lists(payload), separators=(",", ":")).encode()
+
+
+def _to_lists(payload: dict) -> dict:
+    return {
+        key: value.tolist() if isinstance(value, np.ndarray) else value
+        for key, value in payload.items()
+    }
+
+
+def _milliseconds(index: pd.DatetimeIndex) -> np.ndarray:
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.as_unit("ns").asi8 // 1_000_000
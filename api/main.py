@@ -1,13 +1,301 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import contextvars
+import cProfile
+import io
+import multiprocessing
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import Path
+
+import pandas as pd  # type:ignore
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field, condecimal
 from datetime import datetime
-from typing import List
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Union
+from api.encoding import (
+    columnar,
+    columnar_fleet,
+    columnar_groups,
+    encode,
+    negotiate,
+)
+from cassia.cache import WindowCache
 from cassia.cassia import Cassia
+from cassia.metrics import metrics, server_timing
+from cassia.planner import PortCall
+from cassia.restrictions import load_restrictions
+from cassia.subscriptions import Subscriptions, Update, Watch
+
+# Initialize the Cassia class, caching results of repeated queries.
+# CASSIA_CACHE_SIZE=0 disables the cache; CASSIA_CACHE_TTL is in seconds.
+CACHE_SIZE = int(os.environ.get("CASSIA_CACHE_SIZE", "4096"))
+CACHE_TTL = float(os.environ.get("CASSIA_CACHE_TTL", "0")) or None
+
+# CASSIA_DATA_PATH points at a directory compiled with
+# ``python -m cassia.storage``; without it the CSVs in assets/ are read.
+DATA_PATH = os.environ.get("CASSIA_DATA_PATH")
+# With CASSIA_SHARED_MEMORY naming data published by ``python -m cassia.shared
+# publish``, every uvicorn worker attaches to the same read-only arrays.
+SHARED_MEMORY = os.environ.get("CASSIA_SHARED_MEMORY")
+# CASSIA_PRECOMPUTED_PATH is a file written by ``python -m cassia.precompute``;
+# queries it covers are answered from it.
+PRECOMPUTED_PATH = os.environ.get("CASSIA_PRECOMPUTED_PATH")
+# CASSIA_RESTRICTIONS_PATH is a JSON file of restriction layers per port, as
+# read by cassia.restrictions.load_restrictions.
+RESTRICTIONS_PATH = os.environ.get("CASSIA_RESTRICTIONS_PATH")
+
+# Spacing of the depth curve, and the longest horizon a request may ask for.
+RESOLUTION_MINUTES = int(os.environ.get("CASSIA_RESOLUTION_MINUTES", "1"))
+MAX_HORIZON_DAYS = int(os.environ.get("CASSIA_MAX_HORIZON_DAYS", "90"))
+# Most arrival times one sweep request may ask for.
+MAX_SWEEP_ARRIVALS = int(os.environ.get("CASSIA_MAX_SWEEP_ARRIVALS", "1000"))
+# Most candidate departures one voyage plan request may ask for.
+MAX_PLAN_DEPARTURES = int(os.environ.get("CASSIA_MAX_PLAN_DEPARTURES", "10000"))
+cache = WindowCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL) if CACHE_SIZE else None
+
+# Data is loaded by the startup hook below (and in each process worker),
+# not at import.
+cassia = Cassia(
+    data_path=DATA_PATH,
+    shared_memory=SHARED_MEMORY,
+    precomputed=PRECOMPUTED_PATH,
+    restrictions=load_restrictions(RESTRICTIONS_PATH) if RESTRICTIONS_PATH else None,
+    cache=cache,
+    resolution=pd.Timedelta(minutes=RESOLUTION_MINUTES),
+)
+
+# Rendered plots are cached separately; CASSIA_IMAGE_CACHE_SIZE=0 disables
+# it. Batch plots are rendered on a process pool of CASSIA_RENDER_WORKERS.
+IMAGE_CACHE_SIZE = int(os.environ.get("CASSIA_IMAGE_CACHE_SIZE", "256"))
+image_cache = WindowCache(maxsize=IMAGE_CACHE_SIZE) if IMAGE_CACHE_SIZE else None
+RENDER_WORKERS = int(os.environ.get("CASSIA_RENDER_WORKERS", "0")) or None
+IMAGE_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Admin endpoints require this token in the X-Admin-Token header when set.
+ADMIN_TOKEN = os.environ.get("CASSIA_ADMIN_TOKEN")
+
+# Opt-in profiling: requests sent with "X-Cassia-Profile: 1" (and the admin
+# token, when set), plus a CASSIA_PROFILE_SAMPLE_RATE fraction of all
+# requests, run their pool work under cProfile. Profiles are written to
+# CASSIA_PROFILE_DIR and served under /debug/profiles; beyond
+# CASSIA_PROFILE_MAX_FILES, the oldest are deleted.
+PROFILE_SAMPLE_RATE = float(os.environ.get("CASSIA_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = Path(
+    os.environ.get("CASSIA_PROFILE_DIR")
+    or Path(tempfile.gettempdir()) / "cassia-profiles"
+)
+PROFILE_MAX_FILES = int(os.environ.get("CASSIA_PROFILE_MAX_FILES", "200"))
+profile_path: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "cassia_profile_path", default=None
+)
+
+# Window computations run in a pool so they never block the event loop.
+# CASSIA_EXECUTOR picks "thread" (default) or "process"; each process
+# worker builds its own Cassia when it imports this module.
+EXECUTOR_KIND = os.environ.get("CASSIA_EXECUTOR", "thread")
+MAX_WORKERS = int(os.environ.get("CASSIA_MAX_WORKERS", "0")) or None
+
+# Per-stage latency histograms and request counts, served at /metrics and
+# summarised per request in the Server-Timing header. CASSIA_METRICS=0
+# turns the instrumentation off.
+METRICS_ENABLED = os.environ.get("CASSIA_METRICS", "1") != "0"
+metrics.enabled = METRICS_ENABLED
+
+# Responses of at least CASSIA_GZIP_MINIMUM_SIZE bytes are gzipped for clients
+# accepting it; 0 turns compression off. Batches, streams and images are sent
+# as is, so NDJSON lines are not held back in the compressor.
+GZIP_MINIMUM_SIZE = int(os.environ.get("CASSIA_GZIP_MINIMUM_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("CASSIA_GZIP_LEVEL", "5"))
+UNCOMPRESSED_PATHS = (
+    "/tidal-windows/batch",
+    "/combined-windows/batch",
+    "/tidal-windows/stream",
+    "/plot",
+    "/subscriptions/events",
+)
+
+# Window subscriptions are pushed their diffs over server-sent events when
+# the tide data or restrictions change. Subscriptions with no stream open for
+# CASSIA_SUBSCRIPTION_IDLE_SECONDS are dropped; idle streams get a comment
+# every CASSIA_SSE_KEEPALIVE_SECONDS so proxies keep them open.
+MAX_SUBSCRIPTIONS = int(os.environ.get("CASSIA_MAX_SUBSCRIPTIONS", "10000"))
+SUBSCRIPTION_IDLE_SECONDS = float(
+    os.environ.get("CASSIA_SUBSCRIPTION_IDLE_SECONDS", "3600")
+)
+SSE_KEEPALIVE_SECONDS = float(os.environ.get("CASSIA_SSE_KEEPALIVE_SECONDS", "15"))
+subscriptions = Subscriptions(cassia).start()
+
+executor: Optional[Executor] = None
+render_executor: Optional[Executor] = None
+
+
+def get_executor() -> Executor:
+    global executor
+    if executor is None:
+        if EXECUTOR_KIND == "process":
+            executor = ProcessPoolExecutor(
+                max_workers=MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=load_cassia,
+            )
+        elif EXECUTOR_KIND == "thread":
+            executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        else:
+            raise ValueError(
+                f"CASSIA_EXECUTOR must be 'thread' or 'process', got {EXECUTOR_KIND!r}."
+            )
+    return executor
+
+
+def get_render_executor() -> Executor:
+    global render_executor
+    if render_executor is None:
+        render_executor = ProcessPoolExecutor(
+            max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return render_executor
+
+
+def load_cassia() -> None:
+    cassia.load()
+
+
+def profiled_call(path: str, function: Callable):
+    # Runs in the pool worker, so the profile covers the Cassia call path;
+    # calls profiled within the same request are added to one file.
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Since Python 3.12 one profiler at a time can run per process.
+        return function()
+    try:
+        return function()
+    finally:
+        profiler.disable()
+        stats = pstats.Stats(profiler)
+        if os.path.exists(path):
+            stats.add(path)
+        stats.dump_stats(path)
+
+
+async def run_in_executor(function: Callable, *args):
+    loop = asyncio.get_running_loop()
+    call = partial(function, *args)
+    path = profile_path.get()
+    if path is not None:
+        call = partial(profiled_call, path, call)
+    if EXECUTOR_KIND == "thread":
+        # Run in a copy of the request's context, so the stages timed in the
+        # worker thread reach the request's Server-Timing header.
+        call = partial(contextvars.copy_context().run, call)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+async def run_in_thread(function: Callable, *args):
+    # For work on this process's own Cassia, such as tide data updates and
+    # subscriptions, whichever executor computes windows.
+    if EXECUTOR_KIND == "thread":
+        return await run_in_executor(function, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(function, *args))
 
-# Initialize the Cassia class
-cassia = Cassia()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_cassia()
+    yield
+    for pool in (executor, render_executor):
+        if pool is not None:
+            pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def record_request_metrics(request: Request, call_next):
+    with metrics.collect() as timings:
+        start = time.perf_counter()
+        response = await call_next(request)
+        metrics.observe("api.request", time.perf_counter() - start)
+
+    # Label by route template, not the raw path, to bound the series count.
+    route = request.scope.get("route")
+    metrics.increment(
+        "cassia_requests_total",
+        method=request.method,
+        path=getattr(route, "path", "unmatched"),
+        status=str(response.status_code),
+    )
+    response.headers["Server-Timing"] = server_timing(timings)
+    return response
+
+
+if METRICS_ENABLED:
+    app.middleware("http")(record_request_metrics)
+
+
+class CompressResponses:
+    def __init__(self, app, minimum_size: int, compresslevel: int) -> None:
+        self.app = app
+        self.gzip = GZipMiddleware(
+            app, minimum_size=minimum_size, compresslevel=compresslevel
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http" and not scope["path"].startswith(
+            UNCOMPRESSED_PATHS
+        ):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+if GZIP_MINIMUM_SIZE:
+    app.add_middleware(
+        CompressResponses, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_LEVEL
+    )
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    requested = request.headers.get("X-Cassia-Profile") == "1" and (
+        ADMIN_TOKEN is None or request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+    )
+    if not requested and random.random() >= PROFILE_SAMPLE_RATE:
+        return await call_next(request)
+
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = PROFILE_DIR / f"{profile_id}.pstats"
+    token = profile_path.set(str(path))
+    try:
+        response = await call_next(request)
+    finally:
+        profile_path.reset(token)
+
+    if path.exists():
+        response.headers["X-Profile-Id"] = profile_id
+        prune_profiles()
+    return response
+
+
+def prune_profiles() -> None:
+    # Profile ids start with their time, so the oldest sort first.
+    paths = sorted(PROFILE_DIR.glob("*.pstats"))
+    for path in paths[: max(len(paths) - PROFILE_MAX_FILES, 0)]:
+        path.unlink(missing_ok=True)
 
 
 class VesselInfo(BaseModel):
@@ -21,6 +309,7 @@ class TidalWindowInput(BaseModel):
     port_id: str  # Assuming this is the UNLOCODE
     vessel_information: VesselInfo  # We expect one vessel per request here
     arrival_datetime: datetime
+    horizon_days: int = Field(default=14, ge=1, le=MAX_HORIZON_DAYS)
 
 
 class TidalWindowOutput(BaseModel):
@@ -33,47 +322,795 @@ class TidalWindowResponse(BaseModel):
     message: str = Field(default="Tidal window forecast generated successfully.")
 
 
+class SubscriptionInput(TidalWindowInput):
+    kind: Literal["tidal-windows", "combined-windows"] = "combined-windows"
+
+
+class SubscriptionWindows(BaseModel):
+    id: str
+    tidal_windows: List[TidalWindowOutput]
+
+
+class SubscriptionDiff(BaseModel):
+    id: str
+    version: str  # Of the tide data the windows were computed from
+    added: List[TidalWindowOutput]
+    removed: List[TidalWindowOutput]
+
+
+class SubscriptionClosed(BaseModel):
+    id: str
+
+
+class TidalWindowBatchResult(TidalWindowResponse):
+    index: int  # Position of the query in the batch request
+
+
+class BatchError(BaseModel):
+    index: int
+    detail: str
+
+
+class PlotInput(BaseModel):
+    kind: Literal["tidal-windows", "combined-windows"]
+    port_id: str
+    imo: int
+    arrival_datetime: datetime
+    horizon_days: int = Field(default=14, ge=1, le=MAX_HORIZON_DAYS)
+    format: Literal["png", "svg"] = "png"
+    draught: Optional[float] = Field(default=None, gt=0)  # Else the registry's
+
+
+class DraughtSweepInput(BaseModel):
+    port_id: str
+    draughts: List[condecimal(gt=0, decimal_places=2)] = Field(min_length=1)
+    arrival_datetime: datetime
+    horizon_days: int = Field(default=14, ge=1, le=MAX_HORIZON_DAYS)
+
+
+class DraughtWindows(BaseModel):
+    draught: float
+    tidal_windows: List[TidalWindowOutput]
+
+
+class DraughtSweepResponse(BaseModel):
+    results: List[DraughtWindows]
+
+
+class ArrivalSweepInput(BaseModel):
+    port_id: str
+    vessel_information: VesselInfo
+    arrival_datetimes: List[datetime] = Field(
+        min_length=1, max_length=MAX_SWEEP_ARRIVALS
+    )
+    horizon_days: int = Field(default=14, ge=1, le=MAX_HORIZON_DAYS)
+
+
+class ArrivalWindows(BaseModel):
+    arrival_datetime: datetime
+    tidal_windows: List[TidalWindowOutput]
+
+
+class ArrivalSweepResponse(BaseModel):
+    results: List[ArrivalWindows]
+
+
+class PortCallInput(BaseModel):
+    port_id: str
+    transit_hours: float = Field(ge=0)  # From the previous call, or the departure
+    draught: Optional[condecimal(gt=0, decimal_places=2)] = None  # On arrival
+    stay_hours: float = Field(default=0, ge=0)
+
+
+class VoyagePlanInput(BaseModel):
+    vessel_information: VesselInfo  # Its draught applies until a call changes it
+    calls: List[PortCallInput] = Field(min_length=1)
+    departure_datetimes: List[datetime] = Field(
+        min_length=1, max_length=MAX_PLAN_DEPARTURES
+    )
+    max_wait_hours: float = Field(default=0, ge=0)
+
+
+class VoyageSchedule(BaseModel):
+    departure_datetime: datetime
+    arrival_datetimes: List[datetime]
+    completion_datetime: datetime
+
+
+class VoyagePlanResponse(BaseModel):
+    schedules: List[VoyageSchedule]  # The feasible ones, in departure order
+    earliest: Optional[VoyageSchedule] = None
+
+
+class MaxDraughtResponse(BaseModel):
+    port_id: str
+    start_datetime: datetime
+    end_datetime: datetime
+    max_draught: float
+
+
+class TideRow(BaseModel):
+    port_name: str
+    tide_datetime: datetime
+    tide_height_mt: float
+
+
+class TideDataUpdate(BaseModel):
+    mode: Literal["append", "replace"] = "append"
+    rows: List[TideRow]
+
+
+class TideDataVersion(BaseModel):
+    version: str
+    serial: int
+    ports: List[str] = Field(default_factory=list)  # Ports rebuilt by the update
+
+
+def compute_tidal_windows(imo, unlocode, arrival_time, days, draught=None):
+    return cassia.get_tidal_windows(
+        imo, unlocode, arrival_time, days, draught=draught
+    ).tidal_windows
+
+
+def compute_combined_windows(imo, unlocode, arrival_time, days, draught=None):
+    return cassia.get_combined_windows(
+        imo, unlocode, arrival_time, days, draught=draught
+    ).combined_windows
+
+
 @app.post("/tidal-windows/", response_model=TidalWindowResponse)
-async def get_tidal_windows(input: TidalWindowInput):
+async def get_tidal_windows(
+    input: TidalWindowInput, accept: Optional[str] = Header(default=None)
+):
     try:
         # Use the calculate_tidal_windows method from the cassia instance
         imo = input.vessel_information.imo
         unlocode = input.port_id
         arrival_time = input.arrival_datetime
+        # The draught sent with the request is used as is; the vessel need
+        # not be in the registry.
+        draught = float(input.vessel_information.draught)
 
-        tidal_windows = cassia.get_tidal_windows(imo, unlocode, arrival_time)
+        with metrics.stage("api.compute"):
+            tidal_windows = await run_in_executor(
+                compute_tidal_windows,
+                imo,
+                unlocode,
+                arrival_time,
+                input.horizon_days,
+                draught,
+            )
 
         # Create the response list
-        response_list = []
-        for start_time, end_time in tidal_windows:
-            response_list.append(
-                TidalWindowOutput(start_time=start_time, end_time=end_time)
-            )
+        with metrics.stage("api.serialize"):
+            media_type = negotiate(accept)
+            if media_type is not None:
+                return Response(
+                    encode(media_type, columnar(tidal_windows)), media_type=media_type
+                )
+
+            response_list = []
+            for start_time, end_time in tidal_windows:
+                response_list.append(
+                    TidalWindowOutput(start_time=start_time, end_time=end_time)
+                )
 
-        response = TidalWindowResponse(tidal_windows=response_list)
+            response = TidalWindowResponse(tidal_windows=response_list)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/combined-windows/", response_model=TidalWindowResponse)
-async def get_combined_windows(input: TidalWindowInput):
+async def get_combined_windows(
+    input: TidalWindowInput, accept: Optional[str] = Header(default=None)
+):
     try:
         # Use the get_combined_windows method from the cassia instance
         imo = input.vessel_information.imo
         unlocode = input.port_id
         arrival_time = input.arrival_datetime
+        # The draught sent with the request is used as is; the vessel need
+        # not be in the registry.
+        draught = float(input.vessel_information.draught)
 
-        combined_windows = cassia.get_combined_windows(imo, unlocode, arrival_time)
+        with metrics.stage("api.compute"):
+            combined_windows = await run_in_executor(
+                compute_combined_windows,
+                imo,
+                unlocode,
+                arrival_time,
+                input.horizon_days,
+                draught,
+            )
 
         # Create the response list
-        response_list = []
-        for start_time, end_time in combined_windows:
-            response_list.append(
-                TidalWindowOutput(start_time=start_time, end_time=end_time)
-            )
+        with metrics.stage("api.serialize"):
+            media_type = negotiate(accept)
+            if media_type is not None:
+                return Response(
+                    encode(media_type, columnar(combined_windows)), media_type=media_type
+                )
 
-        response = TidalWindowResponse(tidal_windows=response_list)
+            response_list = []
+            for start_time, end_time in combined_windows:
+                response_list.append(
+                    TidalWindowOutput(start_time=start_time, end_time=end_time)
+                )
+
+            response = TidalWindowResponse(tidal_windows=response_list)
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def stream_batch(
+    queries: List[TidalWindowInput], compute_many: Callable
+) -> Iterator[str]:
+    # Queries sharing a port, arrival time and horizon are answered together,
+    # so the tide and daylight work is done once per group. One NDJSON line
+    # is yielded per query as soon as its group is done.
+    # Not sorted: naive and aware arrival times do not compare. The UTC offset
+    # is in the key, since the windows are returned in it.
+    groups: Dict[tuple, List[int]] = {}
+    for index, query in enumerate(queries):
+        arrival_time = query.arrival_datetime
+        offset = arrival_time.utcoffset()
+        key = (query.port_id, arrival_time, offset, query.horizon_days)
+        groups.setdefault(key, []).append(index)
+
+    for (unlocode, arrival_time, _, days), indices in groups.items():
+        draughts = [
+            float(queries[index].vessel_information.draught) for index in indices
+        ]
+        try:
+            windows_per_query = compute_many(draughts, unlocode, arrival_time, days)
+        except Exception as e:
+            for index in indices:
+                yield batch_error(index, str(e))
+            continue
+
+        for index, windows in zip(indices, windows_per_query):
+            result = TidalWindowBatchResult(
+                index=index,
+                tidal_windows=[
+                    TidalWindowOutput(start_time=start_time, end_time=end_time)
+                    for start_time, end_time in windows
+                ],
+            )
+            yield result.model_dump_json() + "\n"
+
+
+def batch_error(index: int, detail: str) -> str:
+    return BatchError(index=index, detail=detail).model_dump_json() + "\n"
+
+
+def tidal_windows_many(draughts, unlocode, arrival_time, days):
+    fleet_windows = cassia.get_tidal_windows_many(
+        draughts, unlocode, arrival_time, days
+    )
+    return [fleet_windows.windows(index) for index in range(len(draughts))]
+
+
+@app.post("/tidal-windows/batch")
+async def get_tidal_windows_batch(queries: List[TidalWindowInput]):
+    return StreamingResponse(
+        stream_batch(queries, tidal_windows_many),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/combined-windows/batch")
+async def get_combined_windows_batch(queries: List[TidalWindowInput]):
+    return StreamingResponse(
+        stream_batch(queries, cassia.get_combined_windows_many),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/tidal-windows/stream")
+async def stream_tidal_windows(input: TidalWindowInput):
+    # One NDJSON line per window, computed a day of the horizon at a time.
+    try:
+        windows = cassia.iter_tidal_windows(
+            input.vessel_information.imo,
+            input.port_id,
+            input.arrival_datetime,
+            input.horizon_days,
+            draught=float(input.vessel_information.draught),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        (
+            TidalWindowOutput(start_time=start_time, end_time=end_time).model_dump_json()
+            + "\n"
+            for start_time, end_time in windows
+        ),
+        media_type="application/x-ndjson",
+    )
+
+
+def draught_sweep(
+    sweep: DraughtSweepInput, media_type: Optional[str] = None
+) -> Union[DraughtSweepResponse, bytes]:
+    draughts = [float(draught) for draught in sweep.draughts]
+    fleet_windows = cassia.get_draught_sweep(
+        draughts, sweep.port_id, sweep.arrival_datetime, sweep.horizon_days
+    )
+    if media_type is not None:
+        return encode(media_type, columnar_fleet(fleet_windows, draughts=draughts))
+    return DraughtSweepResponse(
+        results=[
+            DraughtWindows(
+                draught=draught,
+                tidal_windows=[
+                    TidalWindowOutput(start_time=start_time, end_time=end_time)
+                    for start_time, end_time in fleet_windows.windows(index)
+                ],
+            )
+            for index, draught in enumerate(draughts)
+        ]
+    )
+
+
+@app.post("/draught-sweep", response_model=DraughtSweepResponse)
+async def get_draught_sweep(
+    sweep: DraughtSweepInput, accept: Optional[str] = Header(default=None)
+):
+    # Exact tidal windows at one port for many draughts, from its draught index.
+    media_type = negotiate(accept)
+    try:
+        response = await run_in_executor(draught_sweep, sweep, media_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if media_type is not None:
+        return Response(response, media_type=media_type)
+    return response
+
+
+def arrival_sweep(
+    sweep: ArrivalSweepInput, kind: str, media_type: Optional[str] = None
+) -> Union[ArrivalSweepResponse, bytes]:
+    args = (
+        sweep.vessel_information.imo,
+        sweep.port_id,
+        sweep.arrival_datetimes,
+        sweep.horizon_days,
+    )
+    draught = float(sweep.vessel_information.draught)
+    if kind == "tidal-windows":
+        results = cassia.get_tidal_windows_sweep(*args, draught=draught)
+        windows = [result.tidal_windows for result in results]
+    else:
+        results = cassia.get_combined_windows_sweep(*args, draught=draught)
+        windows = [result.combined_windows for result in results]
+    if media_type is not None:
+        return encode(media_type, columnar_groups(windows))
+    return ArrivalSweepResponse(
+        results=[
+            ArrivalWindows(
+                arrival_datetime=arrival_datetime,
+                tidal_windows=[
+                    TidalWindowOutput(start_time=start_time, end_time=end_time)
+                    for start_time, end_time in arrival_windows
+                ],
+            )
+            for arrival_datetime, arrival_windows in zip(
+                sweep.arrival_datetimes, windows
+            )
+        ]
+    )
+
+
+@app.post("/tidal-windows/sweep", response_model=ArrivalSweepResponse)
+async def get_tidal_windows_sweep(
+    sweep: ArrivalSweepInput, accept: Optional[str] = Header(default=None)
+):
+    # Windows for one vessel and port at many arrival times, from one depth curve.
+    return await serve_arrival_sweep(sweep, "tidal-windows", negotiate(accept))
+
+
+@app.post("/combined-windows/sweep", response_model=ArrivalSweepResponse)
+async def get_combined_windows_sweep(
+    sweep: ArrivalSweepInput, accept: Optional[str] = Header(default=None)
+):
+    return await serve_arrival_sweep(sweep, "combined-windows", negotiate(accept))
+
+
+async def serve_arrival_sweep(
+    sweep: ArrivalSweepInput, kind: str, media_type: Optional[str]
+):
+    try:
+        response = await run_in_executor(arrival_sweep, sweep, kind, media_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if media_type is not None:
+        return Response(response, media_type=media_type)
+    return response
+
+
+def voyage_plan(plan_input: VoyagePlanInput) -> VoyagePlanResponse:
+    calls = [
+        PortCall(
+            unlocode=call.port_id,
+            transit=pd.Timedelta(hours=call.transit_hours),
+            draught=None if call.draught is None else float(call.draught),
+            stay=pd.Timedelta(hours=call.stay_hours),
+        )
+        for call in plan_input.calls
+    ]
+    plan = cassia.plan_rotation(
+        plan_input.vessel_information.imo,
+        calls,
+        plan_input.departure_datetimes,
+        pd.Timedelta(hours=plan_input.max_wait_hours),
+        draught=float(plan_input.vessel_information.draught),
+    )
+
+    def to_output(departure, arrivals, completion) -> VoyageSchedule:
+        return VoyageSchedule(
+            departure_datetime=departure,
+            arrival_datetimes=arrivals,
+            completion_datetime=completion,
+        )
+
+    earliest = plan.earliest
+    return VoyagePlanResponse(
+        schedules=[to_output(*schedule) for schedule in plan.schedules()],
+        earliest=None if earliest is None else to_output(*plan.schedule(earliest)),
+    )
+
+
+@app.post("/voyage-plan", response_model=VoyagePlanResponse)
+async def get_voyage_plan(plan_input: VoyagePlanInput):
+    # Feasible schedules of a multi-port rotation for many candidate departures.
+    try:
+        return await run_in_executor(voyage_plan, plan_input)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def max_draught(unlocode, start_datetime, end_datetime) -> float:
+    return cassia.max_allowable_draught(unlocode, start_datetime, end_datetime)
+
+
+def first_window(unlocode, after, min_duration, draught):
+    return cassia.first_tidal_window(None, unlocode, after, min_duration, draught)
+
+
+@app.get("/max-draught", response_model=MaxDraughtResponse)
+async def get_max_draught(
+    port_id: str, start_datetime: datetime, end_datetime: datetime
+):
+    if end_datetime <= start_datetime:
+        raise HTTPException(
+            status_code=422, detail="end_datetime must be after start_datetime."
+        )
+    try:
+        draught = await run_in_executor(max_draught, port_id, start_datetime, end_datetime)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return MaxDraughtResponse(
+        port_id=port_id,
+        start_datetime=start_datetime,
+        end_datetime=end_datetime,
+        max_draught=draught,
+    )
+
+
+@app.get("/first-window", response_model=TidalWindowOutput)
+async def get_first_window(
+    port_id: str,
+    draught: float = Query(gt=0),
+    after: datetime = Query(),
+    min_minutes: float = Query(default=0, ge=0),
+):
+    try:
+        window = await run_in_executor(
+            first_window, port_id, after, pd.Timedelta(minutes=min_minutes), draught
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if window is None:
+        raise HTTPException(
+            status_code=404, detail="No such window before the tide data ends."
+        )
+    return TidalWindowOutput(start_time=window[0], end_time=window[1])
+
+
+def check_token(token: Optional[str]) -> None:
+    if ADMIN_TOKEN is not None and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+
+def check_admin_token(token: Optional[str]) -> None:
+    check_token(token)
+    if EXECUTOR_KIND == "process":
+        # Process workers hold their own copy of the data.
+        raise HTTPException(
+            status_code=409,
+            detail="Tide data can only be updated in place with the thread executor.",
+        )
+
+
+@app.post("/admin/tide-data", response_model=TideDataVersion)
+async def update_tide_data(
+    update: TideDataUpdate, x_admin_token: Optional[str] = Header(default=None)
+):
+    check_admin_token(x_admin_token)
+    tide_heights_df = pd.DataFrame(
+        {
+            "PORT_NAME": [row.port_name for row in update.rows],
+            "TIDE_DATETIME": [row.tide_datetime for row in update.rows],
+            "TIDE_HEIGHT_MT": [row.tide_height_mt for row in update.rows],
+        }
+    )
+    try:
+        snapshot = await run_in_thread(
+            cassia.ingest_tide_data, tide_heights_df, update.mode
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return TideDataVersion(
+        version=snapshot.version,
+        serial=snapshot.serial,
+        ports=sorted(set(tide_heights_df["PORT_NAME"])),
+    )
+
+
+@app.post("/admin/tide-data/reload", response_model=TideDataVersion)
+async def reload_tide_data(x_admin_token: Optional[str] = Header(default=None)):
+    check_admin_token(x_admin_token)
+    snapshot = await run_in_thread(cassia.reload_tide_data)
+    return TideDataVersion(version=snapshot.version, serial=snapshot.serial)
+
+
+def window_outputs(windows) -> List[TidalWindowOutput]:
+    return [
+        TidalWindowOutput(start_time=start_time, end_time=end_time)
+        for start_time, end_time in windows
+    ]
+
+
+@app.post("/subscriptions", response_model=SubscriptionWindows, status_code=201)
+async def subscribe(input: SubscriptionInput):
+    subscriptions.expire(SUBSCRIPTION_IDLE_SECONDS)
+    if len(subscriptions) >= MAX_SUBSCRIPTIONS:
+        raise HTTPException(status_code=503, detail="Too many subscriptions.")
+    watch = Watch(
+        kind="tidal" if input.kind == "tidal-windows" else "combined",
+        unlocode=input.port_id,
+        draught=float(input.vessel_information.draught),
+        arrival_time=pd.Timestamp(input.arrival_datetime),
+        days=input.horizon_days,
+    )
+    try:
+        subscription_id, windows = await run_in_thread(subscriptions.subscribe, watch)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return SubscriptionWindows(id=subscription_id, tidal_windows=window_outputs(windows))
+
+
+@app.delete("/subscriptions/{subscription_id}", status_code=204)
+async def unsubscribe(subscription_id: str):
+    if not subscriptions.unsubscribe(subscription_id):
+        raise HTTPException(status_code=404, detail="No such subscription.")
+    return Response(status_code=204)
+
+
+def server_sent_event(event: str, data: BaseModel) -> str:
+    return f"event: {event}\ndata: {data.model_dump_json()}\n\n"
+
+
+async def subscription_events(subscription_ids: List[str]):
+    # The current windows of each subscription, then a diff whenever they
+    # change, until every subscription is removed.
+    loop = asyncio.get_running_loop()
+    updates: asyncio.Queue = asyncio.Queue()
+
+    def listener(update: Update) -> None:
+        # Called from the thread that changed the data.
+        try:
+            loop.call_soon_threadsafe(updates.put_nowait, update)
+        except RuntimeError:  # The loop has closed
+            pass
+
+    listening = []
+    try:
+        for subscription_id in subscription_ids:
+            try:
+                windows = subscriptions.listen(subscription_id, listener)
+            except KeyError:  # Removed since the request was checked
+                yield server_sent_event("closed", SubscriptionClosed(id=subscription_id))
+                continue
+            listening.append(subscription_id)
+            current = SubscriptionWindows(
+                id=subscription_id, tidal_windows=window_outputs(windows)
+            )
+            yield server_sent_event("windows", current)
+
+        open_ids = set(listening)
+        while open_ids:
+            try:
+                update = await asyncio.wait_for(updates.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if update.windows is None:
+                open_ids.discard(update.subscription_id)
+                yield server_sent_event(
+                    "closed", SubscriptionClosed(id=update.subscription_id)
+                )
+                continue
+            yield server_sent_event(
+                "diff",
+                SubscriptionDiff(
+                    id=update.subscription_id,
+                    version=update.version,
+                    added=window_outputs(update.added),
+                    removed=window_outputs(update.removed),
+                ),
+            )
+    finally:
+        for subscription_id in listening:
+            subscriptions.unlisten(subscription_id, listener)
+
+
+@app.get("/subscriptions/events")
+async def get_subscription_events(ids: str = Query()):
+    # ids is a comma-separated list of subscription ids.
+    subscription_ids = list(dict.fromkeys(key for key in ids.split(",") if key))
+    if not subscription_ids:
+        raise HTTPException(status_code=422, detail="No subscription ids given.")
+    missing = [key for key in subscription_ids if key not in subscriptions]
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"No such subscriptions: {', '.join(missing)}."
+        )
+    return StreamingResponse(
+        subscription_events(subscription_ids),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def plot_result(plot: PlotInput):
+    if plot.kind == "tidal-windows":
+        return cassia.get_tidal_windows(
+            plot.imo,
+            plot.port_id,
+            plot.arrival_datetime,
+            plot.horizon_days,
+            draught=plot.draught,
+        )
+    return cassia.get_combined_windows(
+        plot.imo,
+        plot.port_id,
+        plot.arrival_datetime,
+        plot.horizon_days,
+        draught=plot.draught,
+    )
+
+
+def render_plot(plot: PlotInput) -> bytes:
+    def compute() -> bytes:
+        return cassia.render(plot_result(plot), plot.format)
+
+    if image_cache is None:
+        return compute()
+    return image_cache.get_or_compute(
+        tuple(plot.model_dump().values()), compute, version=cassia.snapshot.version
+    )
+
+
+def render_plots(plots: List[PlotInput]) -> bytes:
+    # Results come from this process (and its cache); the charts themselves
+    # are drawn in parallel on the render pool and returned as a zip archive.
+    from cassia.rendering import render_many
+
+    jobs = [cassia.render_job(plot_result(plot), plot.format) for plot in plots]
+    images = render_many(jobs, executor=get_render_executor())
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        for index, (plot, image) in enumerate(zip(plots, images)):
+            zip_file.writestr(f"{index}-{plot.kind}-{plot.port_id}.{plot.format}", image)
+    return archive.getvalue()
+
+
+@app.get("/plot/{kind}")
+async def get_plot(
+    kind: Literal["tidal-windows", "combined-windows"],
+    port_id: str,
+    imo: int,
+    arrival_datetime: datetime,
+    horizon_days: int = Query(default=14, ge=1, le=MAX_HORIZON_DAYS),
+    format: Literal["png", "svg"] = "png",
+    draught: Optional[float] = Query(default=None, gt=0),
+):
+    plot = PlotInput(
+        kind=kind,
+        port_id=port_id,
+        imo=imo,
+        arrival_datetime=arrival_datetime,
+        horizon_days=horizon_days,
+        format=format,
+        draught=draught,
+    )
+    try:
+        image = await run_in_executor(render_plot, plot)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=image, media_type=IMAGE_MEDIA_TYPES[format])
+
+
+@app.post("/plot/batch")
+async def get_plot_batch(plots: List[PlotInput]):
+    loop = asyncio.get_running_loop()
+    try:
+        archive = await loop.run_in_executor(None, render_plots, plots)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=archive, media_type="application/zip")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    caches = {}
+    if cassia.cache is not None:
+        caches["windows"] = cassia.cache.stats
+    if image_cache is not None:
+        caches["images"] = image_cache.stats
+    return PlainTextResponse(
+        metrics.render(caches), media_type="text/plain; version=0.0.4"
+    )
+
+
+class ProfileInfo(BaseModel):
+    profile_id: str
+    size: int
+    created: datetime
+
+
+def profile_file(profile_id: str) -> Path:
+    path = PROFILE_DIR / f"{profile_id}.pstats"
+    if not re.fullmatch(r"[\w-]+", profile_id) or not path.is_file():
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id!r}.")
+    return path
+
+
+@app.get("/debug/profiles", response_model=List[ProfileInfo])
+async def list_profiles(x_admin_token: Optional[str] = Header(default=None)):
+    check_token(x_admin_token)
+    paths = sorted(PROFILE_DIR.glob("*.pstats"), reverse=True)
+    return [
+        ProfileInfo(
+            profile_id=path.stem,
+            size=path.stat().st_size,
+            created=datetime.fromtimestamp(path.stat().st_mtime),
+        )
+        for path in paths
+    ]
+
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: Literal["text", "pstats"] = "text",
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(default=50, ge=1),
+    x_admin_token: Optional[str] = Header(default=None),
+):
+    # The raw file loads with pstats.Stats or snakeviz; the text report
+    # lists the top functions.
+    check_token(x_admin_token)
+    path = profile_file(profile_id)
+    if format == "pstats":
+        return Response(content=path.read_bytes(), media_type="application/octet-stream")
+
+    report = io.StringIO()
+    pstats.Stats(str(path), stream=report).sort_stats(sort).print_stats(limit)
+    return PlainTextResponse(report.getvalue())
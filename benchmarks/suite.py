@@ -0,0 +1,273 @@
+"""Per-stage timings and peak memory of the window pipeline on synthetic data.
+
+Run from the repository root, e.g.::
+
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.25
+
+Data sizes scale with --ports, --fleet, --tide-days and --horizon. With
+--compare the baseline's scale is reused, and the exit status is 1 when any
+stage's fastest time or peak memory exceeds the baseline by more than the
+threshold.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd  # type:ignore
+
+from benchmarks.synthetic import START, synthetic_data
+from cassia.cassia import Cassia
+from cassia.daylight import (
+    DaylightTable,
+    combine_tidal_and_daylight_windows,
+    get_daylight_windows_corrected,
+)
+from cassia.interpolation import calculate_fleet_tidal_windows, calculate_tidal_windows
+from cassia.tide_store import TideStore
+
+# Differences below these are noise whatever the relative change.
+MIN_DELTA_MS = 0.1
+MIN_DELTA_KIB = 64.0
+
+SAMPLE_SECONDS = 0.02
+
+
+class Scale(NamedTuple):
+    ports: int = 50
+    fleet: int = 200
+    tide_days: int = 120
+    horizon_days: int = 14
+    seed: int = 0
+
+
+class StageResult(NamedTuple):
+    median_ms: float
+    min_ms: float
+    peak_kib: float
+
+
+def build_stages(scale: Scale) -> Dict[str, Callable[[], object]]:
+    data = synthetic_data(scale.ports, scale.fleet, scale.tide_days, scale.seed)
+    tide_store = TideStore.from_dataframe(data.tide_heights_df)
+    unlocode, port = next(iter(data.ports_dispatcher.items()))
+    imo = next(iter(data.vessels_dispatcher))
+    draughts = [vessel.draught for vessel in data.vessels_dispatcher.values()]
+    arrival_time = START + pd.Timedelta(days=1, minutes=7)
+    horizon = pd.Timedelta(days=scale.horizon_days)
+
+    first_date = np.datetime64(START.date(), "D")
+    last_date = first_date + np.timedelta64(scale.tide_days + scale.horizon_days, "D")
+    daylight_table = DaylightTable.build(data.ports_dispatcher, first_date, last_date)
+
+    def tidal_windows(engine: str):
+        return calculate_tidal_windows(
+            imo,
+            unlocode,
+            arrival_time,
+            data.vessels_dispatcher,
+            data.ports_dispatcher,
+            tide_store,
+            engine=engine,
+            horizon=horizon,
+        )
+
+    def fleet_windows(engine: str):
+        return calculate_fleet_tidal_windows(
+            draughts,
+            unlocode,
+            arrival_time,
+            data.ports_dispatcher,
+            tide_store,
+            engine=engine,
+            horizon=horizon,
+        )
+
+    tidal = tidal_windows("grid")[0]
+    daylight = daylight_table.windows(unlocode, arrival_time, scale.horizon_days)
+    cassia = Cassia(
+        vessels_dispatcher=data.vessels_dispatcher,
+        ports_dispatcher=data.ports_dispatcher,
+        tide_heights_df=data.tide_heights_df,
+    ).load()
+
+    stages = {
+        "load.tide_store": lambda: TideStore.from_dataframe(data.tide_heights_df),
+        "load.daylight_table": lambda: DaylightTable.build(
+            data.ports_dispatcher, first_date, last_date
+        ),
+        "tidal.grid": lambda: tidal_windows("grid"),
+        "tidal.analytic": lambda: tidal_windows("analytic"),
+        "fleet.grid": lambda: fleet_windows("grid"),
+        "fleet.analytic": lambda: fleet_windows("analytic"),
+        "daylight.direct": lambda: get_daylight_windows_corrected(
+            port.latitude, port.longitude, arrival_time, scale.horizon_days
+        ),
+        "daylight.table": lambda: daylight_table.windows(
+            unlocode, arrival_time, scale.horizon_days
+        ),
+        "combine": lambda: combine_tidal_and_daylight_windows(tidal, daylight),
+        "cassia.combined": lambda: cassia.get_combined_windows(
+            imo, unlocode, arrival_time, scale.horizon_days
+        ),
+    }
+    stages.update(api_stages(cassia, unlocode, imo, arrival_time, scale.horizon_days))
+    return stages
+
+
+def api_stages(
+    cassia: Cassia, unlocode: str, imo: int, arrival_time: pd.Timestamp, days: int
+) -> Dict[str, Callable[[], object]]:
+    # Whole requests through FastAPI, served by the synthetic (uncached) Cassia.
+    import api.main
+    from fastapi.testclient import TestClient
+
+    api.main.cassia = cassia
+    client = TestClient(api.main.app)
+    query = {
+        "port_id": unlocode,
+        "vessel_information": {
+            "draught": "10.0",
+            "dwt": "50000.0",
+            "name": "BENCHMARK",
+            "imo": imo,
+        },
+        "arrival_datetime": arrival_time.isoformat(),
+        "horizon_days": days,
+    }
+    return {
+        "api.tidal_windows": lambda: client.post("/tidal-windows/", json=query),
+        "api.combined_windows": lambda: client.post("/combined-windows/", json=query),
+    }
+
+
+def measure(function: Callable[[], object], repeat: int) -> StageResult:
+    # Each sample loops the stage for at least SAMPLE_SECONDS, so fast
+    # stages are not dominated by timer and scheduling noise.
+    function()  # Warm up caches and lazy imports
+    timer = timeit.Timer(function)
+    number = max(int(SAMPLE_SECONDS / max(timer.timeit(1), 1e-6)), 1)
+    seconds = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return StageResult(
+        median_ms=float(np.median(seconds)) * 1e3,
+        min_ms=min(seconds) * 1e3,
+        peak_kib=peak / 1024,
+    )
+
+
+def run(
+    scale: Scale, repeat: int = 5, only: Optional[List[str]] = None
+) -> Dict[str, StageResult]:
+    stages = build_stages(scale)
+    return {
+        name: measure(function, repeat)
+        for name, function in stages.items()
+        if not only or any(name.startswith(prefix) for prefix in only)
+    }
+
+
+def compare(
+    results: Dict[str, StageResult],
+    baseline: Dict[str, StageResult],
+    threshold: float,
+) -> List[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]
+        # The fastest run is the least disturbed by other load on the machine.
+        if (
+            result.min_ms > before.min_ms * (1 + threshold)
+            and result.min_ms - before.min_ms > MIN_DELTA_MS
+        ):
+            regressions.append(f"{name}: {result.min_ms:.3f} ms vs {before.min_ms:.3f} ms")
+        if (
+            result.peak_kib > before.peak_kib * (1 + threshold)
+            and result.peak_kib - before.peak_kib > MIN_DELTA_KIB
+        ):
+            regressions.append(
+                f"{name}: peak {result.peak_kib:.0f} KiB vs {before.peak_kib:.0f} KiB"
+            )
+    return regressions
+
+
+def to_json(scale: Scale, results: Dict[str, StageResult]) -> dict:
+    return {
+        "scale": scale._asdict(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+        },
+        "stages": {name: result._asdict() for name, result in results.items()},
+    }
+
+
+def from_json(report: dict):
+    return Scale(**report["scale"]), {
+        name: StageResult(**result) for name, result in report["stages"].items()
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = Scale()
+    parser.add_argument("--ports", type=int, default=defaults.ports)
+    parser.add_argument("--fleet", type=int, default=defaults.fleet)
+    parser.add_argument("--tide-days", type=int, default=defaults.tide_days)
+    parser.add_argument("--horizon", type=int, default=defaults.horizon_days)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="Stage name prefixes to run")
+    parser.add_argument("--save", type=Path, help="Write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    scale = Scale(args.ports, args.fleet, args.tide_days, args.horizon, args.seed)
+    baseline = None
+    if args.compare is not None:
+        scale, baseline = from_json(json.loads(args.compare.read_text()))
+
+    results = run(scale, args.repeat, args.only)
+
+    print(f"{'stage':<24}{'median ms':>12}{'min ms':>12}{'peak KiB':>12}")
+    for name, result in results.items():
+        change = ""
+        if baseline is not None and name in baseline:
+            change = f"{result.min_ms / baseline[name].min_ms - 1:+8.1%}"
+        print(
+            f"{name:<24}{result.median_ms:>12.3f}{result.min_ms:>12.3f}"
+            f"{result.peak_kib:>12.1f}  {change}"
+        )
+
+    if args.save is not None:
+        args.save.write_text(json.dumps(to_json(scale, results), indent=2))
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
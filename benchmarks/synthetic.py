@@ -0,0 +1,88 @@
+"""Seeded synthetic ports, fleets and tide forecasts of any size."""
+
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd  # type:ignore
+
+from cassia.registry import PortRegistry, VesselRegistry
+
+# Mean interval between successive high and low waters of a semidiurnal tide,
+# and the spring-neap cycle modulating the range.
+HALF_TIDAL_CYCLE = pd.Timedelta(hours=6, minutes=12, seconds=30)
+SPRING_NEAP_DAYS = 14.77
+
+START = pd.Timestamp("2024-03-01 00:00:00")
+
+
+class SyntheticData(NamedTuple):
+    vessels_dispatcher: VesselRegistry
+    ports_dispatcher: PortRegistry
+    tide_heights_df: pd.DataFrame
+
+
+def synthetic_ports(count: int, seed: int = 0) -> PortRegistry:
+    rng = np.random.default_rng(seed)
+    indices = np.arange(count)
+    return PortRegistry(
+        np.char.add("P", np.char.zfill(indices.astype(str), 5)),
+        name=np.char.add("Port ", np.char.zfill(indices.astype(str), 5)),
+        latitude=rng.uniform(-60.0, 60.0, count),
+        longitude=rng.uniform(-180.0, 180.0, count),
+        approach_mllw_meters=rng.uniform(10.0, 16.0, count),
+    )
+
+
+def synthetic_fleet(count: int, seed: int = 0) -> VesselRegistry:
+    rng = np.random.default_rng(seed + 1)
+    indices = np.arange(count)
+    return VesselRegistry(
+        9_000_000 + indices,
+        draught=np.round(rng.uniform(8.0, 18.0, count), 2),
+        name=np.char.add("VESSEL ", indices.astype(str)),
+        dwt=np.round(rng.uniform(20_000.0, 250_000.0, count), 1),
+    )
+
+
+def synthetic_tides(
+    ports: PortRegistry, days: int, start: pd.Timestamp = START, seed: int = 0
+) -> pd.DataFrame:
+    # Alternating high and low waters per port, with a random phase, mean
+    # level and range, modulated over the spring-neap cycle plus noise.
+    rng = np.random.default_rng(seed + 2)
+    port_names = ports.column("name").tolist()
+    count = int(pd.Timedelta(days=days) / HALF_TIDAL_CYCLE) + 2
+
+    phases = rng.uniform(0.0, 1.0, (len(port_names), 1))
+    offsets = (np.arange(count) + phases) * HALF_TIDAL_CYCLE.value
+    jitter = rng.normal(0.0, 600e9, offsets.shape)  # Seconds-scale noise, in ns
+    datetimes = start.value + (offsets + jitter).astype(np.int64)
+
+    elapsed_days = (datetimes - start.value) / 86_400e9
+    spring_neap = 1.0 + 0.3 * np.sin(2 * np.pi * elapsed_days / SPRING_NEAP_DAYS)
+    means = rng.uniform(0.8, 2.5, (len(port_names), 1))
+    ranges = rng.uniform(0.5, 3.0, (len(port_names), 1))
+    signs = np.where(np.arange(count) % 2 == 0, 1.0, -1.0)
+    heights = means + signs * ranges / 2 * spring_neap
+    heights += rng.normal(0.0, 0.05, heights.shape)
+
+    return pd.DataFrame(
+        {
+            "PORT_NAME": np.repeat(port_names, count),
+            "TIDE_DATETIME": pd.DatetimeIndex(
+                datetimes.ravel().astype("datetime64[ns]")
+            ),
+            "TIDE_HEIGHT_MT": np.round(heights.ravel(), 2),
+        }
+    )
+
+
+def synthetic_data(
+    ports: int, fleet: int, tide_days: int, seed: int = 0
+) -> SyntheticData:
+    ports_dispatcher = synthetic_ports(ports, seed)
+    return SyntheticData(
+        vessels_dispatcher=synthetic_fleet(fleet, seed),
+        ports_dispatcher=ports_dispatcher,
+        tide_heights_df=synthetic_tides(ports_dispatcher, tide_days, seed=seed),
+    )
@@ -0,0 +1,53 @@
+"""Per-request cost of preparing a port's tide series: DataFrame filter vs TideStore.
+
+Run from the repository root with ``python -m benchmarks.tide_lookup``.
+"""
+
+import timeit
+
+import pandas as pd  # type:ignore
+
+from cassia.helpers import get_tide_data
+from cassia.tide_store import TideStore
+
+PORT_NAME = "Brisbane"
+ARRIVAL_TIME = pd.Timestamp("2024-03-01 00:00:00")
+HORIZON_END = ARRIVAL_TIME + pd.Timedelta(days=14)
+
+
+def prepare_from_dataframe(tide_heights_df: pd.DataFrame):
+    # The per-request preparation calculate_tidal_windows used to do.
+    port_tide_data = tide_heights_df[tide_heights_df["PORT_NAME"] == PORT_NAME].copy()
+    port_tide_data["TIDE_DATETIME"] = pd.to_datetime(port_tide_data["TIDE_DATETIME"])
+    port_tide_data = port_tide_data.sort_values(by="TIDE_DATETIME")
+    port_tide_data["TIMESTAMP"] = port_tide_data["TIDE_DATETIME"].apply(
+        lambda x: x.timestamp()
+    )
+    return port_tide_data["TIMESTAMP"], port_tide_data["TIDE_HEIGHT_MT"]
+
+
+def prepare_from_store(tide_store: TideStore):
+    return tide_store.window(
+        PORT_NAME, ARRIVAL_TIME.timestamp(), HORIZON_END.timestamp()
+    )
+
+
+def main(number: int = 200) -> None:
+    tide_heights_df = get_tide_data()
+
+    build_seconds = timeit.timeit(
+        lambda: TideStore.from_dataframe(tide_heights_df), number=10
+    )
+    tide_store = TideStore.from_dataframe(tide_heights_df)
+
+    before = timeit.timeit(lambda: prepare_from_dataframe(tide_heights_df), number=number)
+    after = timeit.timeit(lambda: prepare_from_store(tide_store), number=number)
+
+    print(f"TideStore build (once per load): {build_seconds / 10 * 1e3:10.3f} ms")
+    print(f"DataFrame filter per request:     {before / number * 1e6:10.1f} us")
+    print(f"TideStore lookup per request:     {after / number * 1e6:10.1f} us")
+    print(f"Speed-up:                         {before / after:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+    coalesced: int  # Misses that waited for an identical in-flight computation
+    evictions: int
+    invalidations: int
+    size: int
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / requests if requests else 0.0
+
+
+class WindowCache:
+    """Bounded LRU cache with optional TTL and single-flight computation.
+
+    Entries belong to a data version (e.g. TideStore.version). A version
+    not seen before is the newest, and only the entries of the latest
+    ``versions`` are kept, so readers still on the previous data keep their
+    hits while new data is published. Concurrent requests for a key that is
+    being computed wait for that computation instead of starting their own.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        versions: int = 2,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        if versions < 1:
+            raise ValueError("versions must be at least 1.")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.versions = versions
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, Future] = {}
+        # Oldest first; the entries are keyed by (version, key).
+        self._versions: "OrderedDict[Hashable, None]" = OrderedDict()
+
+        self._hits = self._misses = self._coalesced = 0
+        self._evictions = self._invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                coalesced=self._coalesced,
+                evictions=self._evictions,
+                invalidations=self._invalidations,
+                size=len(self._entries),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(
+        self, key: Hashable, compute: Callable[[], Any], version: Hashable = None
+    ) -> Any:
+        key = (version, key)
+        with self._lock:
+            if version not in self._versions:
+                self._versions[version] = None
+                while len(self._versions) > self.versions:
+                    self._drop_version(next(iter(self._versions)))
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+            waiting = self._in_flight.get(key)
+            if waiting is None:
+                self._misses += 1
+                future: Future = Future()
+                self._in_flight[key] = future
+            else:
+                self._coalesced += 1
+
+        if waiting is not None:
+            return waiting.result()
+
+        try:
+            value = compute()
+        except BaseException as exc:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(exc)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            if version in self._versions:
+                expires_at = float("inf") if self.ttl is None else self.clock() + self.ttl
+                self._entries[key] = (value, expires_at)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        future.set_result(value)
+        return value
+
+    def _drop_version(self, version: Hashable) -> None:
+        del self._versions[version]
+        stale = [key for key in self._entries if key[0] == version]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._invalidations += 1
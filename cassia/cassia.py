@@ -1,88 +1,950 @@
+import importlib
+import threading
+from dataclasses import dataclass, field
+
+import numpy as np
 import pandas as pd  # type:ignore
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+from cassia import dispatchers
+from cassia.cache import WindowCache
 from cassia.daylight import (
+    DaylightTable,
     get_daylight_windows_corrected,
     combine_tidal_and_daylight_windows,
-    format_windows,
 )
-from cassia.dispatchers import ports_dispatcher, vessels_dispatcher
-from cassia.interpolation import calculate_tidal_windows
-from cassia.plotting import show_plot_tidal_windows, show_plot_combined_windows
+from cassia.draught_index import DraughtIndex
+from cassia.interpolation import (
+    CHUNK,
+    HORIZON,
+    RESOLUTION,
+    FleetTidalWindows,
+    calculate_depth_curve,
+    calculate_fleet_tidal_windows,
+    iter_tidal_windows,
+)
+
+from cassia.helpers import from_epoch_seconds, get_tide_data
+from cassia.intervals import IntervalSet, as_interval_set, to_nanoseconds
+from cassia.metrics import metrics
+from cassia.planner import PortCall, VoyagePlan, plan_rotation
+from cassia.precompute import PrecomputedWindows, open_precomputed
+from cassia.registry import vessel_draughts
+from cassia.restrictions import (
+    DEFAULT_RESTRICTIONS,
+    Layer,
+    RestrictionQuery,
+    evaluate,
+)
+from cassia.results import CombinedWindowsResult, TidalWindowsResult
+from cassia.shared import attach
+from cassia.storage import load_compiled
+from cassia.subscriptions import Change
+from cassia.sweep import sweep_tidal_windows
+from cassia.tide_store import TideStore
+
+# Modules each engine needs at request time, imported by Cassia.load().
+ENGINE_MODULES = {"grid": ["scipy.interpolate"], "analytic": []}
+
+
+@dataclass(frozen=True)
+class TideSnapshot:
+    """An immutable version of the tide data and everything derived from it."""
 
-from cassia.helpers import get_tide_data
+    serial: int
+    tide_store: TideStore
+    daylight_table: DaylightTable
+    tide_heights_df: Optional[pd.DataFrame] = None  # None once updated in place
+    # Built per port on first use, and dropped with the snapshot.
+    draught_indexes: Dict[str, DraughtIndex] = field(
+        default_factory=dict, compare=False, repr=False
+    )
+    # Windows precomputed from this very tide data, if any.
+    precomputed: Optional[PrecomputedWindows] = field(
+        default=None, compare=False, repr=False
+    )
+
+    @property
+    def version(self) -> str:
+        return self.tide_store.version
 
 
 class Cassia:
     def __init__(
         self,
-        vessels_dispatcher: dict = vessels_dispatcher,
-        ports_dispatcher: dict = ports_dispatcher,
-        tide_heights_df: pd.DataFrame = get_tide_data(),
+        vessels_dispatcher: Optional[dict] = None,
+        ports_dispatcher: Optional[dict] = None,
+        tide_heights_df: Optional[pd.DataFrame] = None,
+        engine: str = "grid",
+        cache: Optional[WindowCache] = None,
+        tide_store: Optional[TideStore] = None,
+        data_path=None,
+        resolution: pd.Timedelta = RESOLUTION,
+        shared_memory: Optional[str] = None,
+        precomputed=None,
+        restrictions: Optional[Dict[str, Sequence[Layer]]] = None,
+    ) -> None:
+        # Nothing is read here: datasets not passed in come from shared_memory
+        # (a name published by ``python -m cassia.shared``), data_path (a
+        # directory compiled by ``python -m cassia.storage``) or the CSVs in
+        # assets/, and are loaded by load() or on first use. ``precomputed``
+        # is a file written by ``python -m cassia.precompute``, read again
+        # whenever the tide data changes. ``restrictions`` maps UNLOCODEs to
+        # their restriction layers; other ports get DEFAULT_RESTRICTIONS.
+        self._vessels_dispatcher = vessels_dispatcher
+        self._ports_dispatcher = ports_dispatcher
+        self._tide_heights_df = tide_heights_df
+        self._tide_store = tide_store
+        self.data_path = data_path
+        self.shared_memory = shared_memory
+        self.precomputed = precomputed
+        self._restrictions = {
+            unlocode: tuple(layers) for unlocode, layers in (restrictions or {}).items()
+        }
+        self._daylight_table: Optional[DaylightTable] = None
+        self.engine = engine
+        self.resolution = pd.Timedelta(resolution)
+        self.cache = cache
+        self._update_lock = threading.RLock()
+        self._snapshot: Optional[TideSnapshot] = None
+        self._listeners: List[Callable[[List[Change]], None]] = []
+
+    @classmethod
+    def from_compiled(cls, path, **kwargs) -> "Cassia":
+        return cls(data_path=path, **kwargs)
+
+    @classmethod
+    def from_shared(cls, name: str, **kwargs) -> "Cassia":
+        return cls(shared_memory=name, **kwargs)
+
+    def load(self) -> "Cassia":
+        """Load the datasets and the engine's dependencies, if not done yet.
+
+        Meant for a service's startup hook; otherwise the first query does it.
+        """
+        with self._update_lock:
+            if self._snapshot is not None:
+                return self
+
+            if self.shared_memory is not None:
+                shared = attach(self.shared_memory)
+                if self._vessels_dispatcher is None:
+                    self._vessels_dispatcher = shared.vessels_dispatcher
+                if self._ports_dispatcher is None:
+                    self._ports_dispatcher = shared.ports_dispatcher
+                if self._tide_heights_df is None and self._tide_store is None:
+                    self._tide_store = shared.tide_store
+                    self._daylight_table = shared.daylight_table
+
+            elif self.data_path is not None:
+                compiled = load_compiled(self.data_path)
+                if self._vessels_dispatcher is None:
+                    self._vessels_dispatcher = compiled.vessels_dispatcher
+                if self._ports_dispatcher is None:
+                    self._ports_dispatcher = compiled.ports_dispatcher
+                if self._tide_heights_df is None and self._tide_store is None:
+                    self._tide_store = compiled.tide_store
+
+            if self._vessels_dispatcher is None:
+                self._vessels_dispatcher = dispatchers.vessels_dispatcher
+            if self._ports_dispatcher is None:
+                self._ports_dispatcher = dispatchers.ports_dispatcher
+
+            if self._tide_store is not None:
+                self._publish(self._tide_store)
+            else:
+                if self._tide_heights_df is None:
+                    self._tide_heights_df = get_tide_data()
+                self._publish(
+                    TideStore.from_dataframe(self._tide_heights_df), self._tide_heights_df
+                )
+            self._tide_store = self._tide_heights_df = None
+
+        for module in ENGINE_MODULES.get(self.engine, []):
+            importlib.import_module(module)
+        return self
+
+    @property
+    def snapshot(self) -> TideSnapshot:
+        if self._snapshot is None:
+            self.load()
+        return self._snapshot
+
+    @property
+    def vessels_dispatcher(self) -> dict:
+        if self._vessels_dispatcher is None:
+            self.load()
+        return self._vessels_dispatcher
+
+    @property
+    def ports_dispatcher(self) -> dict:
+        if self._ports_dispatcher is None:
+            self.load()
+        return self._ports_dispatcher
+
+    @property
+    def tide_heights_df(self) -> pd.DataFrame:
+        snapshot = self.snapshot
+        if snapshot.tide_heights_df is None:
+            return snapshot.tide_store.to_dataframe()
+        return snapshot.tide_heights_df
+
+    @tide_heights_df.setter
+    def tide_heights_df(self, tide_heights_df: pd.DataFrame) -> None:
+        self.reload_tide_data(tide_heights_df)
+
+    @property
+    def tide_store(self) -> TideStore:
+        return self.snapshot.tide_store
+
+    @property
+    def daylight_table(self) -> DaylightTable:
+        return self.snapshot.daylight_table
+
+    def reload_tide_data(
+        self, tide_heights_df: Optional[pd.DataFrame] = None
+    ) -> TideSnapshot:
+        # Replacing the dataset rebuilds the derived arrays; the new store's
+        # version makes the cache drop results computed from the old data.
+        if tide_heights_df is None:
+            tide_heights_df = get_tide_data()
+        with self._update_lock:
+            if self._snapshot is None:
+                self._tide_heights_df = tide_heights_df
+                return self.load().snapshot
+            previous = self._snapshot
+            snapshot = self._publish(
+                TideStore.from_dataframe(tide_heights_df), tide_heights_df
+            )
+        self._notify_tide_changes(previous, snapshot)
+        return snapshot
+
+    def ingest_tide_data(
+        self, tide_heights_df: pd.DataFrame, mode: str = "append"
+    ) -> TideSnapshot:
+        # Only the ports present in ``tide_heights_df`` are rebuilt; see
+        # TideStore.with_updates for the meaning of ``mode``.
+        with self._update_lock:
+            previous = self.snapshot
+            tide_store = previous.tide_store.with_updates(tide_heights_df, mode)
+            snapshot = self._publish(tide_store)
+        self._notify_tide_changes(previous, snapshot)
+        return snapshot
+
+    def add_listener(self, listener: Callable[[List[Change]], None]) -> None:
+        # ``listener`` is called with the ports whose tide data or restriction
+        # layers changed, once the change is published, from the thread that
+        # made it.
+        with self._update_lock:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: Callable[[List[Change]], None]) -> None:
+        with self._update_lock:
+            self._listeners = [other for other in self._listeners if other != listener]
+
+    def _notify(self, changes: List[Change]) -> None:
+        if changes:
+            for listener in self._listeners:
+                listener(changes)
+
+    def _notify_tide_changes(
+        self, previous: TideSnapshot, snapshot: TideSnapshot
     ) -> None:
-        self.tide_heights_df = tide_heights_df
-        self.vessels_dispatcher = vessels_dispatcher
-        self.ports_dispatcher = ports_dispatcher
+        if not self._listeners:
+            return
+        spans = snapshot.tide_store.changed_spans(previous.tide_store)
+        self._notify(
+            [
+                Change(unlocode, *spans[port.name])
+                for unlocode, port in self.ports_dispatcher.items()
+                if port.name in spans
+            ]
+        )
+
+    def _publish(
+        self, tide_store: TideStore, tide_heights_df: Optional[pd.DataFrame] = None
+    ) -> TideSnapshot:
+        # Requests read ``self.snapshot`` once and keep using it, so swapping
+        # in a new one never mixes data versions within a computation.
+        previous = self._snapshot
+        self._snapshot = TideSnapshot(
+            serial=0 if previous is None else previous.serial + 1,
+            tide_store=tide_store,
+            daylight_table=self._daylight_table_for(
+                tide_store,
+                self._daylight_table if previous is None else previous.daylight_table,
+            ),
+            tide_heights_df=tide_heights_df,
+            precomputed=self._precomputed_for(tide_store),
+        )
+        self._daylight_table = None
+        return self._snapshot
+
+    def _precomputed_for(self, tide_store: TideStore) -> Optional[PrecomputedWindows]:
+        # Only a file built from this tide data, engine and resolution.
+        precomputed = open_precomputed(self.precomputed)
+        if precomputed is None or not precomputed.matches(
+            tide_store.version, self.engine, self.resolution
+        ):
+            return None
+        return precomputed
+
+    def _daylight_table_for(
+        self, tide_store: TideStore, previous: Optional[DaylightTable]
+    ) -> DaylightTable:
+        # Sunrise and sunset for every port over the whole tide forecast, so
+        # combined windows only slice a precomputed table.
+        first_epoch, last_epoch = tide_store.span()
+        first_date = np.datetime64(int(first_epoch), "s").astype("datetime64[D]")
+        last_date = (
+            np.datetime64(int(last_epoch), "s") + HORIZON.to_timedelta64()
+        ).astype("datetime64[D]")
+
+        if (
+            previous is not None
+            and previous.first_date <= first_date
+            and last_date < previous.first_date + np.timedelta64(previous.days, "D")
+        ):
+            return previous
+        return DaylightTable.build(
+            self.ports_dispatcher, first_date=first_date, last_date=last_date
+        )
+
+    def restrictions(self, unlocode: str) -> Tuple[Layer, ...]:
+        return self._restrictions.get(unlocode, DEFAULT_RESTRICTIONS)
+
+    def set_restrictions(
+        self, unlocode: str, layers: Optional[Sequence[Layer]]
+    ) -> None:
+        # None restores the defaults. Cached results are keyed by the layers,
+        # so none computed under the old ones are served.
+        with self._update_lock:
+            restrictions = dict(self._restrictions)
+            if layers is None:
+                restrictions.pop(unlocode, None)
+            else:
+                restrictions[unlocode] = tuple(layers)
+            changed = restrictions.get(unlocode) != self._restrictions.get(unlocode)
+            self._restrictions = restrictions
+        if changed:
+            self._notify([Change(unlocode, -np.inf, np.inf, tidal=False)])
+
+    def draught(self, imo: Optional[int], draught: Optional[float] = None) -> float:
+        # A draught given with the query wins over the registry's, so vessels
+        # need not be registered and laden draughts can change per voyage.
+        if draught is not None:
+            return float(draught)
+        return self.vessels_dispatcher[imo].draught
+
+    def get_tidal_windows(
+        self,
+        imo: Optional[int],
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int = 14,
+        draught: Optional[float] = None,
+    ) -> TidalWindowsResult:
+        return self._tidal_windows(
+            self.snapshot, self.draught(imo, draught), unlocode, arrival_time, days
+        )
+
+    def _tidal_windows(
+        self,
+        snapshot: TideSnapshot,
+        draught: float,
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int,
+    ) -> TidalWindowsResult:
+        def compute() -> TidalWindowsResult:
+            tidal_windows = self._lookup(
+                snapshot, "tidal_windows", draught, unlocode, arrival_time, days
+            )
+            if tidal_windows is not None:
+                return TidalWindowsResult(
+                    unlocode=unlocode,
+                    draught=draught,
+                    arrival_time=arrival_time,
+                    tidal_windows=tidal_windows,
+                    time_range=None,
+                    total_depths=None,
+                    days=days,
+                    resolution=self.resolution,
+                    tide_store=snapshot.tide_store,
+                )
 
-    def get_tidal_windows(self, imo: int, unlocode: str, arrival_time: pd.Timestamp):
-        return calculate_tidal_windows(
-            imo=imo,
+            fleet_windows, time_range, total_depths = calculate_fleet_tidal_windows(
+                draughts=[draught],
+                unlocode=unlocode,
+                arrival_time=arrival_time,
+                ports_dispatcher=self.ports_dispatcher,
+                tide_store=snapshot.tide_store,
+                engine=self.engine,
+                horizon=pd.Timedelta(days=days),
+                resolution=self.resolution,
+            )
+            return TidalWindowsResult(
+                unlocode=unlocode,
+                draught=draught,
+                arrival_time=arrival_time,
+                tidal_windows=fleet_windows.windows(0),
+                time_range=time_range,
+                total_depths=total_depths,
+                days=days,
+                resolution=self.resolution,
+                tide_store=snapshot.tide_store,
+            )
+
+        return self._cached(
+            snapshot,
+            ("tidal", unlocode, draught, arrival_time, _tz(arrival_time), days),
+            compute,
+        )
+
+    def iter_tidal_windows(
+        self,
+        imo: Optional[int],
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int = 14,
+        chunk: pd.Timedelta = CHUNK,
+        draught: Optional[float] = None,
+    ) -> Iterator[Tuple[pd.Timestamp, pd.Timestamp]]:
+        # Streams the windows of get_tidal_windows with memory bounded by
+        # ``chunk`` instead of ``days``; nothing is cached.
+        return iter_tidal_windows(
+            draught=self.draught(imo, draught),
+            unlocode=unlocode,
+            arrival_time=arrival_time,
+            ports_dispatcher=self.ports_dispatcher,
+            tide_store=self.snapshot.tide_store,
+            engine=self.engine,
+            horizon=pd.Timedelta(days=days),
+            resolution=self.resolution,
+            chunk=chunk,
+        )
+
+    def get_tidal_windows_many(
+        self,
+        imos_or_draughts: Sequence[Union[int, float]],
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int = 14,
+    ) -> FleetTidalWindows:
+        return self._tidal_windows_many(
+            self.snapshot, imos_or_draughts, unlocode, arrival_time, days
+        )
+
+    def _tidal_windows_many(
+        self,
+        snapshot: TideSnapshot,
+        imos_or_draughts: Sequence[Union[int, float]],
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int,
+    ) -> FleetTidalWindows:
+        # Integers are looked up as IMOs, all at once; anything else is
+        # taken as a draught.
+        values = list(imos_or_draughts)
+        is_imo = np.array(
+            [isinstance(value, (int, np.integer)) for value in values], dtype=bool
+        )
+        draughts = np.array(
+            [0.0 if imo else value for value, imo in zip(values, is_imo)],
+            dtype=np.float64,
+        )
+        if is_imo.any():
+            draughts[is_imo] = vessel_draughts(
+                self.vessels_dispatcher,
+                [value for value, imo in zip(values, is_imo) if imo],
+            )
+        fleet_windows, _, _ = calculate_fleet_tidal_windows(
+            draughts=draughts,
             unlocode=unlocode,
             arrival_time=arrival_time,
-            vessels_dispatcher=self.vessels_dispatcher,
             ports_dispatcher=self.ports_dispatcher,
-            tide_heights_df=self.tide_heights_df,
+            tide_store=snapshot.tide_store,
+            engine=self.engine,
+            horizon=pd.Timedelta(days=days),
+            resolution=self.resolution,
         )
+        return fleet_windows
+
+    def draught_index(self, unlocode: str) -> DraughtIndex:
+        return self._draught_index(self.snapshot, unlocode)
+
+    def _draught_index(self, snapshot: TideSnapshot, unlocode: str) -> DraughtIndex:
+        index = snapshot.draught_indexes.get(unlocode)
+        if index is None:
+            index = DraughtIndex.for_port(
+                self.ports_dispatcher[unlocode], snapshot.tide_store
+            )
+            snapshot.draught_indexes[unlocode] = index
+        return index
+
+    def get_draught_sweep(
+        self,
+        draughts: Sequence[float],
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int = 14,
+    ) -> FleetTidalWindows:
+        # Exact (analytic) tidal windows for each draught, from the port's
+        # draught index, whatever the engine.
+        arrival_time = pd.Timestamp(arrival_time)
+        return self.draught_index(unlocode).fleet_windows(
+            draughts,
+            arrival_time.timestamp(),
+            (arrival_time + pd.Timedelta(days=days)).timestamp(),
+            tz=arrival_time.tz,
+        )
+
+    def max_allowable_draught(
+        self, unlocode: str, start_time: pd.Timestamp, end_time: pd.Timestamp
+    ) -> float:
+        # Vessels with a smaller draught can navigate throughout the period.
+        return self.draught_index(unlocode).max_draught(
+            pd.Timestamp(start_time).timestamp(), pd.Timestamp(end_time).timestamp()
+        )
+
+    def first_tidal_window(
+        self,
+        imo: Optional[int],
+        unlocode: str,
+        after: pd.Timestamp,
+        min_duration: pd.Timedelta,
+        draught: Optional[float] = None,
+    ) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        # The first window from ``after`` lasting at least ``min_duration``,
+        # or None if the tide data ends first.
+        after = pd.Timestamp(after)
+        window = self.draught_index(unlocode).first_window(
+            self.draught(imo, draught),
+            after.timestamp(),
+            pd.Timedelta(min_duration).total_seconds(),
+        )
+        if window is None:
+            return None
+        start, end = from_epoch_seconds(window, tz=after.tz)
+        return start, end
+
+    def get_daylight_windows(
+        self, unlocode: str, arrival_time: pd.Timestamp, days: int = 14
+    ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        return self._daylight_windows(self.snapshot, unlocode, arrival_time, days)
+
+    def _daylight_windows(
+        self,
+        snapshot: TideSnapshot,
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int,
+    ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        daylight_windows = snapshot.daylight_table.windows(unlocode, arrival_time, days)
+        if daylight_windows is None:
+            port = self.ports_dispatcher[unlocode]
+            daylight_windows = get_daylight_windows_corrected(
+                port.latitude, port.longitude, arrival_time, days
+            )
+        return daylight_windows
 
     def get_combined_windows(
-        self, imo: int, unlocode: str, arrival_time: pd.Timestamp, days: int = 14
-    ):
-        tidal_windows, time_range, total_depths = self.get_tidal_windows(
-            imo, unlocode, arrival_time
+        self,
+        imo: Optional[int],
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int = 14,
+        draught: Optional[float] = None,
+    ) -> CombinedWindowsResult:
+        snapshot = self.snapshot
+        draught = self.draught(imo, draught)
+        return self._combined_windows(snapshot, draught, unlocode, arrival_time, days)
+
+    def _combined_windows(
+        self,
+        snapshot: TideSnapshot,
+        draught: float,
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int,
+    ) -> CombinedWindowsResult:
+        restrictions = self.restrictions(unlocode)
+        return self._cached(
+            snapshot,
+            (
+                "combined",
+                unlocode,
+                draught,
+                arrival_time,
+                _tz(arrival_time),
+                days,
+                restrictions,
+            ),
+            lambda: self._compute_combined_windows(
+                snapshot, draught, unlocode, arrival_time, days, restrictions
+            ),
         )
 
-        port = self.ports_dispatcher[unlocode]
-        daylight_windows = get_daylight_windows_corrected(
-            port.latitude, port.longitude, arrival_time, days
+    def _compute_combined_windows(
+        self,
+        snapshot: TideSnapshot,
+        draught: float,
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int,
+        restrictions: Sequence[Layer] = DEFAULT_RESTRICTIONS,
+    ) -> CombinedWindowsResult:
+        # The port's restriction layers, evaluated until nothing is left, so
+        # the tidal or daylight windows are empty when they were not needed.
+        query = RestrictionQuery(unlocode, draught, arrival_time, days)
+        tidal_results: List[TidalWindowsResult] = []
+        fetched: Dict[str, List[Tuple[pd.Timestamp, pd.Timestamp]]] = {}
+
+        def source(kind: str, query: RestrictionQuery):
+            if kind == "tidal":
+                tidal_results.append(
+                    self._tidal_windows(snapshot, draught, unlocode, arrival_time, days)
+                )
+                fetched[kind] = tidal_results[0].tidal_windows
+            else:
+                fetched[kind] = self._daylight_windows(
+                    snapshot, unlocode, arrival_time, days
+                )
+            return fetched[kind]
+
+        combined_windows = None
+        if tuple(restrictions) == DEFAULT_RESTRICTIONS:
+            combined_windows = self._lookup(
+                snapshot, "combined_windows", draught, unlocode, arrival_time, days
+            )
+        if combined_windows is not None:
+            for kind in ("tidal", "daylight"):
+                source(kind, query)
+        else:
+            combined_windows = self._restrict(restrictions, query, source)
+
+        tidal_result = tidal_results[0] if tidal_results else None
+        return CombinedWindowsResult(
+            unlocode=unlocode,
+            draught=draught,
+            arrival_time=arrival_time,
+            days=days,
+            combined_windows=combined_windows,
+            tidal_windows=fetched.get("tidal", []),
+            daylight_windows=fetched.get("daylight", []),
+            time_range=None if tidal_result is None else tidal_result.time_range,
+            total_depths=None if tidal_result is None else tidal_result.total_depths,
+            resolution=self.resolution,
+            tide_store=snapshot.tide_store,
         )
 
-        formatted_daylight_windows = format_windows(daylight_windows)
+    def _restrict(
+        self, restrictions: Sequence[Layer], query: RestrictionQuery, source
+    ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        evaluation = evaluate(restrictions, query, source)
+        return evaluation.windows.to_windows(tz=pd.Timestamp(query.arrival_time).tz)
+
+    def get_tidal_windows_sweep(
+        self,
+        imo: Optional[int],
+        unlocode: str,
+        arrival_times: Sequence[pd.Timestamp],
+        days: int = 14,
+        draught: Optional[float] = None,
+    ) -> List[TidalWindowsResult]:
+        # get_tidal_windows for every arrival time, at about the cost of one.
+        snapshot = self.snapshot
+        draught = self.draught(imo, draught)
+        slices = self._sweep(snapshot, draught, unlocode, arrival_times, days)
+        return [
+            TidalWindowsResult(
+                unlocode=unlocode,
+                draught=draught,
+                arrival_time=arrival_time,
+                tidal_windows=piece.tidal_windows,
+                time_range=piece.time_range,
+                total_depths=piece.total_depths,
+                days=days,
+                resolution=self.resolution,
+                tide_store=snapshot.tide_store,
+            )
+            for arrival_time, piece in zip(pd.DatetimeIndex(arrival_times), slices)
+        ]
+
+    def get_combined_windows_sweep(
+        self,
+        imo: Optional[int],
+        unlocode: str,
+        arrival_times: Sequence[pd.Timestamp],
+        days: int = 14,
+        draught: Optional[float] = None,
+    ) -> List[CombinedWindowsResult]:
+        # get_combined_windows for every arrival time. Tidal and daylight
+        # windows are combined once over the union of the horizons; an
+        # arrival's share is that cut to its own tidal horizon and daylight
+        # days, since each day's daylight lies within its UTC date. Ports with
+        # other restriction layers evaluate them per arrival on those windows.
+        snapshot = self.snapshot
+        draught = self.draught(imo, draught)
+        arrival_times = pd.DatetimeIndex(arrival_times)
+        slices = self._sweep(snapshot, draught, unlocode, arrival_times, days)
+        if not slices:
+            return []
 
-        combined_windows = combine_tidal_and_daylight_windows(
-            tidal_windows, formatted_daylight_windows
+        dates = arrival_times.to_series().dt.date.to_numpy().astype("datetime64[D]")
+        day_offsets = (dates - dates.min()).astype(np.int64)
+        daylight_windows = self._daylight_windows(
+            snapshot, unlocode, arrival_times.min(), int(day_offsets.max()) + days
         )
+        daylight_intervals = as_interval_set(daylight_windows)
+        restrictions = self.restrictions(unlocode)
 
-        self.combined_windows = combined_windows
-        self.time_range = time_range
-        self.total_depths = total_depths
-        self.tidal_windows = tidal_windows
-        self.formatted_daylight_windows = formatted_daylight_windows
+        # Arrivals on different grids have their own union of windows.
+        combined_unions: Dict[int, IntervalSet] = {}
+        results = []
+        for arrival_time, date, offset, piece in zip(
+            arrival_times, dates, day_offsets.tolist(), slices
+        ):
+            layer_windows = {
+                "tidal": piece.tidal_windows,
+                "daylight": daylight_windows[offset : offset + days],
+            }
+            if restrictions != DEFAULT_RESTRICTIONS:
+                combined_windows = self._restrict(
+                    restrictions,
+                    RestrictionQuery(unlocode, draught, arrival_time, days),
+                    lambda kind, query: layer_windows[kind],
+                )
+            else:
+                combined_union = combined_unions.get(id(piece.union_windows))
+                if combined_union is None:
+                    combined_union = piece.union_windows & daylight_intervals
+                    combined_unions[id(piece.union_windows)] = combined_union
 
-        return combined_windows
+                # Daylight by whole UTC days from the arrival's (local) date.
+                first_midnight = to_nanoseconds(date)
+                last_midnight = to_nanoseconds(date + np.timedelta64(days, "D"))
+                combined_windows = combined_union.clip(
+                    max(to_nanoseconds(arrival_time), first_midnight),
+                    min(to_nanoseconds(piece.end), last_midnight),
+                ).to_windows()
+            results.append(
+                CombinedWindowsResult(
+                    unlocode=unlocode,
+                    draught=draught,
+                    arrival_time=arrival_time,
+                    days=days,
+                    combined_windows=combined_windows,
+                    tidal_windows=layer_windows["tidal"],
+                    daylight_windows=layer_windows["daylight"],
+                    time_range=piece.time_range,
+                    total_depths=piece.total_depths,
+                    resolution=self.resolution,
+                    tide_store=snapshot.tide_store,
+                )
+            )
+        return results
 
-    def plot_tidal_windows(
+    def plan_rotation(
+        self,
+        imo: Optional[int],
+        calls: Sequence[PortCall],
+        departures: Sequence[pd.Timestamp],
+        max_wait: pd.Timedelta = pd.Timedelta(0),
+        draught: Optional[float] = None,
+    ) -> VoyagePlan:
+        # Entry times at every call of a rotation for each candidate
+        # departure, within the combined windows of each port.
+        snapshot = self.snapshot
+
+        def windows_for(unlocode, draught, first_arrival, last_arrival):
+            # Whole days from the first arrival's date to the last's, so the
+            # daylight windows cover every arrival too.
+            days = (last_arrival.normalize() - first_arrival.normalize()).days + 1
+            result = self._combined_windows(
+                snapshot, draught, unlocode, first_arrival, days
+            )
+            return as_interval_set(result.combined_windows)
+
+        return plan_rotation(
+            calls, departures, self.draught(imo, draught), windows_for, max_wait
+        )
+
+    def _sweep(
         self,
-        imo,
-        unlocode,
+        snapshot: TideSnapshot,
+        draught: float,
+        unlocode: str,
+        arrival_times: Sequence[pd.Timestamp],
+        days: int,
     ):
-        return show_plot_tidal_windows(
-            time_range=self.time_range,
-            total_depths=self.total_depths,
-            vessel_draught=self.vessels_dispatcher.get(imo).draught,
-            tidal_windows=self.tidal_windows,
-            port_name=self.ports_dispatcher.get(unlocode).name,
+        return sweep_tidal_windows(
+            draught=draught,
+            unlocode=unlocode,
+            arrival_times=pd.DatetimeIndex(arrival_times),
+            ports_dispatcher=self.ports_dispatcher,
+            tide_store=snapshot.tide_store,
+            engine=self.engine,
+            horizon=pd.Timedelta(days=days),
+            resolution=self.resolution,
+        )
+
+    def get_combined_windows_many(
+        self,
+        imos_or_draughts: Sequence[Union[int, float]],
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int = 14,
+    ) -> List[List[Tuple[pd.Timestamp, pd.Timestamp]]]:
+        # The tide curve and the daylight windows are shared by the whole fleet.
+        snapshot = self.snapshot
+        fleet_windows = self._tidal_windows_many(
+            snapshot, imos_or_draughts, unlocode, arrival_time, days
         )
 
-    def plot_combined_windows(
+        daylight_windows = self._daylight_windows(snapshot, unlocode, arrival_time, days)
+        daylight_intervals = as_interval_set(daylight_windows)
+
+        restrictions = self.restrictions(unlocode)
+        if restrictions != DEFAULT_RESTRICTIONS:
+            layer_windows = {"daylight": daylight_windows}
+            results = []
+            for index, draught in enumerate(fleet_windows.draughts):
+                layer_windows["tidal"] = fleet_windows.windows(index)
+                results.append(
+                    self._restrict(
+                        restrictions,
+                        RestrictionQuery(unlocode, float(draught), arrival_time, days),
+                        lambda kind, query: layer_windows[kind],
+                    )
+                )
+            return results
+
+        return [
+            combine_tidal_and_daylight_windows(
+                fleet_windows.windows(index), daylight_intervals
+            )
+            for index in range(len(fleet_windows.draughts))
+        ]
+
+    def _lookup(
         self,
-        imo,
-        unlocode,
+        snapshot: TideSnapshot,
+        kind: str,
+        draught: float,
+        unlocode: str,
+        arrival_time: pd.Timestamp,
+        days: int,
+    ) -> Optional[List[Tuple[pd.Timestamp, pd.Timestamp]]]:
+        # Precomputed windows, or None to compute them.
+        if snapshot.precomputed is None:
+            return None
+        windows = getattr(snapshot.precomputed, kind)(
+            unlocode, draught, arrival_time, days
+        )
+        metrics.increment(
+            "cassia_precomputed_lookups_total",
+            result="miss" if windows is None else "hit",
+        )
+        return windows
+
+    def _cached(
+        self, snapshot: TideSnapshot, key: tuple, compute: Callable[[], Any]
+    ) -> Any:
+        # Keys are (restriction type, unlocode, draught, arrival time, its time
+        # zone, horizon); the engine, resolution and tide data version complete
+        # them. Equal instants in other zones have windows in their own zone.
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute(
+            key + (self.engine, self.resolution), compute, version=snapshot.version
+        )
+
+    def plot_tidal_windows(
+        self, result: Union[TidalWindowsResult, CombinedWindowsResult]
     ):
+        from cassia.plotting import show_plot_tidal_windows
+
+        time_range, total_depths = self.depth_curve(result)
+        return show_plot_tidal_windows(
+            time_range=time_range,
+            total_depths=total_depths,
+            vessel_draught=result.draught,
+            tidal_windows=result.tidal_windows,
+            port_name=self.ports_dispatcher[result.unlocode].name,
+        )
+
+    def plot_combined_windows(self, result: CombinedWindowsResult):
+        from cassia.plotting import show_plot_combined_windows
+
+        time_range, total_depths = self.depth_curve(result)
         return show_plot_combined_windows(
-            time_range=self.time_range,
-            total_depths=self.total_depths,
-            vessel_draught=self.vessels_dispatcher.get(imo).draught,
-            tidal_windows=self.tidal_windows,
-            daylight_windows=self.formatted_daylight_windows,
-            combined_windows=self.combined_windows,
-            port_name=self.ports_dispatcher.get(unlocode).name,
+            time_range=time_range,
+            total_depths=total_depths,
+            vessel_draught=result.draught,
+            tidal_windows=result.tidal_windows,
+            daylight_windows=result.daylight_windows,
+            combined_windows=result.combined_windows,
+            port_name=self.ports_dispatcher[result.unlocode].name,
         )
+
+    def render(
+        self,
+        result: Union[TidalWindowsResult, CombinedWindowsResult],
+        fmt: str = "png",
+    ) -> bytes:
+        # The plot of ``result`` as PNG or SVG bytes, without pyplot.
+        from cassia.rendering import render_job
+
+        return render_job(self.render_job(result, fmt))
+
+    def render_job(
+        self,
+        result: Union[TidalWindowsResult, CombinedWindowsResult],
+        fmt: str = "png",
+    ):
+        # A picklable description of the plot, for cassia.rendering.render_many.
+        from cassia.rendering import RenderJob
+
+        time_range, total_depths = self.depth_curve(result)
+        combined = isinstance(result, CombinedWindowsResult)
+        return RenderJob(
+            kind="combined" if combined else "tidal",
+            time_range=time_range,
+            total_depths=total_depths,
+            vessel_draught=result.draught,
+            port_name=self.ports_dispatcher[result.unlocode].name,
+            tidal_windows=result.tidal_windows,
+            daylight_windows=result.daylight_windows if combined else None,
+            combined_windows=result.combined_windows if combined else None,
+            fmt=fmt,
+        )
+
+    def depth_curve(
+        self, result: Union[TidalWindowsResult, CombinedWindowsResult]
+    ) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+        # The analytic engine skips the minute grid; build it only when asked,
+        # from the tide data the windows were computed from.
+        if result.time_range is None:
+            return calculate_depth_curve(
+                self.ports_dispatcher[result.unlocode],
+                result.arrival_time,
+                result.tide_store or self.tide_store,
+                horizon=pd.Timedelta(days=result.days),
+                resolution=result.resolution,
+            )
+        return result.time_range, result.total_depths
+
+
+def _tz(arrival_time) -> str:
+    return str(pd.Timestamp(arrival_time).tz)
@@ -1,30 +1,109 @@
+import numpy as np
 import pandas as pd  # type:ignore
-from astral import LocationInfo
-from astral.sun import sun
-from datetime import timedelta, datetime
-from typing import List, Tuple
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from cassia.intervals import IntervalSet, as_interval_set
+from cassia.metrics import metrics
+from cassia.solar import NAT, sunrise_sunset
 
 
 def get_daylight_windows_corrected(
     latitude: float, longitude: float, start_date: pd.Timestamp, days: int = 14
 ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
-    location = LocationInfo(latitude=latitude, longitude=longitude)
+    dates = np.datetime64(pd.Timestamp(start_date).date(), "D") + np.arange(
+        days, dtype="timedelta64[D]"
+    )
+    with metrics.stage("daylight.solar"):
+        sunrises, sunsets = sunrise_sunset(latitude, longitude, dates)
+    window_starts, window_ends = daylight_bounds(sunrises, sunsets)
+
+    with metrics.stage("daylight.datetime_conversion"):
+        return to_windows(window_starts, window_ends)
+
 
-    daylight_windows = []
+def daylight_bounds(
+    sunrises: np.ndarray, sunsets: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Sunrise and sunset on the same UTC date can come in either order; the
+    # window always runs from the earlier to the later one.
+    missing = (sunrises == NAT) | (sunsets == NAT)
+    window_starts = np.where(missing, NAT, np.minimum(sunrises, sunsets))
+    window_ends = np.where(missing, NAT, np.maximum(sunrises, sunsets))
+    return window_starts, window_ends
+
+
+def to_windows(
+    window_starts: np.ndarray, window_ends: np.ndarray
+) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+    if (window_starts == NAT).any():
+        raise ValueError(
+            "The sun does not rise and set on every day of the horizon at this location."
+        )
+    return list(
+        zip(
+            pd.DatetimeIndex(window_starts.astype("datetime64[ns]")),
+            pd.DatetimeIndex(window_ends.astype("datetime64[ns]")),
+        )
+    )
 
-    for i in range(days):
-        current_date = start_date + timedelta(days=i)
-        s = sun(location.observer, date=current_date.date())
 
-        sunrise = s["sunrise"].replace(tzinfo=None)
-        sunset = s["sunset"].replace(tzinfo=None)
+class DaylightTable:
+    """Daylight windows per port and UTC date, precomputed over a date range."""
 
-        if sunrise > sunset:
-            sunrise, sunset = sunset, sunrise
+    def __init__(
+        self,
+        unlocodes: Sequence[str],
+        first_date: np.datetime64,
+        window_starts: np.ndarray,
+        window_ends: np.ndarray,
+    ) -> None:
+        self.unlocodes: List[str] = list(unlocodes)
+        self.codes: Dict[str, int] = {
+            unlocode: code for code, unlocode in enumerate(self.unlocodes)
+        }
+        self.first_date = np.datetime64(first_date, "D")
+        self.window_starts = window_starts
+        self.window_ends = window_ends
 
-        daylight_windows.append((sunrise, sunset))
+    @classmethod
+    def build(
+        cls, ports_dispatcher, first_date: np.datetime64, last_date: np.datetime64
+    ) -> "DaylightTable":
+        unlocodes = list(ports_dispatcher)
+        latitudes = np.array([ports_dispatcher[u].latitude for u in unlocodes])
+        longitudes = np.array([ports_dispatcher[u].longitude for u in unlocodes])
+        dates = np.arange(
+            np.datetime64(first_date, "D"), np.datetime64(last_date, "D") + np.timedelta64(1, "D")
+        )
 
-    return daylight_windows
+        sunrises, sunsets = sunrise_sunset(
+            latitudes[:, np.newaxis], longitudes[:, np.newaxis], dates[np.newaxis, :]
+        )
+        window_starts, window_ends = daylight_bounds(sunrises, sunsets)
+        return cls(unlocodes, first_date, window_starts, window_ends)
+
+    @property
+    def days(self) -> int:
+        return self.window_starts.shape[1]
+
+    def windows(
+        self, unlocode: str, start_date: pd.Timestamp, days: int = 14
+    ) -> Optional[List[Tuple[pd.Timestamp, pd.Timestamp]]]:
+        # None when the port or any of the dates is outside the table.
+        code = self.codes.get(unlocode)
+        offset = int(
+            (np.datetime64(pd.Timestamp(start_date).date(), "D") - self.first_date)
+            / np.timedelta64(1, "D")
+        )
+        if code is None or offset < 0 or offset + days > self.days:
+            return None
+
+        with metrics.stage("daylight.table_lookup"):
+            return to_windows(
+                self.window_starts[code, offset : offset + days],
+                self.window_ends[code, offset : offset + days],
+            )
 
 
 def format_windows(
@@ -37,17 +116,11 @@ def format_windows(
 
 
 def combine_tidal_and_daylight_windows(
-    tidal_windows: List[Tuple[pd.Timestamp, pd.Timestamp]],
-    daylight_windows: List[Tuple[pd.Timestamp, pd.Timestamp]],
+    tidal_windows: Union[IntervalSet, List[Tuple[pd.Timestamp, pd.Timestamp]]],
+    daylight_windows: Union[IntervalSet, List[Tuple[pd.Timestamp, pd.Timestamp]]],
 ) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
-    combined_windows = []
-
-    for tidal_start, tidal_end in tidal_windows:
-        for daylight_start, daylight_end in daylight_windows:
-            overlap_start = max(tidal_start, daylight_start)
-            overlap_end = min(tidal_end, daylight_end)
-
-            if overlap_start < overlap_end:
-                combined_windows.append((overlap_start, overlap_end))
+    with metrics.stage("combine"):
+        tidal_intervals = as_interval_set(tidal_windows)
+        combined_intervals = tidal_intervals & as_interval_set(daylight_windows)
 
-    return combined_windows
+        return combined_intervals.to_windows(tz=tidal_intervals.tz)
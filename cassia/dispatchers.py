@@ -1,16 +1,17 @@
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 import pandas as pd  # type: ignore
 
 from pathlib import Path
 
+if TYPE_CHECKING:
+    from cassia.registry import PortRegistry, VesselRegistry
 
 current_dir = Path(__file__).resolve().parent
 
 vessels_csv_path = current_dir / "../assets/vessels.csv"
 ports_csv_path = current_dir / "../assets/ports.csv"
-vessel_df = pd.read_csv(vessels_csv_path.resolve())
-port_df = pd.read_csv(ports_csv_path.resolve())
 
 
 @dataclass
@@ -21,12 +22,10 @@ class Vessel:
     dwt: float
 
 
-vessels_dispatcher = {
-    row["IMO"]: Vessel(
-        imo=row["IMO"], draught=row["DRAUGHT"], name=row["NAME"], dwt=row["DWT"]
-    )
-    for _, row in vessel_df.iterrows()
-}
+def load_vessels(vessels_csv: Path = vessels_csv_path) -> "VesselRegistry":
+    from cassia.registry import VesselRegistry
+
+    return VesselRegistry.from_csv(Path(vessels_csv).resolve())
 
 
 @dataclass
@@ -37,12 +36,23 @@ class Port:
     approach_mllw_meters: float
 
 
-ports_dispatcher = {
-    row["UNLOCODE"]: Port(
-        name=row["NAME"],
-        latitude=row["LATITUDE"],
-        longitude=row["LONGITUDE"],
-        approach_mllw_meters=row["APPROACH_MLLW_METERS"],
-    )
-    for _, row in port_df.iterrows()
+def load_ports(ports_csv: Path = ports_csv_path) -> "PortRegistry":
+    from cassia.registry import PortRegistry
+
+    return PortRegistry.from_csv(Path(ports_csv).resolve())
+
+
+# The module-level datasets are read on first access rather than at import.
+_LOADERS = {
+    "vessel_df": lambda: pd.read_csv(vessels_csv_path.resolve()),
+    "port_df": lambda: pd.read_csv(ports_csv_path.resolve()),
+    "vessels_dispatcher": load_vessels,
+    "ports_dispatcher": load_ports,
 }
+
+
+def __getattr__(name: str):
+    if name not in _LOADERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = _LOADERS[name]()
+    return value
@@ -0,0 +1,193 @@
+"""Segment tree over a port's depth curve, for queries across many draughts.
+
+The depth curve is piecewise linear between the tide extremes, so each of its
+segments spans the depths between its two ends. The tree keeps the minimum
+and maximum of every run of segments: a window query for draught ``d`` only
+descends into runs whose range straddles ``d``, and solves crossings on
+those segments alone, in O(log n + k) for k crossings. Between two such
+segments the curve stays entirely above or below ``d``, so dropping the
+extremes there leaves the windows unchanged: they are exactly those of the
+analytic engine.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from cassia.helpers import from_epoch_seconds
+from cassia.interpolation import (
+    FleetTidalWindows,
+    depth_knots,
+    interpolate_linear,
+    solve_crossings_many,
+)
+
+FIRST_WINDOW_SPAN = 86_400.0  # Seconds searched first by first_window, then doubled
+
+
+class DraughtIndex:
+    def __init__(self, epochs: np.ndarray, depths: np.ndarray) -> None:
+        self.epochs = np.asarray(epochs, dtype=np.float64)
+        self.depths = np.asarray(depths, dtype=np.float64)
+
+        # Leaf i is segment i, from extreme i to i + 1; node j has children
+        # 2j and 2j + 1. Padding leaves never straddle anything.
+        segments = max(len(self.epochs) - 1, 0)
+        size = 1
+        while size < segments:
+            size *= 2
+        self._size = size
+        self._min = np.full(2 * size, np.inf)
+        self._max = np.full(2 * size, -np.inf)
+        self._min[size : size + segments] = np.minimum(self.depths[:-1], self.depths[1:])
+        self._max[size : size + segments] = np.maximum(self.depths[:-1], self.depths[1:])
+
+        level = size
+        while level > 1:
+            self._min[level // 2 : level] = np.minimum(
+                self._min[level : 2 * level : 2], self._min[level + 1 : 2 * level : 2]
+            )
+            self._max[level // 2 : level] = np.maximum(
+                self._max[level : 2 * level : 2], self._max[level + 1 : 2 * level : 2]
+            )
+            level //= 2
+
+    @classmethod
+    def for_port(cls, port, tide_store) -> "DraughtIndex":
+        epochs, heights = tide_store.get(port.name)
+        return cls(epochs, port.approach_mllw_meters + heights)
+
+    @property
+    def span(self) -> Tuple[float, float]:
+        return float(self.epochs[0]), float(self.epochs[-1])
+
+    def windows(
+        self, draught: float, start: float, end: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Window starts and ends (epoch seconds) where depth > draught.
+        knot_epochs, knot_depths = self._knots(draught, start, end)
+        _, window_starts, window_ends = solve_crossings_many(
+            knot_epochs, knot_depths, np.array([draught], dtype=np.float64)
+        )
+        return window_starts, window_ends
+
+    def fleet_windows(
+        self, draughts: Sequence[float], start: float, end: float, tz=None
+    ) -> FleetTidalWindows:
+        draughts = np.asarray(draughts, dtype=np.float64)
+        per_draught = [self.windows(draught, start, end) for draught in draughts]
+        vessel_index = np.repeat(
+            np.arange(len(draughts)), [len(starts) for starts, _ in per_draught]
+        )
+        window_starts = np.concatenate([[]] + [starts for starts, _ in per_draught])
+        window_ends = np.concatenate([[]] + [ends for _, ends in per_draught])
+        return FleetTidalWindows(
+            draughts=draughts,
+            vessel_index=vessel_index,
+            start=from_epoch_seconds(window_starts, tz=tz),
+            end=from_epoch_seconds(window_ends, tz=tz),
+        )
+
+    def max_draught(self, start: float, end: float) -> float:
+        # The shallowest depth over [start, end]: any smaller draught can
+        # navigate throughout, since windows need depth > draught.
+        bounds = interpolate_linear(
+            self.epochs, self.depths, np.array([start, end], dtype=np.float64)
+        )
+        first = int(np.searchsorted(self.epochs, start, side="right"))
+        last = int(np.searchsorted(self.epochs, end, side="left")) - 1
+        shallowest = float(bounds.min())
+        if first == last:
+            shallowest = min(shallowest, float(self.depths[first]))
+        elif first < last:
+            # Segments first..last - 1 hold exactly the extremes first..last.
+            shallowest = min(shallowest, self._range_min(first, last - 1))
+        return shallowest
+
+    def first_window(
+        self,
+        draught: float,
+        after: float,
+        min_duration: float,
+        until: Optional[float] = None,
+    ) -> Optional[Tuple[float, float]]:
+        # The first window from ``after`` lasting at least ``min_duration``
+        # seconds, searching a doubling span up to ``until`` (by default the
+        # last tide extreme).
+        until = self.span[1] if until is None else until
+        span = FIRST_WINDOW_SPAN
+        while True:
+            end = min(after + span, until)
+            window_starts, window_ends = self.windows(draught, after, end)
+            for window_start, window_end in zip(window_starts, window_ends):
+                if window_end - window_start < min_duration:
+                    continue
+                if window_end < end or end >= until:
+                    return float(window_start), float(window_end)
+                break  # Long enough, but may run on past the searched span
+            if end >= until:
+                return None
+            span *= 2
+
+    def _knots(
+        self, draught: float, start: float, end: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self.epochs) < 2:
+            return depth_knots(self.epochs, self.depths, start, end)
+
+        # The segments holding start and end are always kept, so the curve
+        # between them and the bounds is the original one.
+        last = len(self.epochs) - 2
+        lo = min(max(int(np.searchsorted(self.epochs, start, side="right")) - 1, 0), last)
+        hi = min(max(int(np.searchsorted(self.epochs, end, side="left")) - 1, 0), last)
+        segments = np.array(self._straddling(draught, lo, hi) + [lo, hi])
+        extremes = np.unique(np.concatenate((segments, segments + 1)))
+
+        extreme_epochs = self.epochs[extremes]
+        inside = (extreme_epochs > start) & (extreme_epochs < end)
+        knot_epochs = np.concatenate(([start], extreme_epochs[inside], [end]))
+        knot_depths = np.concatenate(
+            (
+                interpolate_linear(self.epochs, self.depths, np.array([start])),
+                self.depths[extremes][inside],
+                interpolate_linear(self.epochs, self.depths, np.array([end])),
+            )
+        )
+        return knot_epochs, knot_depths
+
+    def _straddling(self, draught: float, lo: int, hi: int) -> List[int]:
+        # Segments in [lo, hi] whose depths range over the draught, i.e. the
+        # ones the depth curve may cross it in.
+        found = []
+        stack = [(1, 0, self._size - 1)]
+        while stack:
+            node, left, right = stack.pop()
+            if (
+                right < lo
+                or left > hi
+                or self._min[node] > draught
+                or self._max[node] <= draught
+            ):
+                continue
+            if node >= self._size:
+                found.append(node - self._size)
+                continue
+            middle = (left + right) // 2
+            stack.append((2 * node + 1, middle + 1, right))
+            stack.append((2 * node, left, middle))
+        return found
+
+    def _range_min(self, lo: int, hi: int) -> float:
+        shallowest = np.inf
+        lo += self._size
+        hi += self._size + 1
+        while lo < hi:
+            if lo & 1:
+                shallowest = min(shallowest, self._min[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                shallowest = min(shallowest, self._min[hi])
+            lo //= 2
+            hi //= 2
+        return float(shallowest)
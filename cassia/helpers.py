@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd  # type:ignore
 
 from pathlib import Path
@@ -11,3 +12,22 @@ tide_heights_csv_path = current_dir / "../assets/tide_heights.csv"
 def get_tide_data():
     tide_heights_df = pd.read_csv(tide_heights_csv_path)
     return tide_heights_df
+
+
+def to_epoch_seconds(datetimes) -> np.ndarray:
+    # Vectorised equivalent of calling ``Timestamp.timestamp()`` on every value:
+    # naive datetimes are read as UTC, aware ones are converted to UTC first.
+    datetimes = pd.DatetimeIndex(pd.to_datetime(datetimes))
+    if datetimes.tz is not None:
+        datetimes = datetimes.tz_convert(None)
+    return datetimes.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+
+
+def from_epoch_seconds(epoch_seconds, tz=None) -> pd.DatetimeIndex:
+    # Inverse of to_epoch_seconds, rounded to the nanosecond. Naive unless a
+    # timezone is given, in which case the UTC instants are converted to it.
+    nanoseconds = np.round(np.asarray(epoch_seconds, dtype=np.float64) * 1e9)
+    datetimes = pd.DatetimeIndex(nanoseconds.astype(np.int64).astype("datetime64[ns]"))
+    if tz is not None:
+        datetimes = datetimes.tz_localize("UTC").tz_convert(tz)
+    return datetimes
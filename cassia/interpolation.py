@@ -1,6 +1,29 @@
+import numpy as np
 import pandas as pd  # type:ignore
-from scipy.interpolate import interp1d  # type:ignore
-from typing import List, Tuple
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from cassia.helpers import from_epoch_seconds, to_epoch_seconds
+from cassia.metrics import metrics
+from cassia.tide_store import TideStore
+
+ENGINES = ("grid", "analytic")
+
+HORIZON = pd.Timedelta(days=14)
+RESOLUTION = pd.Timedelta(minutes=1)  # Spacing of the grid engine's depth curve
+CHUNK = pd.Timedelta(days=1)  # Span computed at a time by iter_tidal_windows
+
+
+class FleetTidalWindows(NamedTuple):
+    """Tidal windows for many draughts at one port, one row per window."""
+
+    draughts: np.ndarray
+    vessel_index: np.ndarray
+    start: pd.DatetimeIndex
+    end: pd.DatetimeIndex
+
+    def windows(self, index: int) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        rows = self.vessel_index == index
+        return list(zip(self.start[rows], self.end[rows]))
 
 
 def calculate_tidal_windows(
@@ -9,45 +32,334 @@ def calculate_tidal_windows(
     arrival_time: pd.Timestamp,
     vessels_dispatcher,
     ports_dispatcher,
-    tide_heights_df,
-) -> Tuple[List[Tuple[pd.Timestamp, pd.Timestamp]], pd.DatetimeIndex, List[float]]:
+    tide_store: TideStore,
+    engine: str = "grid",
+    horizon: pd.Timedelta = HORIZON,
+    resolution: pd.Timedelta = RESOLUTION,
+) -> Tuple[
+    List[Tuple[pd.Timestamp, pd.Timestamp]],
+    Optional[pd.DatetimeIndex],
+    Optional[np.ndarray],
+]:
     vessel = vessels_dispatcher[imo]
+
+    fleet_windows, time_range, total_depths = calculate_fleet_tidal_windows(
+        draughts=[vessel.draught],
+        unlocode=unlocode,
+        arrival_time=arrival_time,
+        ports_dispatcher=ports_dispatcher,
+        tide_store=tide_store,
+        engine=engine,
+        horizon=horizon,
+        resolution=resolution,
+    )
+    tidal_windows = list(zip(fleet_windows.start, fleet_windows.end))
+
+    return tidal_windows, time_range, total_depths
+
+
+def calculate_fleet_tidal_windows(
+    draughts: Sequence[float],
+    unlocode: str,
+    arrival_time: pd.Timestamp,
+    ports_dispatcher,
+    tide_store: TideStore,
+    engine: str = "grid",
+    horizon: pd.Timedelta = HORIZON,
+    resolution: pd.Timedelta = RESOLUTION,
+) -> Tuple[FleetTidalWindows, Optional[pd.DatetimeIndex], Optional[np.ndarray]]:
+    # The port's depth curve is built once and compared against every draught.
+    check_engine(engine)
+
     port = ports_dispatcher[unlocode]
+    draughts = np.asarray(draughts, dtype=np.float64)
+
+    if engine == "analytic":
+        # Windows are solved exactly from the tide extremes; the minute grid
+        # is left for callers that need it (see calculate_depth_curve).
+        arrival_time = pd.Timestamp(arrival_time)
+        fleet_windows = analytic_windows(
+            port,
+            tide_store,
+            draughts,
+            arrival_time.timestamp(),
+            (arrival_time + horizon).timestamp(),
+            tz=arrival_time.tz,
+        )
+        return fleet_windows, None, None
+
+    time_range, total_depths = calculate_depth_curve(
+        port, arrival_time, tide_store, horizon, resolution
+    )
+    return grid_windows(time_range, total_depths, draughts), time_range, total_depths
+
+
+def iter_tidal_windows(
+    draught: float,
+    unlocode: str,
+    arrival_time: pd.Timestamp,
+    ports_dispatcher,
+    tide_store: TideStore,
+    engine: str = "grid",
+    horizon: pd.Timedelta = HORIZON,
+    resolution: pd.Timedelta = RESOLUTION,
+    chunk: pd.Timedelta = CHUNK,
+) -> Iterator[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Yield one draught's tidal windows in time order, a chunk at a time.
+
+    Only one chunk of the depth curve is held in memory, however long the
+    horizon. Consecutive chunks share their boundary point, so a window
+    running across it is yielded once, whole.
+    """
+    check_engine(engine)
+    port = ports_dispatcher[unlocode]
+    tide_store.port_code(port.name)
+    arrival_time = pd.Timestamp(arrival_time)
+    draughts = np.array([draught], dtype=np.float64)
+
+    if engine == "analytic":
+        chunk_count = max(int(np.ceil(horizon / chunk)), 1)
+        bounds = [
+            (arrival_time + min(index * chunk, horizon)).timestamp()
+            for index in range(chunk_count + 1)
+        ]
+        chunks = (
+            analytic_windows(port, tide_store, draughts, start, end, arrival_time.tz)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        )
+    else:
+        last = grid_points(horizon, resolution) - 1
+        step = max(chunk // resolution, 1)
+        chunks = (
+            grid_windows(
+                *depth_curve(
+                    port,
+                    pd.date_range(
+                        start=arrival_time + first * resolution,
+                        periods=min(first + step, last) - first + 1,
+                        freq=resolution,
+                    ),
+                    tide_store,
+                ),
+                draughts,
+            )
+            for first in range(0, max(last, 1), step)
+        )
+
+    # Validation above runs on the call; the chunks only when iterated.
+    return merge_chunk_windows(chunks)
+
 
-    approach_depth = port.approach_mllw_meters
+def merge_chunk_windows(
+    chunks: Iterator[FleetTidalWindows],
+) -> Iterator[Tuple[pd.Timestamp, pd.Timestamp]]:
+    pending = None
+    for fleet_windows in chunks:
+        for start, end in zip(fleet_windows.start, fleet_windows.end):
+            if pending is not None and start == pending[1]:
+                pending = (pending[0], end)
+                continue
+            if pending is not None:
+                yield pending
+            pending = (start, end)
+    if pending is not None:
+        yield pending
 
-    port_tide_data = tide_heights_df[tide_heights_df["PORT_NAME"] == port.name]
-    port_tide_data["TIDE_DATETIME"] = pd.to_datetime(port_tide_data["TIDE_DATETIME"])
-    port_tide_data = port_tide_data.sort_values(by="TIDE_DATETIME")
-    port_tide_data["TIMESTAMP"] = port_tide_data["TIDE_DATETIME"].apply(
-        lambda x: x.timestamp()
+
+def check_engine(engine: str) -> None:
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}.")
+
+
+def grid_points(horizon: pd.Timedelta, resolution: pd.Timedelta) -> int:
+    if resolution <= pd.Timedelta(0) or horizon < resolution:
+        raise ValueError(
+            f"resolution must be positive and no longer than the horizon, "
+            f"got {resolution} for a {horizon} horizon."
+        )
+    return int(horizon // resolution)
+
+
+def grid_windows(
+    time_range: pd.DatetimeIndex, total_depths: np.ndarray, draughts: np.ndarray
+) -> FleetTidalWindows:
+    # Windows are runs of grid points deeper than the draught, from the
+    # first to the last point of the run.
+    with metrics.stage("tidal.window_extraction"):
+        can_navigate = total_depths[np.newaxis, :] > draughts[:, np.newaxis]
+
+        edges = np.diff(
+            np.pad(can_navigate.astype(np.int8), ((0, 0), (1, 1))), axis=1
+        )
+        vessel_index, window_starts = np.nonzero(edges == 1)
+        _, window_ends = np.nonzero(edges == -1)
+
+        return FleetTidalWindows(
+            draughts=draughts,
+            vessel_index=vessel_index,
+            start=time_range[window_starts],
+            end=time_range[window_ends - 1],
+        )
+
+
+def analytic_windows(
+    port,
+    tide_store: TideStore,
+    draughts: np.ndarray,
+    start: float,
+    end: float,
+    tz=None,
+) -> FleetTidalWindows:
+    with metrics.stage("tidal.tide_lookup"):
+        tide_epochs, tide_heights = tide_store.window(port.name, start, end)
+    with metrics.stage("tidal.window_extraction"):
+        knot_epochs, knot_depths = depth_knots(
+            tide_epochs, port.approach_mllw_meters + tide_heights, start, end
+        )
+        vessel_index, window_starts, window_ends = solve_crossings_many(
+            knot_epochs, knot_depths, draughts
+        )
+    with metrics.stage("tidal.datetime_conversion"):
+        return FleetTidalWindows(
+            draughts=draughts,
+            vessel_index=vessel_index,
+            start=from_epoch_seconds(window_starts, tz=tz),
+            end=from_epoch_seconds(window_ends, tz=tz),
+        )
+
+
+def calculate_depth_curve(
+    port,
+    arrival_time: pd.Timestamp,
+    tide_store: TideStore,
+    horizon: pd.Timedelta = HORIZON,
+    resolution: pd.Timedelta = RESOLUTION,
+) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    with metrics.stage("tidal.datetime_conversion"):
+        time_range = pd.date_range(
+            start=arrival_time, periods=grid_points(horizon, resolution), freq=resolution
+        )
+    return depth_curve(port, time_range, tide_store)
+
+
+def depth_curve(
+    port, time_range: pd.DatetimeIndex, tide_store: TideStore
+) -> Tuple[pd.DatetimeIndex, np.ndarray]:
+    with metrics.stage("tidal.datetime_conversion"):
+        time_stamps = to_epoch_seconds(time_range)
+
+    with metrics.stage("tidal.tide_lookup"):
+        tide_epochs, tide_heights = tide_store.window(
+            port.name, time_stamps[0], time_stamps[-1]
+        )
+
+    # scipy is only needed for the minute grid; import it on first use.
+    from scipy.interpolate import interp1d  # type:ignore
+
+    with metrics.stage("tidal.interpolation"):
+        interpolation_function = interp1d(
+            tide_epochs,
+            tide_heights,
+            kind="linear",
+            fill_value="extrapolate",
+        )
+        interpolated_tide_heights = interpolation_function(time_stamps)
+
+    total_depths = port.approach_mllw_meters + interpolated_tide_heights
+    return time_range, total_depths
+
+
+def depth_knots(
+    epochs: np.ndarray, depths: np.ndarray, start: float, end: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    # The breakpoints of the piecewise-linear depth curve over [start, end]:
+    # the horizon bounds plus every extreme strictly inside it.
+    inside = (epochs > start) & (epochs < end)
+    knot_epochs = np.concatenate(([start], epochs[inside], [end]))
+    knot_depths = np.concatenate(
+        (
+            interpolate_linear(epochs, depths, np.array([start])),
+            depths[inside],
+            interpolate_linear(epochs, depths, np.array([end])),
+        )
     )
+    return knot_epochs, knot_depths
+
+
+def interpolate_linear(
+    epochs: np.ndarray, values: np.ndarray, at: np.ndarray
+) -> np.ndarray:
+    # np.interp with the same linear extrapolation interp1d(fill_value="extrapolate") does.
+    interpolated = np.interp(at, epochs, values)
+    if len(epochs) < 2:
+        return interpolated
+
+    before = at < epochs[0]
+    after = at > epochs[-1]
+    first_slope = (values[1] - values[0]) / (epochs[1] - epochs[0])
+    last_slope = (values[-1] - values[-2]) / (epochs[-1] - epochs[-2])
+    interpolated[before] = values[0] + (at[before] - epochs[0]) * first_slope
+    interpolated[after] = values[-1] + (at[after] - epochs[-1]) * last_slope
+    return interpolated
 
-    interpolation_function = interp1d(
-        port_tide_data["TIMESTAMP"],
-        port_tide_data["TIDE_HEIGHT_MT"],
-        kind="linear",
-        fill_value="extrapolate",
+
+def solve_crossings(
+    knot_epochs: np.ndarray, knot_depths: np.ndarray, draught: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    _, window_starts, window_ends = solve_crossings_many(
+        knot_epochs, knot_depths, np.array([draught], dtype=np.float64)
     )
+    return window_starts, window_ends
 
-    time_range = pd.date_range(start=arrival_time, periods=14 * 24 * 60, freq="min")
-    time_stamps = time_range.map(lambda x: x.timestamp())
-    interpolated_tide_heights = interpolation_function(time_stamps)
 
-    total_depths = approach_depth + interpolated_tide_heights
-    can_navigate = total_depths > vessel.draught
+def solve_crossings_many(
+    knot_epochs: np.ndarray, knot_depths: np.ndarray, draughts: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Windows where depth > draught for every draught at once, solving each
+    # threshold crossing exactly on the linear segment it falls in. Returns
+    # (draught index, start, end) arrays ordered by draught, then time.
+    thresholds = draughts[:, np.newaxis]
+    navigable = knot_depths[np.newaxis, :] > thresholds
 
-    tidal_windows = []
-    window_start = None
+    t0, t1 = knot_epochs[:-1], knot_epochs[1:]
+    d0, d1 = knot_depths[:-1], knot_depths[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_epochs = t0 + (thresholds - d0) * (t1 - t0) / (d1 - d0)
+    crossing_epochs = np.where(d1 == thresholds, t1, crossing_epochs)
 
-    for i in range(len(can_navigate)):
-        if can_navigate[i] and window_start is None:
-            window_start = time_range[i]
-        elif not can_navigate[i] and window_start is not None:
-            tidal_windows.append((window_start, time_range[i - 1]))
-            window_start = None
+    last = knot_epochs.size - 1
+    rising = ~navigable[:, :-1] & navigable[:, 1:]
+    falling = navigable[:, :-1] & ~navigable[:, 1:]
 
-    if window_start is not None:
-        tidal_windows.append((window_start, time_range[-1]))
+    # Rows open at the horizon start/end get a boundary start/end; the rest
+    # open and close at their crossings. Both lists come out row-major, so
+    # the n-th start of a row pairs with its n-th end.
+    start_rows, start_segments = np.nonzero(
+        np.concatenate((navigable[:, :1], rising), axis=1)
+    )
+    end_rows, end_segments = np.nonzero(
+        np.concatenate((falling, navigable[:, -1:]), axis=1)
+    )
+    window_starts = np.where(
+        start_segments == 0,
+        knot_epochs[0],
+        crossing_epochs[start_rows, np.maximum(start_segments - 1, 0)],
+    )
+    window_ends = np.where(
+        end_segments == last,
+        knot_epochs[-1],
+        crossing_epochs[end_rows, np.minimum(end_segments, last - 1)],
+    )
 
-    return tidal_windows, time_range, total_depths
+    # An extreme that only touches the draught splits nothing: merge windows
+    # separated by a zero-length gap, then drop any zero-length windows.
+    if window_starts.size > 1:
+        gap = (start_rows[1:] != start_rows[:-1]) | (
+            window_starts[1:] > window_ends[:-1]
+        )
+        start_rows = start_rows[np.concatenate(([True], gap))]
+        window_starts = window_starts[np.concatenate(([True], gap))]
+        window_ends = window_ends[np.concatenate((gap, [True]))]
+
+    keep = window_starts < window_ends
+    return start_rows[keep], window_starts[keep], window_ends[keep]
@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd  # type:ignore
+from typing import Iterator, List, Sequence, Tuple, Union
+
+TimeLike = Union[pd.Timestamp, np.datetime64, int]
+NAT = np.iinfo(np.int64).min  # NaT as int64 epoch nanoseconds
+
+
+def to_nanoseconds(value: TimeLike) -> int:
+    # Epoch nanoseconds (UTC) of a timestamp; integers are taken as-is.
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    value = pd.Timestamp(value)
+    if value.tz is not None:
+        value = value.tz_convert(None)
+    return int(value.as_unit("ns").value)
+
+
+class IntervalSet:
+    """Sorted, disjoint time intervals as int64 epoch-nanosecond arrays.
+
+    Intervals are closed and always normalised: overlapping or touching
+    intervals are merged and zero-length ones dropped, so every operation
+    is a linear sweep over already sorted bounds.
+    """
+
+    __slots__ = ("starts", "ends", "tz")
+
+    def __init__(
+        self,
+        starts: Sequence[int] = (),
+        ends: Sequence[int] = (),
+        tz=None,
+    ) -> None:
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        if starts.shape != ends.shape:
+            raise ValueError("starts and ends must have the same length.")
+
+        order = np.argsort(starts, kind="stable")
+        self.starts, self.ends = _normalise(starts[order], ends[order])
+        self.tz = tz
+
+    @classmethod
+    def from_windows(
+        cls, windows: Sequence[Tuple[TimeLike, TimeLike]], tz=None
+    ) -> "IntervalSet":
+        if not len(windows):
+            return cls(tz=tz)
+
+        window_starts, window_ends = zip(*windows)
+        window_starts = pd.DatetimeIndex(window_starts)
+        window_ends = pd.DatetimeIndex(window_ends)
+        if tz is None:
+            tz = window_starts.tz
+        return cls(_asi8(window_starts), _asi8(window_ends), tz=tz)
+
+    @classmethod
+    def span(cls, start: TimeLike, end: TimeLike, tz=None) -> "IntervalSet":
+        return cls([to_nanoseconds(start)], [to_nanoseconds(end)], tz=tz)
+
+    def to_windows(self, tz=None) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        return list(zip(*self.bounds(tz)))
+
+    def bounds(self, tz=None) -> Tuple[pd.DatetimeIndex, pd.DatetimeIndex]:
+        # Starts and ends as two DatetimeIndex columns.
+        return self._index(self.starts, tz), self._index(self.ends, tz)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.starts.tolist(), self.ends.tolist())
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return np.array_equal(self.starts, other.starts) and np.array_equal(
+            self.ends, other.ends
+        )
+
+    def __repr__(self) -> str:
+        return f"IntervalSet({self.to_windows()!r})"
+
+    def __and__(self, other: "IntervalSet") -> "IntervalSet":
+        return self.intersection(other)
+
+    def __or__(self, other: "IntervalSet") -> "IntervalSet":
+        return self.union(other)
+
+    @property
+    def is_empty(self) -> bool:
+        return not len(self.starts)
+
+    @property
+    def duration(self) -> pd.Timedelta:
+        return pd.Timedelta(int((self.ends - self.starts).sum()), unit="ns")
+
+    def intersection(self, other: "IntervalSet") -> "IntervalSet":
+        return self._sweep(other, coverage=2)
+
+    def union(self, other: "IntervalSet") -> "IntervalSet":
+        return self._sweep(other, coverage=1)
+
+    def complement(self, start: TimeLike, end: TimeLike) -> "IntervalSet":
+        # The gaps between the intervals, within [start, end].
+        start, end = to_nanoseconds(start), to_nanoseconds(end)
+        clipped = self.clip(start, end)
+        return IntervalSet(
+            np.concatenate(([start], clipped.ends)),
+            np.concatenate((clipped.starts, [end])),
+            tz=self.tz,
+        )
+
+    def next_entry(self, times: np.ndarray) -> np.ndarray:
+        # For each epoch-nanosecond time, the first covered instant at or
+        # after it: the time itself when covered, else the next start. NaT
+        # (int64 min) where no interval is left, or for NaT times.
+        times = np.asarray(times, dtype=np.int64)
+        following = np.searchsorted(self.ends, times, side="left")
+        entries = np.full(times.shape, NAT, dtype=np.int64)
+        found = (following < len(self.starts)) & (times != NAT)
+        entries[found] = np.maximum(self.starts[following[found]], times[found])
+        return entries
+
+    def clip(self, start: TimeLike, end: TimeLike) -> "IntervalSet":
+        start, end = to_nanoseconds(start), to_nanoseconds(end)
+        first = int(np.searchsorted(self.ends, start, side="right"))
+        last = int(np.searchsorted(self.starts, end, side="left"))
+        return IntervalSet(
+            np.maximum(self.starts[first:last], start),
+            np.minimum(self.ends[first:last], end),
+            tz=self.tz,
+        )
+
+    def _sweep(self, other: "IntervalSet", coverage: int) -> "IntervalSet":
+        # Walk every bound in time order keeping a count of the sets that
+        # cover the current instant; the result is where it reaches `coverage`.
+        bounds = np.concatenate((self.starts, other.starts, self.ends, other.ends))
+        count = len(self) + len(other)
+        steps = np.concatenate(
+            (np.ones(count, dtype=np.int64), -np.ones(count, dtype=np.int64))
+        )
+        order = np.lexsort((steps, bounds))
+        bounds, covered = bounds[order], np.cumsum(steps[order]) >= coverage
+
+        edges = np.diff(np.concatenate(([False], covered, [False])).astype(np.int8))
+        result_starts = bounds[np.flatnonzero(edges == 1)]
+        result_ends = bounds[np.flatnonzero(edges == -1)]
+        return IntervalSet(
+            result_starts, result_ends, tz=self.tz if self.tz is not None else other.tz
+        )
+
+    def _index(self, values: np.ndarray, tz=None) -> pd.DatetimeIndex:
+        tz = tz if tz is not None else self.tz
+        index = pd.DatetimeIndex(values.astype("datetime64[ns]"))
+        if tz is not None:
+            index = index.tz_localize("UTC").tz_convert(tz)
+        return index
+
+
+def _asi8(index: pd.DatetimeIndex) -> np.ndarray:
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.as_unit("ns").asi8
+
+
+def _normalise(
+    starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Merge overlapping or touching intervals (starts already sorted) and
+    # drop empty ones.
+    keep = starts < ends
+    starts, ends = starts[keep], ends[keep]
+    if len(starts) < 2:
+        return starts, ends
+
+    reach = np.maximum.accumulate(ends)
+    new_run = np.concatenate(([True], starts[1:] > reach[:-1]))
+    run_ends = np.concatenate((np.flatnonzero(new_run)[1:] - 1, [len(starts) - 1]))
+    return starts[new_run], reach[run_ends]
+
+
+def as_interval_set(
+    windows: Union[IntervalSet, Sequence[Tuple[TimeLike, TimeLike]]],
+) -> IntervalSet:
+    if isinstance(windows, IntervalSet):
+        return windows
+    return IntervalSet.from_windows(windows)
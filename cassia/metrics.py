@@ -0,0 +1,181 @@
+"""Per-stage latency histograms and counters, exposed in Prometheus text format.
+
+Instrumented code wraps each stage in ``with metrics.stage("name"):``. While
+metrics are disabled that returns a shared no-op context manager, so a hook
+costs one method call. Stage durations recorded inside ``metrics.collect()``
+are also summed per name for that caller, e.g. for a Server-Timing header.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds of the latency buckets, in seconds.
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_NULL_STAGE = nullcontext()
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "cassia_stage_timings", default=None
+)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: "Metrics", name: str) -> None:
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+        timings = _timings.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds
+
+    def increment(self, name: str, amount: float = 1.0, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    @contextmanager
+    def collect(self) -> Iterator[Dict[str, float]]:
+        # Seconds per stage recorded in this context (and in any context
+        # copied from it, such as a worker thread's), summed by name.
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+        try:
+            yield timings
+        finally:
+            _timings.reset(token)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def histogram(self, name: str) -> Optional[Histogram]:
+        return self._histograms.get(name)
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def render(self, caches: Optional[Dict[str, object]] = None) -> str:
+        # Prometheus text exposition format. ``caches`` maps a label to a
+        # CacheStats, reported as hit, miss and size series.
+        with self._lock:
+            histograms = sorted(
+                (name, list(h.counts), h.sum, h.count)
+                for name, h in self._histograms.items()
+            )
+            counters = sorted(self._counters.items())
+
+        lines = [
+            "# HELP cassia_stage_seconds Latency of each pipeline stage.",
+            "# TYPE cassia_stage_seconds histogram",
+        ]
+        for name, counts, total, count in histograms:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'cassia_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}'
+                )
+            lines.append(f'cassia_stage_seconds_sum{{stage="{name}"}} {total!r}')
+            lines.append(f'cassia_stage_seconds_count{{stage="{name}"}} {count}')
+
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+        if caches:
+            lines.extend(_cache_lines(caches))
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(
+        f"{name};dur={seconds * 1e3:.3f}" for name, seconds in timings.items()
+    )
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _cache_lines(caches: Dict[str, object]) -> List[str]:
+    series = (
+        ("cassia_cache_hits_total", "counter", lambda stats: stats.hits),
+        ("cassia_cache_misses_total", "counter", lambda stats: stats.misses),
+        ("cassia_cache_coalesced_total", "counter", lambda stats: stats.coalesced),
+        ("cassia_cache_evictions_total", "counter", lambda stats: stats.evictions),
+        ("cassia_cache_entries", "gauge", lambda stats: stats.size),
+        ("cassia_cache_hit_ratio", "gauge", lambda stats: stats.hit_rate),
+    )
+    lines = []
+    for name, kind, value in series:
+        lines.append(f"# TYPE {name} {kind}")
+        for cache, stats in sorted(caches.items()):
+            lines.append(f"{name}{_format_labels((('cache', cache),))} {value(stats):g}")
+    return lines
+
+
+# Shared by the library's instrumentation; the API enables it.
+metrics = Metrics()
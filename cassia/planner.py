@@ -0,0 +1,120 @@
+"""Feasible schedules of multi-port rotations for many candidate departures.
+
+A rotation is a list of port calls, each reached after a known transit from
+the previous one. All candidate departures move through the rotation
+together as arrays of epoch nanoseconds: at each call the windows are
+computed once, over the span of every candidate's arrival, and each
+candidate enters at its first navigable instant with one ``searchsorted``.
+"""
+
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd  # type:ignore
+
+from cassia.intervals import NAT, IntervalSet
+
+Schedule = Tuple[pd.Timestamp, List[pd.Timestamp], pd.Timestamp]
+# (unlocode, draught, first arrival, last arrival) -> windows at the port
+WindowsFor = Callable[[str, float, pd.Timestamp, pd.Timestamp], IntervalSet]
+
+
+class PortCall(NamedTuple):
+    unlocode: str
+    transit: pd.Timedelta  # Sailing time from the previous call, or the departure
+    draught: Optional[float] = None  # On arrival; by default the previous call's
+    stay: pd.Timedelta = pd.Timedelta(0)  # Alongside, before sailing on
+
+
+class VoyagePlan(NamedTuple):
+    calls: List[PortCall]
+    departures: pd.DatetimeIndex
+    draughts: List[float]
+    # Entry time at each call, per departure; NaT where the rotation fails.
+    arrivals: List[pd.DatetimeIndex]
+    completions: pd.DatetimeIndex  # Sailing time from the last call
+    feasible: np.ndarray
+
+    @property
+    def earliest(self) -> Optional[int]:
+        # Position of the departure completing the rotation first.
+        if not self.feasible.any():
+            return None
+        completions = _nanoseconds(self.completions)
+        completions = np.where(self.feasible, completions, np.iinfo(np.int64).max)
+        return int(np.argmin(completions))
+
+    def schedule(self, index: int) -> Schedule:
+        # Departure, entry at each call and completion.
+        return (
+            self.departures[index],
+            [arrivals[index] for arrivals in self.arrivals],
+            self.completions[index],
+        )
+
+    def schedules(self) -> List[Schedule]:
+        return [self.schedule(index) for index in np.flatnonzero(self.feasible)]
+
+
+def plan_rotation(
+    calls: Sequence[PortCall],
+    departures: Sequence[pd.Timestamp],
+    draught: float,
+    windows_for: WindowsFor,
+    max_wait: pd.Timedelta = pd.Timedelta(0),
+) -> VoyagePlan:
+    # A vessel arriving outside a window may wait up to ``max_wait`` for the
+    # next one; beyond that the departure is infeasible.
+    calls = [PortCall(*call) for call in calls]
+    departures = pd.DatetimeIndex(departures)
+    tz = departures.tz
+    max_wait_ns = pd.Timedelta(max_wait).value
+
+    times = _nanoseconds(departures)
+    feasible = np.ones(len(times), dtype=bool)
+    draughts, arrivals = [], []
+    for call in calls:
+        draught = draught if call.draught is None else float(call.draught)
+        draughts.append(draught)
+
+        etas = np.where(feasible, times + pd.Timedelta(call.transit).value, NAT)
+        entries = np.full(len(times), NAT, dtype=np.int64)
+        if feasible.any():
+            windows = windows_for(
+                call.unlocode,
+                draught,
+                _timestamp(etas[feasible].min(), tz),
+                _timestamp(etas[feasible].max() + max_wait_ns, tz),
+            )
+            entries = windows.next_entry(etas)
+            feasible &= (entries != NAT) & (entries - etas <= max_wait_ns)
+            entries[~feasible] = NAT
+
+        arrivals.append(_timestamps(entries, tz))
+        times = np.where(feasible, entries + pd.Timedelta(call.stay).value, NAT)
+
+    return VoyagePlan(
+        calls=calls,
+        departures=departures,
+        draughts=draughts,
+        arrivals=arrivals,
+        completions=_timestamps(times, tz),
+        feasible=feasible,
+    )
+
+
+def _nanoseconds(index: pd.DatetimeIndex) -> np.ndarray:
+    if index.tz is not None:
+        index = index.tz_convert(None)
+    return index.as_unit("ns").asi8.copy()
+
+
+def _timestamps(values: np.ndarray, tz=None) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(values.astype("datetime64[ns]"))
+    if tz is not None:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    return index
+
+
+def _timestamp(value: int, tz=None) -> pd.Timestamp:
+    return _timestamps(np.array([value], dtype=np.int64), tz)[0]
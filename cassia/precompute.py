@@ -0,0 +1,411 @@
+"""Tidal and combined windows precomputed for every port and draught bucket.
+
+``python -m cassia.precompute OUTPUT`` (or ``cassia-precompute OUTPUT``), run
+after each forecast refresh, solves the windows of every port for each
+draught on a 0.05 m grid across the whole tide forecast, on a process pool,
+and writes them to one indexed file: a JSON manifest followed by the
+window bounds of every (port, draught) row, delimited by offsets.
+
+``Cassia(precomputed=OUTPUT)`` memory-maps it and answers queries whose
+draught is on the grid and whose horizon lies within the forecast by
+slicing those windows; anything else is computed live. With the grid
+engine, arrivals on the resolution grid get exactly the live windows. The
+file records the tide data version, engine and resolution it was built
+with, and is ignored when any of them differ.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd  # type:ignore
+
+from cassia.daylight import get_daylight_windows_corrected
+from cassia.interpolation import (
+    RESOLUTION,
+    analytic_windows,
+    check_engine,
+    depth_curve,
+)
+from cassia.intervals import IntervalSet, to_nanoseconds
+from cassia.sweep import navigable_runs
+from cassia.tide_store import TideStore
+
+FORMAT_VERSION = 1
+BUCKET = 0.05  # Metres between precomputed draughts
+MIN_DRAUGHT = 1.0  # Shallower buckets are skipped, whatever the tide data says
+BUCKETS_PER_TASK = 32
+ALIGNMENT = 64
+HEADER_BYTES = 8  # Length of the manifest's JSON, ahead of it
+
+PathLike = Union[str, Path]
+Windows = List[Tuple[pd.Timestamp, pd.Timestamp]]
+Bounds = Tuple[np.ndarray, np.ndarray]
+
+
+class PortTask(NamedTuple):
+    unlocode: str
+    port: object
+    epochs: np.ndarray
+    heights: np.ndarray
+    daylight: Optional[Bounds]  # Over the whole span; None when not solvable
+    draughts: List[float]
+    engine: str
+    resolution: int  # Nanoseconds
+    start: int  # First and last instant covered, in epoch nanoseconds
+    end: int
+
+
+class PrecomputedWindows:
+    def __init__(self, path: PathLike) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            length = int.from_bytes(file.read(HEADER_BYTES), "little")
+            manifest = json.loads(file.read(length))
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(
+                f"{self.path} has format {manifest.get('format')!r}, "
+                f"expected {FORMAT_VERSION}; precompute it again."
+            )
+
+        self.version: str = manifest["version"]
+        self.engine: str = manifest["engine"]
+        self.resolution = pd.Timedelta(manifest["resolution"], unit="ns")
+        self.bucket: float = manifest["bucket"]
+        self.ports: Dict[str, dict] = manifest["ports"]
+        self._arrays = {
+            name: np.memmap(
+                self.path,
+                dtype=np.dtype(spec["dtype"]),
+                mode="r",
+                offset=spec["offset"],
+                shape=tuple(spec["shape"]),
+            )
+            for name, spec in manifest["arrays"].items()
+        }
+
+    def matches(self, version: str, engine: str, resolution: pd.Timedelta) -> bool:
+        return (
+            self.version == version
+            and self.engine == engine
+            and self.resolution == resolution
+        )
+
+    def tidal_windows(
+        self, unlocode: str, draught: float, arrival_time: pd.Timestamp, days: int
+    ) -> Optional[Windows]:
+        # None unless the draught is a bucket and the horizon is covered.
+        found = self._row(unlocode, draught, arrival_time, days)
+        if found is None:
+            return None
+        row, arrival, last = found
+        return self._windows("tidal", row, arrival, last, arrival_time)
+
+    def combined_windows(
+        self, unlocode: str, draught: float, arrival_time: pd.Timestamp, days: int
+    ) -> Optional[Windows]:
+        found = self._row(unlocode, draught, arrival_time, days)
+        if found is None or not self.ports[unlocode]["combined"]:
+            return None
+        row, arrival, last = found
+        # Daylight comes by whole UTC days from the arrival's (local) date.
+        date = np.datetime64(pd.Timestamp(arrival_time).date(), "D")
+        first_midnight = to_nanoseconds(date)
+        last_midnight = to_nanoseconds(date + np.timedelta64(days, "D"))
+        return self._windows(
+            "combined",
+            row,
+            max(arrival, first_midnight),
+            min(last, last_midnight),
+            arrival_time,
+        )
+
+    def _row(
+        self, unlocode: str, draught: float, arrival_time: pd.Timestamp, days: int
+    ) -> Optional[Tuple[int, int, int]]:
+        port = self.ports.get(unlocode)
+        if port is None:
+            return None
+        bucket = int(round(draught / self.bucket))
+        offset = bucket - port["first_bucket"]
+        if _draught(bucket, self.bucket) != draught or not 0 <= offset < port["buckets"]:
+            return None
+
+        arrival = to_nanoseconds(arrival_time)
+        horizon = pd.Timedelta(days=days).value
+        if self.engine == "grid":
+            # The live grid's last point is one step short of the horizon.
+            resolution = self.resolution.value
+            if (arrival - port["start"]) % resolution:
+                return None
+            last = arrival + horizon // resolution * resolution - resolution
+        else:
+            last = arrival + horizon
+        if arrival < port["start"] or last > port["end"]:
+            return None
+        return port["row"] + offset, arrival, last
+
+    def _windows(
+        self, kind: str, row: int, start: int, end: int, arrival_time: pd.Timestamp
+    ) -> Windows:
+        offsets = self._arrays[f"{kind}_offsets"]
+        rows = slice(offsets[row], offsets[row + 1])
+        starts = self._arrays[f"{kind}_starts"][rows]
+        ends = self._arrays[f"{kind}_ends"][rows]
+        tz = pd.Timestamp(arrival_time).tz
+        if kind == "combined":
+            return IntervalSet(starts, ends, tz=tz).clip(start, end).to_windows()
+
+        # Tidal windows as the engine found them: an IntervalSet would drop
+        # the grid's single-point (t, t) windows.
+        first = int(np.searchsorted(ends, start, side="left"))
+        last = int(np.searchsorted(starts, end, side="right"))
+        starts = np.maximum(starts[first:last], start)
+        ends = np.minimum(ends[first:last], end)
+        return list(zip(_timestamps(starts, tz), _timestamps(ends, tz)))
+
+
+def open_precomputed(path: Optional[PathLike]) -> Optional[PrecomputedWindows]:
+    # None when there is no file yet, e.g. before the first precompute run.
+    if path is None or not Path(path).exists():
+        return None
+    return PrecomputedWindows(path)
+
+
+def precompute(
+    output: PathLike,
+    cassia,
+    bucket: float = BUCKET,
+    min_draught: float = MIN_DRAUGHT,
+    unlocodes: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+) -> Path:
+    # Windows of a loaded Cassia's ports, engine and resolution, written to
+    # ``output`` in one step so readers never see a partial file.
+    check_engine(cassia.engine)
+    snapshot = cassia.snapshot
+    tasks = []
+    for unlocode in unlocodes or list(cassia.ports_dispatcher):
+        port = cassia.ports_dispatcher[unlocode]
+        if port.name not in snapshot.tide_store:
+            continue
+        tasks.extend(_port_tasks(cassia, snapshot, unlocode, port, bucket, min_draught))
+
+    if workers == 1:
+        results = list(map(solve, tasks))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            results = list(pool.map(solve, tasks))
+
+    ports: Dict[str, dict] = {}
+    rows: Dict[str, List[Bounds]] = {"tidal": [], "combined": []}
+    for task, (tidal, combined) in zip(tasks, results):
+        port = ports.get(task.unlocode)
+        if port is None:
+            port = ports[task.unlocode] = {
+                "first_bucket": int(round(task.draughts[0] / bucket)),
+                "buckets": 0,
+                "row": len(rows["tidal"]),
+                "start": task.start,
+                "end": task.end,
+                "combined": task.daylight is not None,
+            }
+        port["buckets"] += len(task.draughts)
+        rows["tidal"].extend(tidal)
+        rows["combined"].extend(combined)
+
+    arrays = {}
+    empty = np.array([], dtype=np.int64)
+    for kind, bounds in rows.items():
+        arrays[f"{kind}_starts"] = np.concatenate([empty] + [s for s, _ in bounds])
+        arrays[f"{kind}_ends"] = np.concatenate([empty] + [e for _, e in bounds])
+        arrays[f"{kind}_offsets"] = np.concatenate(
+            ([0], np.cumsum([len(s) for s, _ in bounds]))
+        )
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": snapshot.version,
+        "engine": cassia.engine,
+        "resolution": cassia.resolution.value,
+        "bucket": bucket,
+        "ports": ports,
+    }
+    return _write(Path(output), manifest, arrays)
+
+
+def solve(task: PortTask) -> Tuple[List[Bounds], List[Bounds]]:
+    # Tidal and combined window bounds for each of the task's draughts.
+    tide_store = TideStore([task.port.name], [task.epochs], [task.heights])
+    draughts = np.asarray(task.draughts, dtype=np.float64)
+    if task.engine == "grid":
+        time_range, total_depths = depth_curve(
+            task.port,
+            pd.date_range(
+                start=pd.Timestamp(task.start, unit="ns"),
+                end=pd.Timestamp(task.end, unit="ns"),
+                freq=pd.Timedelta(task.resolution, unit="ns"),
+            ),
+            tide_store,
+        )
+        nanoseconds = time_range.as_unit("ns").asi8
+        tidal = []
+        for draught in draughts:
+            run_starts, run_ends = navigable_runs(total_depths > draught)
+            tidal.append((nanoseconds[run_starts], nanoseconds[run_ends]))
+    else:
+        fleet_windows = analytic_windows(
+            task.port, tide_store, draughts, task.start / 1e9, task.end / 1e9
+        )
+        starts = fleet_windows.start.as_unit("ns").asi8
+        ends = fleet_windows.end.as_unit("ns").asi8
+        tidal = [
+            (starts[fleet_windows.vessel_index == index],
+             ends[fleet_windows.vessel_index == index])
+            for index in range(len(draughts))
+        ]
+
+    combined = []
+    if task.daylight is not None:
+        daylight = IntervalSet(*task.daylight)
+        for starts, ends in tidal:
+            windows = IntervalSet(starts, ends) & daylight
+            combined.append((windows.starts, windows.ends))
+    else:
+        empty = np.array([], dtype=np.int64)
+        combined = [(empty, empty)] * len(tidal)
+    return tidal, combined
+
+
+def _port_tasks(
+    cassia, snapshot, unlocode: str, port, bucket: float, min_draught: float
+) -> List[PortTask]:
+    epochs, heights = snapshot.tide_store.get(port.name)
+    if len(epochs) < 2:
+        return []
+    depths = port.approach_mllw_meters + heights
+    # Buckets from the shallowest to the deepest depth: any other draught
+    # can always, or never, navigate.
+    first = max(int(np.floor(depths.min() / bucket)), int(np.ceil(min_draught / bucket)))
+    last = int(np.ceil(depths.max() / bucket))
+    if last < first:
+        return []
+
+    start, end = (int(round(epoch * 1e9)) for epoch in (epochs[0], epochs[-1]))
+    if cassia.engine == "grid":
+        # Grid points on multiples of the resolution, as for arrivals on
+        # whole minutes.
+        resolution = cassia.resolution.value
+        start, end = -(-start // resolution) * resolution, end // resolution * resolution
+
+    first_date = pd.Timestamp(np.datetime64(start, "ns").astype("datetime64[D]"))
+    last_date = pd.Timestamp(np.datetime64(end, "ns").astype("datetime64[D]"))
+    days = (last_date - first_date).days + 1
+    try:
+        daylight_windows = snapshot.daylight_table.windows(unlocode, first_date, days)
+        if daylight_windows is None:
+            daylight_windows = get_daylight_windows_corrected(
+                port.latitude, port.longitude, first_date, days
+            )
+        daylight_set = IntervalSet.from_windows(daylight_windows)
+        daylight: Optional[Bounds] = (daylight_set.starts, daylight_set.ends)
+    except ValueError:
+        daylight = None  # The sun does not rise and set every day there
+
+    draughts = [_draught(k, bucket) for k in range(first, last + 1)]
+    return [
+        PortTask(
+            unlocode=unlocode,
+            port=port,
+            epochs=np.asarray(epochs),
+            heights=np.asarray(heights),
+            daylight=daylight,
+            draughts=draughts[chunk : chunk + BUCKETS_PER_TASK],
+            engine=cassia.engine,
+            resolution=cassia.resolution.value,
+            start=start,
+            end=end,
+        )
+        for chunk in range(0, len(draughts), BUCKETS_PER_TASK)
+    ]
+
+
+def _timestamps(nanoseconds: np.ndarray, tz) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(nanoseconds.astype("datetime64[ns]"))
+    return index if tz is None else index.tz_localize("UTC").tz_convert(tz)
+
+
+def _draught(bucket: int, size: float) -> float:
+    # Rounded so a bucket equals the draught parsed from its decimal text.
+    return round(bucket * size, 6)
+
+
+def _write(output: Path, manifest: dict, arrays: Dict[str, np.ndarray]) -> Path:
+    # The arrays' offsets depend on the manifest's length, which depends on
+    # the offsets: reserve room for it first.
+    layout, size = {}, 0
+    for name, values in arrays.items():
+        values = arrays[name] = np.ascontiguousarray(values)
+        layout[name] = {"dtype": values.dtype.str, "shape": values.shape, "offset": size}
+        size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+    header = len(json.dumps(dict(manifest, arrays=layout))) + 64 * len(layout)
+    header = -(-(HEADER_BYTES + header) // ALIGNMENT) * ALIGNMENT
+    for spec in layout.values():
+        spec["offset"] += header
+    payload = json.dumps(dict(manifest, arrays=layout)).encode()
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial = output.with_name(output.name + ".partial")
+    with open(partial, "wb") as file:
+        file.write(len(payload).to_bytes(HEADER_BYTES, "little") + payload)
+        for name, values in arrays.items():
+            file.seek(layout[name]["offset"])
+            file.write(values.tobytes())
+    os.replace(partial, output)
+    return output
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Precompute windows for every port and draught bucket."
+    )
+    parser.add_argument("output", type=Path)
+    parser.add_argument(
+        "--data-path", type=Path, help="Compiled data directory; else assets/"
+    )
+    parser.add_argument("--engine", default="grid", choices=["grid", "analytic"])
+    parser.add_argument(
+        "--resolution-minutes", type=int, default=int(RESOLUTION.total_seconds() // 60)
+    )
+    parser.add_argument("--bucket", type=float, default=BUCKET)
+    parser.add_argument("--min-draught", type=float, default=MIN_DRAUGHT)
+    parser.add_argument("--ports", nargs="*", help="UNLOCODEs; all ports by default")
+    parser.add_argument("--workers", type=int, help="Processes; one per CPU by default")
+    args = parser.parse_args(argv)
+
+    from cassia.cassia import Cassia
+
+    cassia = Cassia(
+        data_path=args.data_path,
+        engine=args.engine,
+        resolution=pd.Timedelta(minutes=args.resolution_minutes),
+    ).load()
+    output = precompute(
+        args.output,
+        cassia,
+        bucket=args.bucket,
+        min_draught=args.min_draught,
+        unlocodes=args.ports,
+        workers=args.workers,
+    )
+    print(f"Precomputed windows written to {output}")
+
+
+if __name__ == "__main__":
+    main()
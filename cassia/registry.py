@@ -0,0 +1,136 @@
+"""Vessel and port registries stored as NumPy columns.
+
+A registry is a read-only mapping from IMO (or UNLOCODE) to a ``Vessel`` (or
+``Port``) record, built on demand from its row. Keys are resolved through a
+hash index, one at a time or in bulk, so registries of hundreds of thousands
+of entries load from a DataFrame or memory-mapped columns without building
+a Python object per row.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd  # type:ignore
+
+from cassia.dispatchers import Port, Vessel
+
+
+class Registry(Mapping, ABC):
+    # Column names and the CSV headers they are loaded from.
+    key_column = ""
+    columns: Dict[str, str] = {}
+
+    def __init__(self, keys: Sequence, **columns: Sequence) -> None:
+        keys = np.asarray(keys)
+        # Duplicate keys behave as in a dict: the first row's position with
+        # the last row's values.
+        _, first = np.unique(keys, return_index=True)
+        _, last_reversed = np.unique(keys[::-1], return_index=True)
+        rows = (len(keys) - 1 - last_reversed)[np.argsort(first, kind="stable")]
+        if len(rows) == len(keys):
+            # Views, so memory-mapped or shared columns are not copied.
+            rows = slice(None)
+
+        # Not .keys/.values, which belong to the Mapping interface.
+        self._keys = keys[rows]
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.asarray(columns[name])[rows] for name in self.columns
+        }
+        self._index = pd.Index(self._keys)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "Registry":
+        return cls(
+            df[cls.key_column].to_numpy(),
+            **{name: df[column].to_numpy() for name, column in cls.columns.items()},
+        )
+
+    @classmethod
+    def from_csv(cls, path) -> "Registry":
+        return cls.from_dataframe(pd.read_csv(path))
+
+    def row(self, key: Any) -> int:
+        try:
+            row = self._index.get_loc(key)
+        except (KeyError, TypeError):
+            raise KeyError(key) from None
+        return int(row)
+
+    def rows(self, keys: Iterable) -> np.ndarray:
+        keys = np.asarray(keys if isinstance(keys, np.ndarray) else list(keys))
+        rows = self._index.get_indexer(keys)
+        missing = rows < 0
+        if missing.any():
+            raise KeyError(keys[missing].tolist())
+        return rows
+
+    def column(self, name: str, keys: Optional[Iterable] = None) -> np.ndarray:
+        # One column for every entry, or for the given keys in order.
+        values = self._columns[name]
+        return values if keys is None else values[self.rows(keys)]
+
+    @abstractmethod
+    def record(self, row: int):
+        """The entry at ``row``."""
+
+    def __getitem__(self, key: Any):
+        return self.record(self.row(key))
+
+    def __contains__(self, key: Any) -> bool:
+        try:
+            return key in self._index
+        except TypeError:
+            return False
+
+    def __iter__(self) -> Iterator:
+        return iter(self._keys.tolist())
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} entries)"
+
+
+class VesselRegistry(Registry):
+    key_column = "IMO"
+    columns = {"draught": "DRAUGHT", "name": "NAME", "dwt": "DWT"}
+
+    def record(self, row: int) -> Vessel:
+        return Vessel(
+            imo=int(self._keys[row]),
+            draught=float(self._columns["draught"][row]),
+            name=str(self._columns["name"][row]),
+            dwt=float(self._columns["dwt"][row]),
+        )
+
+    def draughts(self, imos: Iterable[int]) -> np.ndarray:
+        return self.column("draught", imos).astype(np.float64)
+
+
+class PortRegistry(Registry):
+    key_column = "UNLOCODE"
+    columns = {
+        "name": "NAME",
+        "latitude": "LATITUDE",
+        "longitude": "LONGITUDE",
+        "approach_mllw_meters": "APPROACH_MLLW_METERS",
+    }
+
+    def record(self, row: int) -> Port:
+        return Port(
+            name=str(self._columns["name"][row]),
+            latitude=float(self._columns["latitude"][row]),
+            longitude=float(self._columns["longitude"][row]),
+            approach_mllw_meters=float(self._columns["approach_mllw_meters"][row]),
+        )
+
+
+def vessel_draughts(vessels_dispatcher: Mapping, imos: Iterable[int]) -> np.ndarray:
+    # Draughts of many vessels, in one indexed lookup for a registry.
+    if isinstance(vessels_dispatcher, VesselRegistry):
+        return vessels_dispatcher.draughts(imos)
+    return np.array(
+        [vessels_dispatcher[imo].draught for imo in imos], dtype=np.float64
+    )
@@ -0,0 +1,226 @@
+"""Chart rendering on explicit matplotlib Figures, for servers and batch jobs.
+
+Nothing here touches pyplot's global state, so charts can be drawn from any
+thread or process. The depth curve is decimated to its per-bucket minima
+and maxima, and each kind of window is drawn as a single collection.
+"""
+
+import io
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd  # type:ignore
+from matplotlib.axes import Axes
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+
+from cassia.intervals import IntervalSet, as_interval_set
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+FIGSIZE = (14, 7)
+MAX_POINTS = 2000  # Depth curve points drawn per chart
+
+WindowsLike = Union[IntervalSet, List[Tuple[pd.Timestamp, pd.Timestamp]]]
+
+
+class RenderJob(NamedTuple):
+    """Everything needed to render one chart; picklable for process pools."""
+
+    kind: str  # "tidal" or "combined"
+    time_range: pd.DatetimeIndex
+    total_depths: np.ndarray
+    vessel_draught: float
+    port_name: str
+    tidal_windows: WindowsLike
+    daylight_windows: Optional[WindowsLike] = None
+    combined_windows: Optional[WindowsLike] = None
+    fmt: str = "png"
+    max_points: int = MAX_POINTS
+
+
+def decimate_minmax(values: np.ndarray, max_points: int = MAX_POINTS) -> np.ndarray:
+    # Indices of the points worth drawing: the first and last, plus the
+    # minimum and maximum of each of max_points / 2 equal buckets, in order.
+    count = len(values)
+    if count <= max_points:
+        return np.arange(count)
+
+    size = -(-count // max(max_points // 2, 1))
+    full = count // size * size
+    blocks = values[:full].reshape(-1, size)
+    offsets = np.arange(0, full, size)
+    picks = [
+        offsets + blocks.argmin(axis=1),
+        offsets + blocks.argmax(axis=1),
+        [0, count - 1],
+    ]
+    if full < count:
+        tail = values[full:]
+        picks.append([full + tail.argmin(), full + tail.argmax()])
+    return np.unique(np.concatenate(picks))
+
+
+def draw_depth_curve(
+    ax: Axes,
+    time_range: pd.DatetimeIndex,
+    total_depths: np.ndarray,
+    vessel_draught: float,
+    max_points: int = MAX_POINTS,
+) -> None:
+    total_depths = np.asarray(total_depths, dtype=np.float64)
+    if len(time_range) != len(total_depths):
+        raise ValueError("time_range and total_depths must have the same length.")
+
+    keep = decimate_minmax(total_depths, max_points)
+    ax.plot(
+        _date_numbers(time_range[keep]),
+        total_depths[keep],
+        label="Total Depth (Harbor Depth + Tide)",
+    )
+    ax.axhline(
+        y=vessel_draught,
+        color="r",
+        linestyle="--",
+        label=f"Vessel Draught ({vessel_draught} m)",
+    )
+    ax.xaxis_date()
+
+
+def draw_windows(
+    ax: Axes, windows: WindowsLike, time_range: pd.DatetimeIndex, label: str, **style
+) -> None:
+    # Full-height spans for every window inside the plotted range, as one
+    # collection in axes coordinates vertically.
+    clipped = as_interval_set(windows).clip(time_range[0], time_range[-1])
+    if clipped.is_empty:
+        return
+
+    starts, ends = (_date_numbers(bound) for bound in clipped.bounds(tz=time_range.tz))
+    bottoms, tops = np.zeros(len(starts)), np.ones(len(starts))
+    vertices = np.stack(
+        (
+            np.column_stack((starts, bottoms)),
+            np.column_stack((starts, tops)),
+            np.column_stack((ends, tops)),
+            np.column_stack((ends, bottoms)),
+        ),
+        axis=1,
+    )
+    ax.add_collection(
+        PolyCollection(
+            vertices, transform=ax.get_xaxis_transform(), label=label, **style
+        ),
+        autolim=False,
+    )
+
+
+def tidal_windows_figure(
+    time_range: pd.DatetimeIndex,
+    total_depths: np.ndarray,
+    vessel_draught: float,
+    tidal_windows: WindowsLike,
+    port_name: str,
+    max_points: int = MAX_POINTS,
+    figure: Optional[Figure] = None,
+) -> Figure:
+    figure = Figure(figsize=FIGSIZE) if figure is None else figure
+    ax = figure.subplots()
+
+    draw_depth_curve(ax, time_range, total_depths, vessel_draught, max_points)
+    draw_windows(ax, tidal_windows, time_range, "Tidal Window", color="blue", alpha=0.2)
+
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Water Depth (meters)")
+    ax.set_title(f"Tidal Windows at {port_name}")
+    ax.legend(loc="upper right")
+    return figure
+
+
+def combined_windows_figure(
+    time_range: pd.DatetimeIndex,
+    total_depths: np.ndarray,
+    vessel_draught: float,
+    tidal_windows: WindowsLike,
+    daylight_windows: WindowsLike,
+    combined_windows: WindowsLike,
+    port_name: str,
+    max_points: int = MAX_POINTS,
+    figure: Optional[Figure] = None,
+) -> Figure:
+    figure = Figure(figsize=FIGSIZE) if figure is None else figure
+    ax = figure.subplots()
+
+    draw_depth_curve(ax, time_range, total_depths, vessel_draught, max_points)
+    draw_windows(ax, tidal_windows, time_range, "Tidal Window", color="blue", alpha=0.2)
+    draw_windows(
+        ax, daylight_windows, time_range, "Daylight Window", color="yellow", alpha=0.2
+    )
+    draw_windows(
+        ax,
+        combined_windows,
+        time_range,
+        "Combined Navigable Window",
+        color="green",
+        alpha=0.5,
+    )
+
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Water Depth (meters)")
+    ax.set_title(f"Tidal and Daylight Restriction Windows at {port_name}")
+    ax.legend(loc="upper right")
+    return figure
+
+
+def render(figure: Figure, fmt: str = "png") -> bytes:
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt must be one of {tuple(FORMATS)}, got {fmt!r}.")
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def render_job(job: RenderJob) -> bytes:
+    if job.kind == "tidal":
+        figure = tidal_windows_figure(
+            job.time_range,
+            job.total_depths,
+            job.vessel_draught,
+            job.tidal_windows,
+            job.port_name,
+            job.max_points,
+        )
+    elif job.kind == "combined":
+        figure = combined_windows_figure(
+            job.time_range,
+            job.total_depths,
+            job.vessel_draught,
+            job.tidal_windows,
+            job.daylight_windows,
+            job.combined_windows,
+            job.port_name,
+            job.max_points,
+        )
+    else:
+        raise ValueError(f"kind must be 'tidal' or 'combined', got {job.kind!r}.")
+    return render(figure, job.fmt)
+
+
+def render_many(
+    jobs: Iterable[RenderJob], executor: Optional[Executor] = None
+) -> List[bytes]:
+    # Rendering is CPU-bound, so charts are spread over processes; without
+    # an executor a temporary pool is started for the call.
+    if executor is not None:
+        return list(executor.map(render_job, jobs))
+    with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(render_job, jobs))
+
+
+def _date_numbers(index: pd.DatetimeIndex) -> np.ndarray:
+    # Matplotlib date numbers of the wall-clock times, as pyplot would show.
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return mdates.date2num(index.to_numpy())
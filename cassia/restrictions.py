@@ -0,0 +1,208 @@
+"""Restriction layers: the constraints on when a vessel may transit a port.
+
+Each port has an ordered list of layers, by default ``DEFAULT_RESTRICTIONS``
+(daylight, then tidal). A restriction gives the windows it allows over the
+query's horizon as an IntervalSet, and the combined windows are their
+intersection. Layers are evaluated in order and only while the
+intersection is not empty, so cheap or very restrictive ones belong first:
+a channel closed for the whole horizon means the tides are never computed.
+Filters, such as MinimumDuration, then act on the intersection of all the
+restrictions.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import pandas as pd  # type:ignore
+
+from cassia.intervals import IntervalSet, as_interval_set
+
+Windows = List[Tuple[pd.Timestamp, pd.Timestamp]]
+Periods = Tuple[Tuple[pd.Timestamp, pd.Timestamp], ...]
+
+
+class RestrictionQuery(NamedTuple):
+    unlocode: str
+    draught: float
+    arrival_time: pd.Timestamp
+    days: int
+
+    @property
+    def horizon(self) -> IntervalSet:
+        arrival_time = pd.Timestamp(self.arrival_time)
+        return IntervalSet.span(
+            arrival_time, arrival_time + pd.Timedelta(days=self.days), tz=arrival_time.tz
+        )
+
+
+# The windows of the layers backed by Cassia's data ("tidal" or "daylight")
+# for a query.
+Source = Callable[[str, RestrictionQuery], Windows]
+
+
+class Restriction(ABC):
+    name = "restriction"
+
+    @abstractmethod
+    def windows(self, query: RestrictionQuery, source: Source) -> IntervalSet:
+        """The windows this layer allows over the query's horizon."""
+
+
+class Filter(ABC):
+    name = "filter"
+
+    @abstractmethod
+    def apply(self, windows: IntervalSet, query: RestrictionQuery) -> IntervalSet:
+        """The part of ``windows`` this layer keeps."""
+
+
+Layer = Union[Restriction, Filter]
+
+
+@dataclass(frozen=True)
+class Tidal(Restriction):
+    name: str = "tidal"
+
+    def windows(self, query: RestrictionQuery, source: Source) -> IntervalSet:
+        return as_interval_set(source("tidal", query))
+
+
+@dataclass(frozen=True)
+class Daylight(Restriction):
+    # Vessels of at most this draught may also transit at night.
+    night_draught: Optional[float] = None
+    name: str = "daylight"
+
+    def windows(self, query: RestrictionQuery, source: Source) -> IntervalSet:
+        if self.night_draught is not None and query.draught <= self.night_draught:
+            return query.horizon
+        return as_interval_set(source("daylight", query))
+
+
+@dataclass(frozen=True)
+class Closures(Restriction):
+    """Periods the channel is closed, e.g. for dredging or port events."""
+
+    periods: Periods = ()
+    name: str = "closures"
+    _intervals: IntervalSet = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "periods", _periods(self.periods))
+        object.__setattr__(self, "_intervals", IntervalSet.from_windows(self.periods))
+
+    def windows(self, query: RestrictionQuery, source: Source) -> IntervalSet:
+        horizon = query.horizon
+        return self._intervals.complement(horizon.starts[0], horizon.ends[0])
+
+
+@dataclass(frozen=True)
+class Availability(Restriction):
+    """Periods a service the transit needs, such as pilots or tugs, is on."""
+
+    periods: Periods = ()
+    name: str = "availability"
+    _intervals: IntervalSet = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "periods", _periods(self.periods))
+        object.__setattr__(self, "_intervals", IntervalSet.from_windows(self.periods))
+
+    def windows(self, query: RestrictionQuery, source: Source) -> IntervalSet:
+        horizon = query.horizon
+        return self._intervals.clip(horizon.starts[0], horizon.ends[0])
+
+
+@dataclass(frozen=True)
+class MinimumDuration(Filter):
+    """Drops windows too short to complete the transit in."""
+
+    duration: pd.Timedelta = pd.Timedelta(0)
+    name: str = "minimum_duration"
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "duration", pd.Timedelta(self.duration))
+
+    def apply(self, windows: IntervalSet, query: RestrictionQuery) -> IntervalSet:
+        keep = windows.ends - windows.starts >= self.duration.value
+        return IntervalSet(windows.starts[keep], windows.ends[keep], tz=windows.tz)
+
+
+DEFAULT_RESTRICTIONS: Tuple[Layer, ...] = (Daylight(), Tidal())
+
+# Layer types by the name used in restriction files.
+LAYERS = {
+    "tidal": Tidal,
+    "daylight": Daylight,
+    "closures": Closures,
+    "availability": Availability,
+    "minimum_duration": MinimumDuration,
+}
+
+
+class Evaluation(NamedTuple):
+    windows: IntervalSet  # Allowed by every layer
+    layers: Dict[str, IntervalSet]  # Of each restriction evaluated, by name
+
+
+def evaluate(
+    layers: Sequence[Layer], query: RestrictionQuery, source: Source
+) -> Evaluation:
+    windows = query.horizon
+    evaluated: Dict[str, IntervalSet] = {}
+    for layer in layers:
+        if windows.is_empty:
+            break
+        if isinstance(layer, Restriction):
+            evaluated[layer.name] = layer.windows(query, source)
+            windows = windows & evaluated[layer.name]
+    for layer in layers:
+        if windows.is_empty:
+            break
+        if isinstance(layer, Filter):
+            windows = layer.apply(windows, query)
+    return Evaluation(windows, evaluated)
+
+
+def parse_restrictions(
+    config: Mapping[str, Sequence[Mapping]],
+) -> Dict[str, Tuple[Layer, ...]]:
+    # {unlocode: [{"layer": "closures", "periods": [[start, end]]}, ...]}
+    restrictions = {}
+    for unlocode, specs in config.items():
+        layers = []
+        for spec in specs:
+            spec = dict(spec)
+            kind = spec.pop("layer", None)
+            if kind not in LAYERS:
+                raise ValueError(
+                    f"Unknown restriction layer {kind!r} for {unlocode}; "
+                    f"expected one of {sorted(LAYERS)}."
+                )
+            layers.append(LAYERS[kind](**spec))
+        restrictions[unlocode] = tuple(layers)
+    return restrictions
+
+
+def load_restrictions(path: Union[str, Path]) -> Dict[str, Tuple[Layer, ...]]:
+    with open(path) as file:
+        return parse_restrictions(json.load(file))
+
+
+def _periods(periods) -> Periods:
+    return tuple(
+        (pd.Timestamp(start), pd.Timestamp(end)) for start, end in periods
+    )
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd  # type:ignore
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Tuple
+
+from cassia.interpolation import RESOLUTION
+from cassia.tide_store import TideStore
+
+# Tuples, so results shared through a cache cannot be changed by one caller.
+Windows = Tuple[Tuple[pd.Timestamp, pd.Timestamp], ...]
+
+
+@dataclass(frozen=True)
+class TidalWindowsResult:
+    unlocode: str
+    draught: float
+    arrival_time: pd.Timestamp
+    tidal_windows: Windows
+    # Minute grid of the depth curve; None when the engine did not build it.
+    time_range: Optional[pd.DatetimeIndex] = None
+    total_depths: Optional[np.ndarray] = None
+    days: int = 14
+    resolution: pd.Timedelta = RESOLUTION
+    # The tide data the windows were computed from, for the depth curve.
+    tide_store: Optional[TideStore] = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self) -> None:
+        _freeze(self, "tidal_windows")
+
+    def __iter__(self) -> Iterator:
+        # Unpacks like the (tidal_windows, time_range, total_depths) tuple
+        # get_tidal_windows used to return, with a list the caller may change.
+        return iter((list(self.tidal_windows), self.time_range, self.total_depths))
+
+
+@dataclass(frozen=True)
+class CombinedWindowsResult:
+    unlocode: str
+    draught: float
+    arrival_time: pd.Timestamp
+    days: int
+    combined_windows: Windows
+    tidal_windows: Windows
+    daylight_windows: Windows
+    time_range: Optional[pd.DatetimeIndex] = None
+    total_depths: Optional[np.ndarray] = None
+    resolution: pd.Timedelta = RESOLUTION
+    tide_store: Optional[TideStore] = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self) -> None:
+        _freeze(self, "combined_windows", "tidal_windows", "daylight_windows")
+
+
+def _freeze(result, *names: str) -> None:
+    for name in names:
+        object.__setattr__(result, name, tuple(getattr(result, name)))
+    if result.total_depths is not None and result.total_depths.flags.writeable:
+        total_depths = result.total_depths.view()
+        total_depths.flags.writeable = False
+        object.__setattr__(result, "total_depths", total_depths)
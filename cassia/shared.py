@@ -0,0 +1,252 @@
+"""Tide, daylight and registry arrays shared between worker processes.
+
+``python -m cassia.shared publish`` loads the datasets once and copies their
+arrays into one ``multiprocessing.shared_memory`` segment, described by a
+small JSON manifest in a second segment named after it. Processes started
+with CASSIA_SHARED_MEMORY set to that name attach to the arrays read-only
+instead of loading anything, so memory stays flat as uvicorn workers are
+added and each is ready as soon as it starts. The segments outlive the
+publishing process until ``python -m cassia.shared unlink`` removes them.
+"""
+
+import argparse
+import json
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Dict, List, Mapping, NamedTuple, Optional
+
+import numpy as np
+
+from cassia.daylight import DaylightTable
+from cassia.registry import PortRegistry, Registry, VesselRegistry
+from cassia.storage import PORT_COLUMNS, VESSEL_COLUMNS
+from cassia.tide_store import TideStore
+
+FORMAT_VERSION = 1
+DEFAULT_NAME = "cassia"
+ALIGNMENT = 64
+HEADER_BYTES = 8  # Length of the manifest's JSON, ahead of it
+
+# Segments attached by this process; their arrays are in use until it exits.
+_attached: List[SharedMemory] = []
+
+
+class SharedData(NamedTuple):
+    vessels_dispatcher: VesselRegistry
+    ports_dispatcher: PortRegistry
+    tide_store: TideStore
+    daylight_table: DaylightTable
+
+
+def publish(
+    name: str,
+    vessels_dispatcher: Mapping,
+    ports_dispatcher: Mapping,
+    tide_store: TideStore,
+    daylight_table: DaylightTable,
+) -> str:
+    # Returns the name of the data segment. Workers attached to a previous
+    # publication keep using its arrays; it is freed once they all exit.
+    offsets = np.concatenate(
+        ([0], np.cumsum([len(epochs) for epochs in tide_store.epochs]))
+    )
+    arrays = {
+        "tide_epochs": np.concatenate([[]] + tide_store.epochs),
+        "tide_heights": np.concatenate([[]] + tide_store.heights),
+        "tide_offsets": offsets.astype(np.int64),
+        "daylight_starts": daylight_table.window_starts,
+        "daylight_ends": daylight_table.window_ends,
+    }
+    for prefix, columns, dispatcher in (
+        ("ports", PORT_COLUMNS, ports_dispatcher),
+        ("vessels", VESSEL_COLUMNS, vessels_dispatcher),
+    ):
+        for field, values in _registry_columns(dispatcher, columns).items():
+            arrays[f"{prefix}_{field}"] = values
+
+    layout, size = {}, 0
+    for key, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        if values.dtype == object:
+            values = values.astype(str)
+        arrays[key] = values
+        layout[key] = {"dtype": values.dtype.str, "shape": values.shape, "offset": size}
+        size += -(-values.nbytes // ALIGNMENT) * ALIGNMENT
+
+    segment_name = f"{name}-{tide_store.version[:16]}"
+    unlink_segment(segment_name)
+    segment = _open(segment_name, create=True, size=size + ALIGNMENT)
+    for key, values in arrays.items():
+        _view(segment, layout[key])[...] = values
+    segment.close()
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "segment": segment_name,
+        "version": tide_store.version,
+        "tide_ports": tide_store.port_names,
+        "tide_digests": [digest.hex() for digest in tide_store.port_digests],
+        "daylight_unlocodes": daylight_table.unlocodes,
+        "daylight_first_date": str(daylight_table.first_date),
+        "arrays": layout,
+    }
+    previous = read_manifest(name)
+    _write_manifest(name, manifest)
+    if previous is not None and previous["segment"] != segment_name:
+        unlink_segment(previous["segment"])
+    return segment_name
+
+
+def attach(name: str) -> SharedData:
+    manifest = read_manifest(name)
+    if manifest is None:
+        raise FileNotFoundError(
+            f"No shared data named {name!r}; run python -m cassia.shared publish."
+        )
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(
+            f"Shared data {name!r} has format {manifest.get('format')!r}, "
+            f"expected {FORMAT_VERSION}; publish it again."
+        )
+
+    segment = _open(manifest["segment"])
+    _attached.append(segment)
+    arrays = {
+        key: _view(segment, spec, writeable=False)
+        for key, spec in manifest["arrays"].items()
+    }
+
+    offsets = arrays["tide_offsets"].tolist()
+    bounds = list(zip(offsets[:-1], offsets[1:]))
+    tide_store = TideStore(
+        port_names=manifest["tide_ports"],
+        epochs=[arrays["tide_epochs"][start:end] for start, end in bounds],
+        heights=[arrays["tide_heights"][start:end] for start, end in bounds],
+        port_digests=[bytes.fromhex(digest) for digest in manifest["tide_digests"]],
+    )
+    daylight_table = DaylightTable(
+        manifest["daylight_unlocodes"],
+        np.datetime64(manifest["daylight_first_date"], "D"),
+        arrays["daylight_starts"],
+        arrays["daylight_ends"],
+    )
+
+    ports = {field: arrays[f"ports_{field}"] for field in PORT_COLUMNS}
+    vessels = {field: arrays[f"vessels_{field}"] for field in VESSEL_COLUMNS}
+    return SharedData(
+        vessels_dispatcher=VesselRegistry(vessels.pop("imo"), **vessels),
+        ports_dispatcher=PortRegistry(ports.pop("unlocode"), **ports),
+        tide_store=tide_store,
+        daylight_table=daylight_table,
+    )
+
+
+def read_manifest(name: str) -> Optional[dict]:
+    try:
+        segment = _open(name)
+    except FileNotFoundError:
+        return None
+    try:
+        length = int.from_bytes(segment.buf[:HEADER_BYTES], "little")
+        return json.loads(bytes(segment.buf[HEADER_BYTES : HEADER_BYTES + length]))
+    finally:
+        segment.close()
+
+
+def unlink(name: str) -> None:
+    # Removes a publication; attached processes keep their mappings.
+    manifest = read_manifest(name)
+    if manifest is not None:
+        unlink_segment(manifest["segment"])
+    unlink_segment(name)
+
+
+def unlink_segment(name: str) -> None:
+    try:
+        segment = _open(name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def _write_manifest(name: str, manifest: dict) -> None:
+    payload = json.dumps(manifest).encode()
+    unlink_segment(name)
+    segment = _open(name, create=True, size=HEADER_BYTES + len(payload))
+    segment.buf[HEADER_BYTES : HEADER_BYTES + len(payload)] = payload
+    segment.buf[:HEADER_BYTES] = len(payload).to_bytes(HEADER_BYTES, "little")
+    segment.close()
+
+
+def _open(name: str, create: bool = False, size: int = 0) -> SharedMemory:
+    # Segments are removed explicitly, not by the resource tracker when the
+    # process that created or attached them exits.
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, create=create, size=size, track=False)
+    segment = SharedMemory(name, create=create, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _view(segment: SharedMemory, spec: dict, writeable: bool = True) -> np.ndarray:
+    values = np.ndarray(
+        tuple(spec["shape"]),
+        dtype=np.dtype(spec["dtype"]),
+        buffer=segment.buf,
+        offset=spec["offset"],
+    )
+    values.flags.writeable = writeable
+    return values
+
+
+def _registry_columns(
+    dispatcher: Mapping, columns: Dict[str, str]
+) -> Dict[str, np.ndarray]:
+    # The storage layout's columns, keys first, from a registry or a dict of
+    # records.
+    key_field, *fields = columns
+    if isinstance(dispatcher, Registry):
+        values = {field: dispatcher.column(field) for field in fields}
+    else:
+        records = list(dispatcher.values())
+        values = {
+            field: np.array([getattr(record, field) for record in records])
+            for field in fields
+        }
+    return {key_field: np.array(list(dispatcher)), **values}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Publish the datasets to shared memory for API workers."
+    )
+    parser.add_argument("command", choices=["publish", "unlink"])
+    parser.add_argument("--name", default=DEFAULT_NAME)
+    parser.add_argument(
+        "--data-path", type=Path, help="Compiled data directory; else assets/"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "unlink":
+        unlink(args.name)
+        return 0
+
+    from cassia.cassia import Cassia
+
+    cassia = Cassia(data_path=args.data_path).load()
+    segment_name = publish(
+        args.name,
+        cassia.vessels_dispatcher,
+        cassia.ports_dispatcher,
+        cassia.tide_store,
+        cassia.daylight_table,
+    )
+    print(f"Published {args.name} ({segment_name})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import numpy as np
+from typing import Tuple
+
+# NOAA solar position equations, vectorised over arrays of dates and
+# locations. This follows astral's implementation step by step (including
+# its refraction correction and same-day search), so results agree with
+# ``astral.sun.sun`` for an observer at sea level.
+
+SUN_APPARENT_RADIUS = 32.0 / (60.0 * 2.0)
+SUNRISE_ZENITH = 90.0 + SUN_APPARENT_RADIUS
+
+NANOSECONDS_PER_DAY = 86_400 * 10**9
+NAT = np.iinfo(np.int64).min  # The int64 value of numpy's NaT
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+
+def refraction_at_zenith(zenith: float) -> float:
+    elevation = 90.0 - zenith
+    if elevation >= 85.0:
+        return 0.0
+
+    te = np.tan(np.radians(elevation))
+    if elevation > 5.0:
+        refraction_correction = (
+            58.1 / te - 0.07 / (te * te * te) + 0.000086 / (te * te * te * te * te)
+        )
+    elif elevation > -0.575:
+        step1 = -12.79 + elevation * 0.711
+        step2 = 103.4 + elevation * step1
+        step3 = -518.2 + elevation * step2
+        refraction_correction = 1735.0 + elevation * step3
+    else:
+        refraction_correction = -20.774 / te
+
+    return refraction_correction / 3600.0
+
+
+SUNRISE_ZENITH_REFRACTED = SUNRISE_ZENITH + refraction_at_zenith(SUNRISE_ZENITH)
+
+
+def sunrise_sunset(
+    latitudes: np.ndarray, longitudes: np.ndarray, dates: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Sunrise and sunset on each UTC date, as int64 epoch nanoseconds.
+
+    ``latitudes``, ``longitudes`` and ``dates`` (``datetime64[D]``) broadcast
+    against each other. Like astral, times are truncated to the microsecond.
+    Where astral would raise (the sun never rises or sets, or the event falls
+    on another UTC date) the result is NAT.
+    """
+    latitudes = np.clip(np.asarray(latitudes, dtype=np.float64), -89.8, 89.8)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    latitudes, longitudes, days = np.broadcast_arrays(latitudes, longitudes, days)
+
+    sunrises = _event_on_date(latitudes, longitudes, days, rising=True)
+    sunsets = _event_on_date(latitudes, longitudes, days, rising=False)
+    return sunrises, sunsets
+
+
+def _event_on_date(
+    latitudes: np.ndarray, longitudes: np.ndarray, days: np.ndarray, rising: bool
+) -> np.ndarray:
+    # The transit computed for a date can fall on the previous or next UTC
+    # day; astral then retries from the neighbouring date, and so do we.
+    events = _time_of_transit(latitudes, longitudes, days, rising)
+    event_days = np.floor_divide(events, NANOSECONDS_PER_DAY)
+
+    retry = (event_days != days) & (events != NAT)
+    if retry.any():
+        retry_days = days[retry] + np.where(event_days[retry] < days[retry], 1, -1)
+        events[retry] = _time_of_transit(
+            latitudes[retry], longitudes[retry], retry_days, rising
+        )
+        event_days[retry] = np.floor_divide(events[retry], NANOSECONDS_PER_DAY)
+
+    events[event_days != days] = NAT
+    return events
+
+
+def _time_of_transit(
+    latitudes: np.ndarray, longitudes: np.ndarray, days: np.ndarray, rising: bool
+) -> np.ndarray:
+    julian_days = days + UNIX_EPOCH_JULIAN_DAY
+    adjustment = np.zeros(days.shape)
+    time_utc = np.zeros(days.shape)
+
+    for _ in range(2):
+        julian_centuries = (julian_days + adjustment - 2451545.0) / 36525.0
+        declination = _sun_declination(julian_centuries)
+
+        with np.errstate(invalid="ignore"):
+            hour_angle = np.arccos(
+                (
+                    np.cos(np.radians(SUNRISE_ZENITH_REFRACTED))
+                    - np.sin(np.radians(latitudes)) * np.sin(np.radians(declination))
+                )
+                / (np.cos(np.radians(latitudes)) * np.cos(np.radians(declination)))
+            )
+        if not rising:
+            hour_angle = -hour_angle
+
+        delta = -longitudes - np.degrees(hour_angle)
+        offset = delta * 4.0 - _eq_of_time(julian_centuries)
+        offset = np.where(offset < -720.0, offset + 1440, offset)
+
+        time_utc = 720.0 + offset
+        adjustment = time_utc / 1440.0
+
+    # No transit (the sun never reaches the horizon) comes out as NaN.
+    missing = np.isnan(time_utc)
+    events = days * NANOSECONDS_PER_DAY + _minutes_to_nanoseconds(
+        np.where(missing, 0.0, time_utc)
+    )
+    return np.where(missing, NAT, events)
+
+
+def _minutes_to_nanoseconds(minutes: np.ndarray) -> np.ndarray:
+    # Same truncation as astral's minutes_to_timedelta.
+    whole_days = np.trunc(minutes / 1440)
+    seconds = (minutes - whole_days * 1440) * 60
+    whole_seconds = np.trunc(seconds)
+    microseconds = np.trunc((seconds - whole_seconds) * 1_000_000)
+    return (
+        whole_days.astype(np.int64) * NANOSECONDS_PER_DAY
+        + whole_seconds.astype(np.int64) * 10**9
+        + microseconds.astype(np.int64) * 1_000
+    )
+
+
+def _geom_mean_long_sun(jc: np.ndarray) -> np.ndarray:
+    return np.mod(280.46646 + jc * (36000.76983 + 0.0003032 * jc), 360.0)
+
+
+def _geom_mean_anomaly_sun(jc: np.ndarray) -> np.ndarray:
+    return 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+
+
+def _eccentric_location_earth_orbit(jc: np.ndarray) -> np.ndarray:
+    return 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+
+
+def _sun_eq_of_center(jc: np.ndarray) -> np.ndarray:
+    mrad = np.radians(_geom_mean_anomaly_sun(jc))
+    return (
+        np.sin(mrad) * (1.914602 - jc * (0.004817 + 0.000014 * jc))
+        + np.sin(mrad + mrad) * (0.019993 - 0.000101 * jc)
+        + np.sin(mrad + mrad + mrad) * 0.000289
+    )
+
+
+def _sun_apparent_long(jc: np.ndarray) -> np.ndarray:
+    true_long = _geom_mean_long_sun(jc) + _sun_eq_of_center(jc)
+    omega = 125.04 - 1934.136 * jc
+    return true_long - 0.00569 - 0.00478 * np.sin(np.radians(omega))
+
+
+def _obliquity_correction(jc: np.ndarray) -> np.ndarray:
+    seconds = 21.448 - jc * (46.815 + jc * (0.00059 - jc * (0.001813)))
+    e0 = 23.0 + (26.0 + (seconds / 60.0)) / 60.0
+    omega = 125.04 - 1934.136 * jc
+    return e0 + 0.00256 * np.cos(np.radians(omega))
+
+
+def _sun_declination(jc: np.ndarray) -> np.ndarray:
+    sint = np.sin(np.radians(_obliquity_correction(jc))) * np.sin(
+        np.radians(_sun_apparent_long(jc))
+    )
+    return np.degrees(np.arcsin(sint))
+
+
+def _eq_of_time(jc: np.ndarray) -> np.ndarray:
+    l0 = _geom_mean_long_sun(jc)
+    e = _eccentric_location_earth_orbit(jc)
+    m = _geom_mean_anomaly_sun(jc)
+
+    y = np.tan(np.radians(_obliquity_correction(jc)) / 2.0)
+    y = y * y
+
+    sin2l0 = np.sin(2.0 * np.radians(l0))
+    sinm = np.sin(np.radians(m))
+    cos2l0 = np.cos(2.0 * np.radians(l0))
+    sin4l0 = np.sin(4.0 * np.radians(l0))
+    sin2m = np.sin(2.0 * np.radians(m))
+
+    etime = (
+        y * sin2l0
+        - 2.0 * e * sinm
+        + 4.0 * e * y * sinm * cos2l0
+        - 0.5 * y * y * sin4l0
+        - 1.25 * e * e * sin2m
+    )
+    return np.degrees(etime) * 4.0
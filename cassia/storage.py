@@ -0,0 +1,157 @@
+"""Compiled, memory-mapped storage for the port, vessel and tide datasets.
+
+``python -m cassia.storage OUTPUT_DIR`` converts the CSVs in ``assets/`` to a
+directory of ``.npy`` column files plus a ``manifest.json``. Loading it maps
+the tide arrays read-only, so startup does no parsing and processes serving
+the same directory share the pages.
+"""
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, NamedTuple, Union
+
+import numpy as np
+import pandas as pd  # type:ignore
+
+from cassia.dispatchers import ports_csv_path, vessels_csv_path
+from cassia.helpers import tide_heights_csv_path
+from cassia.registry import PortRegistry, VesselRegistry
+from cassia.tide_store import TideStore
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+PORT_COLUMNS = {
+    "unlocode": "UNLOCODE",
+    "name": "NAME",
+    "latitude": "LATITUDE",
+    "longitude": "LONGITUDE",
+    "approach_mllw_meters": "APPROACH_MLLW_METERS",
+}
+VESSEL_COLUMNS = {"imo": "IMO", "draught": "DRAUGHT", "name": "NAME", "dwt": "DWT"}
+
+PathLike = Union[str, Path]
+
+
+class CompiledData(NamedTuple):
+    vessels_dispatcher: VesselRegistry
+    ports_dispatcher: PortRegistry
+    tide_store: TideStore
+
+
+def compile_data(
+    output_dir: PathLike,
+    tide_heights_df: pd.DataFrame,
+    ports_df: pd.DataFrame,
+    vessels_df: pd.DataFrame,
+) -> Path:
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Every port's extremes back to back, with offsets[i]:offsets[i + 1]
+    # delimiting port i.
+    tide_store = TideStore.from_dataframe(tide_heights_df)
+    offsets = np.concatenate(
+        ([0], np.cumsum([len(epochs) for epochs in tide_store.epochs]))
+    )
+    _save(output_dir, "tide_epochs", np.concatenate(tide_store.epochs))
+    _save(output_dir, "tide_heights", np.concatenate(tide_store.heights))
+    _save(output_dir, "tide_offsets", offsets.astype(np.int64))
+
+    for prefix, columns, df in (
+        ("ports", PORT_COLUMNS, ports_df),
+        ("vessels", VESSEL_COLUMNS, vessels_df),
+    ):
+        for field, column in columns.items():
+            values = df[column].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            _save(output_dir, f"{prefix}_{field}", values)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "version": tide_store.version,
+        "tide_ports": tide_store.port_names,
+        "tide_digests": [digest.hex() for digest in tide_store.port_digests],
+        "rows": {
+            "tide": int(offsets[-1]),
+            "ports": len(ports_df),
+            "vessels": len(vessels_df),
+        },
+    }
+    (output_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return output_dir
+
+
+def compile_csv(
+    output_dir: PathLike,
+    tide_heights_csv: PathLike = tide_heights_csv_path,
+    ports_csv: PathLike = ports_csv_path,
+    vessels_csv: PathLike = vessels_csv_path,
+) -> Path:
+    return compile_data(
+        output_dir,
+        tide_heights_df=pd.read_csv(tide_heights_csv),
+        ports_df=pd.read_csv(ports_csv),
+        vessels_df=pd.read_csv(vessels_csv),
+    )
+
+
+def load_compiled(path: PathLike) -> CompiledData:
+    path = Path(path)
+    manifest = json.loads((path / MANIFEST).read_text())
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ValueError(
+            f"{path} has storage format {manifest.get('format')!r}, "
+            f"expected {FORMAT_VERSION}; recompile it."
+        )
+
+    # The tide arrays stay on disk: each port gets read-only views into the
+    # mapped files, and the stored digests spare hashing them on load.
+    epochs = np.load(path / "tide_epochs.npy", mmap_mode="r")
+    heights = np.load(path / "tide_heights.npy", mmap_mode="r")
+    offsets = np.load(path / "tide_offsets.npy")
+    bounds = list(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+    tide_store = TideStore(
+        port_names=manifest["tide_ports"],
+        epochs=[epochs[start:end] for start, end in bounds],
+        heights=[heights[start:end] for start, end in bounds],
+        port_digests=[bytes.fromhex(digest) for digest in manifest["tide_digests"]],
+    )
+
+    ports = _load_columns(path, "ports", PORT_COLUMNS)
+    ports_dispatcher = PortRegistry(ports.pop("unlocode"), **ports)
+
+    vessels = _load_columns(path, "vessels", VESSEL_COLUMNS)
+    vessels_dispatcher = VesselRegistry(vessels.pop("imo"), **vessels)
+
+    return CompiledData(vessels_dispatcher, ports_dispatcher, tide_store)
+
+
+def _save(output_dir: Path, name: str, values: np.ndarray) -> None:
+    np.save(output_dir / f"{name}.npy", np.ascontiguousarray(values), allow_pickle=False)
+
+
+def _load_columns(
+    path: Path, prefix: str, columns: Dict[str, str]
+) -> Dict[str, np.ndarray]:
+    return {field: np.load(path / f"{prefix}_{field}.npy") for field in columns}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compile the port, vessel and tide CSVs for memory-mapped loading."
+    )
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--tide-heights", type=Path, default=tide_heights_csv_path)
+    parser.add_argument("--ports", type=Path, default=ports_csv_path)
+    parser.add_argument("--vessels", type=Path, default=vessels_csv_path)
+    args = parser.parse_args()
+
+    output_dir = compile_csv(args.output_dir, args.tide_heights, args.ports, args.vessels)
+    print(f"Compiled to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Window subscriptions, recomputed only when the data they depend on changes.
+
+A subscription watches the tidal or combined windows of one draught at one
+port from one arrival time. Cassia reports every tide update as a Change per
+port, with the span over which the port's tide curve moved, and every
+change of a port's restriction layers as a Change covering all time. Only
+the subscriptions at that port whose horizon overlaps the span are
+recomputed, those sharing a draught and horizon in one arrival sweep, and
+their listeners get the windows added and removed.
+"""
+
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd  # type:ignore
+
+from cassia.intervals import to_nanoseconds
+
+Windows = List[Tuple[pd.Timestamp, pd.Timestamp]]
+KINDS = ("tidal", "combined")
+
+
+class Change(NamedTuple):
+    unlocode: str
+    start: float  # Epoch seconds; infinite when unbounded
+    end: float
+    tidal: bool = True  # False when only the restriction layers changed
+
+
+class Watch(NamedTuple):
+    kind: str  # "tidal" or "combined"
+    unlocode: str
+    draught: float
+    arrival_time: pd.Timestamp
+    days: int = 14
+
+    def affected_by(self, change: Change) -> bool:
+        if change.unlocode != self.unlocode:
+            return False
+        if not change.tidal and self.kind == "tidal":
+            return False
+        start = to_nanoseconds(self.arrival_time) / 1e9
+        return change.start <= start + self.days * 86400 and change.end >= start
+
+
+class Update(NamedTuple):
+    subscription_id: str
+    watch: Watch
+    version: str  # Of the tide data the windows were computed from
+    windows: Optional[Windows]  # None once the subscription is removed
+    added: Windows
+    removed: Windows
+
+
+Listener = Callable[[Update], None]
+
+
+class Subscriptions:
+    def __init__(self, cassia) -> None:
+        self.cassia = cassia
+        # Held while windows are replaced and listeners told, so a listener
+        # added meanwhile gets either the old windows and the update, or the
+        # new windows alone.
+        self._lock = threading.RLock()
+        self._watches: Dict[str, Watch] = {}
+        self._windows: Dict[str, Windows] = {}
+        self._listeners: Dict[str, List[Listener]] = defaultdict(list)
+        self._idle_since: Dict[str, float] = {}
+        # Numbers each refresh, and the refresh each subscription's windows
+        # come from, so a slower, older refresh never overwrites a newer one.
+        self._refreshes = 0
+        self._refreshed: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._watches)
+
+    def __contains__(self, subscription_id: str) -> bool:
+        return subscription_id in self._watches
+
+    def start(self) -> "Subscriptions":
+        self.cassia.add_listener(self.refresh)
+        return self
+
+    def close(self) -> None:
+        self.cassia.remove_listener(self.refresh)
+
+    def subscribe(self, watch: Watch) -> Tuple[str, Windows]:
+        if watch.kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}, got {watch.kind!r}.")
+        subscription_id = uuid.uuid4().hex
+        while True:
+            refreshes = self._refreshes
+            windows = self._compute([watch])[0]
+            with self._lock:
+                # Computed again if a refresh started meanwhile, which could
+                # not yet see this subscription.
+                if self._refreshes != refreshes:
+                    continue
+                self._windows[subscription_id] = windows
+                self._watches[subscription_id] = watch
+                self._refreshed[subscription_id] = refreshes
+                self._idle_since[subscription_id] = time.monotonic()
+                return subscription_id, windows
+
+    def unsubscribe(self, subscription_id: str) -> bool:
+        with self._lock:
+            watch = self._watches.pop(subscription_id, None)
+            if watch is None:
+                return False
+            self._windows.pop(subscription_id)
+            self._refreshed.pop(subscription_id)
+            self._idle_since.pop(subscription_id, None)
+            version = self.cassia.snapshot.version
+            closed = Update(subscription_id, watch, version, None, [], [])
+            for listener in self._listeners.pop(subscription_id, []):
+                listener(closed)
+            return True
+
+    def listen(self, subscription_id: str, listener: Listener) -> Windows:
+        # The current windows; ``listener`` then gets each update, from the
+        # thread that changed the data.
+        with self._lock:
+            if subscription_id not in self._watches:
+                raise KeyError(f"No subscription {subscription_id!r}.")
+            self._listeners[subscription_id].append(listener)
+            self._idle_since.pop(subscription_id, None)
+            return self._windows[subscription_id]
+
+    def unlisten(self, subscription_id: str, listener: Listener) -> None:
+        with self._lock:
+            listeners = self._listeners.get(subscription_id, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if not listeners and subscription_id in self._watches:
+                self._listeners.pop(subscription_id, None)
+                self._idle_since[subscription_id] = time.monotonic()
+
+    def expire(self, idle: float) -> int:
+        # Removes subscriptions nobody has listened to for ``idle`` seconds.
+        cutoff = time.monotonic() - idle
+        with self._lock:
+            expired = [
+                subscription_id
+                for subscription_id, since in self._idle_since.items()
+                if since < cutoff
+            ]
+            for subscription_id in expired:
+                self.unsubscribe(subscription_id)
+        return len(expired)
+
+    def affected(self, changes: Sequence[Change]) -> List[str]:
+        with self._lock:
+            return [
+                subscription_id
+                for subscription_id, watch in self._watches.items()
+                if any(watch.affected_by(change) for change in changes)
+            ]
+
+    def refresh(self, changes: Sequence[Change]) -> List[Update]:
+        # Recomputes the subscriptions the changes may affect, without holding
+        # the lock, then tells the listeners of those whose windows differ.
+        with self._lock:
+            self._refreshes += 1
+            refresh = self._refreshes
+            subscription_ids = self.affected(changes)
+            watches = [self._watches[key] for key in subscription_ids]
+        if not subscription_ids:
+            return []
+        version = self.cassia.snapshot.version
+        computed = self._compute(watches)
+
+        updates = []
+        with self._lock:
+            for subscription_id, watch, windows in zip(
+                subscription_ids, watches, computed
+            ):
+                if self._refreshed.get(subscription_id, refresh) >= refresh:
+                    continue  # Removed, or refreshed by a later change
+                self._refreshed[subscription_id] = refresh
+                previous = self._windows[subscription_id]
+                previous_set, windows_set = set(previous), set(windows)
+                added = [window for window in windows if window not in previous_set]
+                removed = [window for window in previous if window not in windows_set]
+                if not added and not removed:
+                    continue
+                self._windows[subscription_id] = windows
+                update = Update(subscription_id, watch, version, windows, added, removed)
+                updates.append(update)
+                for listener in self._listeners.get(subscription_id, []):
+                    listener(update)
+        return updates
+
+    def _compute(self, watches: Sequence[Watch]) -> List[Windows]:
+        # Watches sharing a kind, port, draught, horizon and time zone in one
+        # sweep; single ones through the cache.
+        groups: Dict[tuple, List[int]] = defaultdict(list)
+        for position, watch in enumerate(watches):
+            tz = str(pd.Timestamp(watch.arrival_time).tz)
+            groups[(watch.kind, watch.unlocode, watch.draught, watch.days, tz)].append(
+                position
+            )
+
+        windows: List[Optional[Windows]] = [None] * len(watches)
+        for (kind, unlocode, draught, days, _), positions in groups.items():
+            arrival_times = [watches[position].arrival_time for position in positions]
+            if len(positions) == 1:
+                query = (None, unlocode, arrival_times[0], days)
+                if kind == "tidal":
+                    result = self.cassia.get_tidal_windows(*query, draught=draught)
+                    windows[positions[0]] = result.tidal_windows
+                else:
+                    result = self.cassia.get_combined_windows(*query, draught=draught)
+                    windows[positions[0]] = result.combined_windows
+                continue
+
+            if kind == "tidal":
+                results = self.cassia.get_tidal_windows_sweep(
+                    None, unlocode, arrival_times, days, draught=draught
+                )
+                found = [result.tidal_windows for result in results]
+            else:
+                results = self.cassia.get_combined_windows_sweep(
+                    None, unlocode, arrival_times, days, draught=draught
+                )
+                found = [result.combined_windows for result in results]
+            for position, result_windows in zip(positions, found):
+                windows[position] = result_windows
+        return windows
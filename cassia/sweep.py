@@ -0,0 +1,127 @@
+"""Tidal windows for many arrival times at one port, from one depth curve.
+
+Consecutive horizons overlap almost entirely, so the depth curve is computed
+once over the union of the horizons and each arrival's windows are cut out
+of it. On the grid engine, arrivals a whole number of resolution steps apart
+share grid points, and each gets exactly the windows of its own
+calculation; arrivals off that grid get a union grid of their own.
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd  # type:ignore
+
+from cassia.interpolation import (
+    HORIZON,
+    RESOLUTION,
+    analytic_windows,
+    check_engine,
+    depth_curve,
+    grid_points,
+)
+from cassia.intervals import IntervalSet
+from cassia.tide_store import TideStore
+
+Windows = List[Tuple[pd.Timestamp, pd.Timestamp]]
+
+
+class SweepSlice(NamedTuple):
+    """One arrival's share of the sweep."""
+
+    tidal_windows: Windows
+    time_range: Optional[pd.DatetimeIndex]
+    total_depths: Optional[np.ndarray]
+    end: pd.Timestamp  # Last instant of the horizon the windows cover
+    # Windows over the union of the horizons sharing this arrival's grid.
+    union_windows: IntervalSet
+
+
+def sweep_tidal_windows(
+    draught: float,
+    unlocode: str,
+    arrival_times: pd.DatetimeIndex,
+    ports_dispatcher,
+    tide_store: TideStore,
+    engine: str = "grid",
+    horizon: pd.Timedelta = HORIZON,
+    resolution: pd.Timedelta = RESOLUTION,
+) -> List[SweepSlice]:
+    # One slice per arrival, in the given order.
+    check_engine(engine)
+    port = ports_dispatcher[unlocode]
+    arrival_times = pd.DatetimeIndex(arrival_times)
+    if not len(arrival_times):
+        return []
+
+    if engine == "analytic":
+        fleet_windows = analytic_windows(
+            port,
+            tide_store,
+            np.array([draught], dtype=np.float64),
+            arrival_times.min().timestamp(),
+            (arrival_times.max() + horizon).timestamp(),
+            tz=arrival_times.tz,
+        )
+        union = IntervalSet.from_windows(
+            list(zip(fleet_windows.start, fleet_windows.end)), tz=arrival_times.tz
+        )
+        slices = [
+            SweepSlice(
+                union.clip(arrival_time, arrival_time + horizon).to_windows(),
+                None,
+                None,
+                arrival_time + horizon,
+                union,
+            )
+            for arrival_time in arrival_times
+        ]
+        return slices
+
+    points = grid_points(horizon, resolution)
+    step = resolution.value
+    nanoseconds = arrival_times.as_unit("ns").asi8
+    residues = (nanoseconds - nanoseconds.min()) % step
+
+    slices: List[Optional[SweepSlice]] = [None] * len(arrival_times)
+    for residue in np.unique(residues):
+        members = np.flatnonzero(residues == residue)
+        first = members[np.argmin(nanoseconds[members])]
+        offsets = (nanoseconds[members] - nanoseconds[first]) // step
+
+        time_range, total_depths = depth_curve(
+            port,
+            pd.date_range(
+                start=arrival_times[first],
+                periods=int(offsets.max()) + points,
+                freq=resolution,
+            ),
+            tide_store,
+        )
+        run_starts, run_ends = navigable_runs(total_depths > draught)
+        union = IntervalSet.from_windows(
+            list(zip(time_range[run_starts], time_range[run_ends])),
+            tz=arrival_times.tz,
+        )
+
+        for member, offset in zip(members.tolist(), offsets.tolist()):
+            # The runs overlapping this arrival's grid points, cut to them.
+            last = offset + points - 1
+            lo = int(np.searchsorted(run_ends, offset, side="left"))
+            hi = int(np.searchsorted(run_starts, last, side="right"))
+            window_starts = np.maximum(run_starts[lo:hi], offset)
+            window_ends = np.minimum(run_ends[lo:hi], last)
+            slices[member] = SweepSlice(
+                list(zip(time_range[window_starts], time_range[window_ends])),
+                time_range[offset : last + 1],
+                total_depths[offset : last + 1],
+                time_range[last],
+                union,
+            )
+    return slices
+
+
+def navigable_runs(can_navigate: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # First and last index of every run of navigable grid points.
+    edges = np.diff(np.concatenate(([0], can_navigate.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
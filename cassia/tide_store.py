@@ -0,0 +1,213 @@
+import hashlib
+
+import numpy as np
+import pandas as pd  # type:ignore
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cassia.helpers import from_epoch_seconds, to_epoch_seconds
+
+UPDATE_MODES = ("append", "replace")
+
+
+class TideStore:
+    """Per-port tide extremes as sorted, contiguous epoch-second/height arrays."""
+
+    def __init__(
+        self,
+        port_names: Sequence[str],
+        epochs: Sequence[np.ndarray],
+        heights: Sequence[np.ndarray],
+        port_digests: Optional[Sequence[bytes]] = None,
+    ) -> None:
+        if not len(port_names) == len(epochs) == len(heights):
+            raise ValueError("port_names, epochs and heights must have the same length.")
+
+        self.port_names: List[str] = list(port_names)
+        self.codes: Dict[str, int] = {
+            name: code for code, name in enumerate(self.port_names)
+        }
+        self.epochs: List[np.ndarray] = list(epochs)
+        self.heights: List[np.ndarray] = list(heights)
+        self.port_digests: List[bytes] = (
+            list(port_digests)
+            if port_digests is not None
+            else [_port_digest(*port) for port in zip(port_names, epochs, heights)]
+        )
+        self.version = self._fingerprint()
+
+    @classmethod
+    def from_dataframe(cls, tide_heights_df: pd.DataFrame) -> "TideStore":
+        codes, port_names = pd.factorize(tide_heights_df["PORT_NAME"], sort=True)
+        epochs = to_epoch_seconds(tide_heights_df["TIDE_DATETIME"])
+        heights = tide_heights_df["TIDE_HEIGHT_MT"].to_numpy(dtype=np.float64)
+
+        order = np.lexsort((epochs, codes))
+        codes, epochs, heights = codes[order], epochs[order], heights[order]
+        bounds = np.searchsorted(codes, np.arange(len(port_names) + 1))
+
+        return cls(
+            port_names=list(port_names),
+            epochs=[
+                np.ascontiguousarray(epochs[start:end])
+                for start, end in zip(bounds[:-1], bounds[1:])
+            ],
+            heights=[
+                np.ascontiguousarray(heights[start:end])
+                for start, end in zip(bounds[:-1], bounds[1:])
+            ],
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        lengths = [len(epochs) for epochs in self.epochs]
+        return pd.DataFrame(
+            {
+                "PORT_NAME": np.repeat(self.port_names, lengths),
+                "TIDE_DATETIME": from_epoch_seconds(
+                    np.concatenate(self.epochs) if self.epochs else []
+                ),
+                "TIDE_HEIGHT_MT": np.concatenate(self.heights) if self.heights else [],
+            }
+        )
+
+    def with_updates(
+        self, tide_heights_df: pd.DataFrame, mode: str = "append"
+    ) -> "TideStore":
+        """A new store with the given rows applied to the ports they mention.
+
+        ``"append"`` splices the rows into each port's forecast, superseding
+        the existing extremes within the time span they cover; ``"replace"``
+        discards the port's previous extremes. Other ports share their arrays
+        with this store, which is left untouched.
+        """
+        if mode not in UPDATE_MODES:
+            raise ValueError(f"mode must be one of {UPDATE_MODES}, got {mode!r}.")
+
+        updates = TideStore.from_dataframe(tide_heights_df)
+        port_names, epochs = list(self.port_names), list(self.epochs)
+        heights, port_digests = list(self.heights), list(self.port_digests)
+
+        for name, new_epochs, new_heights, digest in zip(
+            updates.port_names, updates.epochs, updates.heights, updates.port_digests
+        ):
+            code = self.codes.get(name)
+            if code is None:
+                port_names.append(name)
+                epochs.append(new_epochs)
+                heights.append(new_heights)
+                port_digests.append(digest)
+                continue
+
+            if mode == "append" and len(new_epochs):
+                old_epochs, old_heights = self.epochs[code], self.heights[code]
+                before = int(np.searchsorted(old_epochs, new_epochs[0], side="left"))
+                after = int(np.searchsorted(old_epochs, new_epochs[-1], side="right"))
+                new_epochs = np.concatenate(
+                    (old_epochs[:before], new_epochs, old_epochs[after:])
+                )
+                new_heights = np.concatenate(
+                    (old_heights[:before], new_heights, old_heights[after:])
+                )
+                digest = _port_digest(name, new_epochs, new_heights)
+
+            epochs[code], heights[code] = new_epochs, new_heights
+            port_digests[code] = digest
+
+        return TideStore(port_names, epochs, heights, port_digests)
+
+    def _fingerprint(self) -> str:
+        # Content hash identifying this dataset, e.g. for cache invalidation.
+        # Built from per-port digests so updates only rehash the ports they touch.
+        digest = hashlib.blake2b(digest_size=16)
+        for port_digest in self.port_digests:
+            digest.update(port_digest)
+        return digest.hexdigest()
+
+    def __contains__(self, port_name: str) -> bool:
+        return port_name in self.codes
+
+    def __len__(self) -> int:
+        return len(self.port_names)
+
+    def span(self) -> Tuple[float, float]:
+        # First and last extreme across all ports, in epoch seconds.
+        non_empty = [epochs for epochs in self.epochs if len(epochs)]
+        return (
+            min(epochs[0] for epochs in non_empty),
+            max(epochs[-1] for epochs in non_empty),
+        )
+
+    def changed_spans(self, previous: "TideStore") -> Dict[str, Tuple[float, float]]:
+        # For each port whose extremes differ from ``previous``, the span in
+        # epoch seconds outside which its interpolated curve is unchanged;
+        # infinite on a side whose extrapolation may have changed.
+        spans = {}
+        for name in set(self.port_names) | set(previous.port_names):
+            code, old_code = self.codes.get(name), previous.codes.get(name)
+            if code is None or old_code is None:
+                spans[name] = (-np.inf, np.inf)
+            elif self.port_digests[code] != previous.port_digests[old_code]:
+                spans[name] = _changed_span(
+                    previous.epochs[old_code],
+                    previous.heights[old_code],
+                    self.epochs[code],
+                    self.heights[code],
+                )
+        return spans
+
+    def port_code(self, port_name: str) -> int:
+        try:
+            return self.codes[port_name]
+        except KeyError:
+            raise KeyError(f"No tide data for port {port_name!r}.") from None
+
+    def get(self, port_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        code = self.port_code(port_name)
+        return self.epochs[code], self.heights[code]
+
+    def window(
+        self, port_name: str, start: float, end: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # The extremes needed to interpolate (or extrapolate) anywhere in
+        # [start, end]: the enclosing pair on each side, never fewer than two.
+        epochs, heights = self.get(port_name)
+        n = len(epochs)
+        if n < 2:
+            return epochs, heights
+
+        lo = int(np.searchsorted(epochs, start, side="right")) - 1
+        hi = int(np.searchsorted(epochs, end, side="left")) + 1
+        lo = max(min(lo, n - 2), 0)
+        hi = min(max(hi, lo + 2), n)
+        return epochs[lo:hi], heights[lo:hi]
+
+
+def _port_digest(name: str, epochs: np.ndarray, heights: np.ndarray) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(name.encode())
+    digest.update(np.ascontiguousarray(epochs, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(heights, dtype=np.float64).tobytes())
+    return digest.digest()
+
+
+def _changed_span(
+    old_epochs: np.ndarray,
+    old_heights: np.ndarray,
+    epochs: np.ndarray,
+    heights: np.ndarray,
+) -> Tuple[float, float]:
+    # Segments between extremes shared at the start or at the end of both
+    # arrays are unchanged; so is the extrapolation beyond two of them.
+    length = min(len(old_epochs), len(epochs))
+    same = (old_epochs[:length] == epochs[:length]) & (
+        old_heights[:length] == heights[:length]
+    )
+    prefix = length if same.all() else int(np.argmin(same))
+    same = (old_epochs[::-1][:length] == epochs[::-1][:length]) & (
+        old_heights[::-1][:length] == heights[::-1][:length]
+    )
+    suffix = length if same.all() else int(np.argmin(same))
+    suffix = min(suffix, length - prefix)
+
+    start = float(epochs[prefix - 1]) if prefix >= 2 else -np.inf
+    end = float(epochs[len(epochs) - suffix]) if suffix >= 2 else np.inf
+    return start, end
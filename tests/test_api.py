@@ -1,12 +1,527 @@
+import io
+import json
+import threading
+import time
+import zipfile
+
+import pandas as pd  # type:ignore
 import pytest
-# from fastapi.testclient import TestClient
-# from api.main import app
+from fastapi.testclient import TestClient
+import api.main
+from api.encoding import (
+    COLUMNAR_JSON,
+    COLUMNAR_MSGPACK,
+    available_media_types,
+    negotiate,
+)
+from api.main import app
+
+# FastAPI testclient to mock running docker
+client = TestClient(app)
+
 
-# # FastAPI testclient to mock running docker
-# client = TestClient(app)
+def make_query(unlocode, imo, arrival_datetime="2024-03-01T00:00:00"):
+    return {
+        "port_id": unlocode,
+        "vessel_information": {
+            "draught": "14.45",
+            "dwt": "80276.0",
+            "name": "EPIPHANIA",
+            "imo": imo,
+        },
+        "arrival_datetime": arrival_datetime,
+    }
 
 
 # def test_heartbeat():
 #     response = client.get("/heartbeat")
 #     assert response.status_code == 200
 #     assert response.json() == {"status": "I am alive :)"}
+
+
+@pytest.mark.parametrize("endpoint", ["/tidal-windows/", "/combined-windows/"])
+def test_single_query(endpoint):
+    response = client.post(endpoint, json=make_query("AUBNE", 9582116))
+
+    assert response.status_code == 200
+    assert len(response.json()["tidal_windows"]) > 0
+
+
+@pytest.mark.parametrize("endpoint", ["/tidal-windows/", "/combined-windows/"])
+def test_batch_streams_one_line_per_query(endpoint):
+    """Each query gets one NDJSON line, equal to the single-query response."""
+    queries = [
+        make_query("AUBNE", 9582116),
+        make_query("AUDAM", 9790933),
+        make_query("AUBNE", 9790933),
+        make_query("AUBNE", 1234567),
+        make_query("AUBNE", 9582116, "2024-03-05T12:00:00"),
+    ]
+
+    response = client.post(endpoint + "batch", json=queries)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == list(range(len(queries)))
+
+    # The unregistered IMO is answered with the draught sent in the query.
+    for line in lines:
+        single = client.post(endpoint, json=queries[line["index"]]).json()
+        assert line["tidal_windows"] == single["tidal_windows"]
+
+
+def test_admin_tide_data_update(monkeypatch):
+    """Ingested rows are visible to the next query; reload restores the CSV."""
+    monkeypatch.setattr(api.main, "ADMIN_TOKEN", "secret")
+    update = {
+        "mode": "replace",
+        "rows": [
+            {
+                "port_name": "Brisbane",
+                "tide_datetime": tide_datetime,
+                "tide_height_mt": 9.0,
+            }
+            for tide_datetime in ["2024-02-01T00:00:00", "2024-04-01T00:00:00"]
+        ],
+    }
+
+    assert client.post("/admin/tide-data", json=update).status_code == 403
+
+    try:
+        response = client.post(
+            "/admin/tide-data", json=update, headers={"X-Admin-Token": "secret"}
+        )
+        assert response.status_code == 200
+        assert response.json()["ports"] == ["Brisbane"]
+
+        # A constant high tide leaves the port open for the whole horizon.
+        windows = client.post(
+            "/tidal-windows/", json=make_query("AUBNE", 9582116)
+        ).json()["tidal_windows"]
+        assert len(windows) == 1
+    finally:
+        reloaded = client.post(
+            "/admin/tide-data/reload", headers={"X-Admin-Token": "secret"}
+        )
+    assert reloaded.json()["serial"] == response.json()["serial"] + 1
+
+
+@pytest.mark.parametrize("endpoint", ["/tidal-windows/", "/combined-windows/"])
+def test_batch_mixes_naive_and_aware_arrivals(endpoint):
+    queries = [
+        make_query("AUBNE", 9582116, arrival_datetime)
+        for arrival_datetime in [
+            "2024-03-01T00:00:00",
+            "2024-03-01T00:00:00Z",
+            "2024-03-01T10:00:00+10:00",
+        ]
+    ]
+
+    response = client.post(endpoint + "batch", json=queries)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    for line in lines:
+        single = client.post(endpoint, json=queries[line["index"]]).json()
+        assert line["tidal_windows"] == single["tidal_windows"]
+
+
+def test_stream_matches_single_query():
+    query = dict(make_query("AUBNE", 9582116), horizon_days=30)
+
+    response = client.post("/tidal-windows/stream", json=query)
+
+    assert response.status_code == 200
+    streamed = [json.loads(line) for line in response.text.splitlines()]
+    single = client.post("/tidal-windows/", json=query).json()["tidal_windows"]
+    assert streamed == single
+    assert len(single) > len(
+        client.post("/tidal-windows/", json=make_query("AUBNE", 9582116)).json()[
+            "tidal_windows"
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "fmt, media_type", [("png", "image/png"), ("svg", "image/svg+xml")]
+)
+def test_plot_endpoint(fmt, media_type):
+    params = {
+        "port_id": "AUBNE",
+        "imo": 9582116,
+        "arrival_datetime": "2024-03-01T00:00:00",
+        "format": fmt,
+    }
+
+    response = client.get("/plot/combined-windows", params=params)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    assert client.get("/plot/combined-windows", params=params).content == response.content
+
+
+def test_plot_batch_returns_archive():
+    plots = [
+        {
+            "kind": kind,
+            "port_id": "AUBNE",
+            "imo": 9582116,
+            "arrival_datetime": "2024-03-01T00:00:00",
+        }
+        for kind in ["tidal-windows", "combined-windows"]
+    ]
+
+    response = client.post("/plot/batch", json=plots)
+
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        names = archive.namelist()
+        assert names == ["0-tidal-windows-AUBNE.png", "1-combined-windows-AUBNE.png"]
+        assert all(archive.read(name).startswith(b"\x89PNG") for name in names)
+
+
+def test_metrics_and_server_timing():
+    """Requests report their stages in Server-Timing and are counted in /metrics."""
+    response = client.post("/combined-windows/", json=make_query("AUBNE", 9582116))
+
+    stages = {
+        entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")
+    }
+    assert {"api.compute", "api.serialize", "api.request"} <= stages
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'cassia_stage_seconds_count{stage="api.compute"}' in metrics.text
+    assert (
+        'cassia_requests_total{method="POST",path="/combined-windows/",status="200"}'
+        in metrics.text
+    )
+    assert 'cassia_cache_hit_ratio{cache="windows"}' in metrics.text
+
+
+def test_profile_requested_by_header(monkeypatch, tmp_path):
+    """A profiled request gets an id whose report is served by the debug endpoints."""
+    monkeypatch.setattr(api.main, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(api.main, "ADMIN_TOKEN", "secret")
+    query = make_query("AUBNE", 9582116, "2024-03-02T00:00:00")
+
+    unauthorised = client.post(
+        "/tidal-windows/", json=query, headers={"X-Cassia-Profile": "1"}
+    )
+    assert "X-Profile-Id" not in unauthorised.headers
+
+    headers = {"X-Cassia-Profile": "1", "X-Admin-Token": "secret"}
+    response = client.post("/tidal-windows/", json=query, headers=headers)
+    profile_id = response.headers["X-Profile-Id"]
+    assert response.json() == unauthorised.json()
+
+    listed = client.get("/debug/profiles", headers={"X-Admin-Token": "secret"}).json()
+    assert [profile["profile_id"] for profile in listed] == [profile_id]
+
+    report = client.get(
+        f"/debug/profiles/{profile_id}", headers={"X-Admin-Token": "secret"}
+    )
+    assert "compute_tidal_windows" in report.text
+    assert client.get(f"/debug/profiles/{profile_id}").status_code == 403
+    assert (
+        client.get("/debug/profiles/missing", headers={"X-Admin-Token": "secret"})
+        .status_code
+        == 404
+    )
+
+
+def test_profile_sampling(monkeypatch, tmp_path):
+    monkeypatch.setattr(api.main, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(api.main, "PROFILE_SAMPLE_RATE", 1.0)
+
+    response = client.post("/combined-windows/", json=make_query("AUBNE", 9582116))
+
+    assert (tmp_path / f"{response.headers['X-Profile-Id']}.pstats").is_file()
+
+
+def test_old_profiles_are_pruned(monkeypatch, tmp_path):
+    monkeypatch.setattr(api.main, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(api.main, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(api.main, "PROFILE_MAX_FILES", 2)
+    for name in ["20000101T000000-first", "20000102T000000-second"]:
+        (tmp_path / f"{name}.pstats").write_bytes(b"")
+
+    response = client.post("/tidal-windows/", json=make_query("AUBNE", 9582116))
+
+    assert sorted(path.stem for path in tmp_path.glob("*.pstats")) == [
+        "20000102T000000-second",
+        response.headers["X-Profile-Id"],
+    ]
+
+
+def test_request_draught_is_used():
+    """The query's draught decides the windows, whether or not the IMO is known."""
+    registered = make_query("AUBNE", 9582116)
+    unregistered = make_query("AUBNE", 1234567)
+    shallower = make_query("AUBNE", 9582116)
+    shallower["vessel_information"]["draught"] = "12.00"
+
+    windows = client.post("/tidal-windows/", json=registered).json()["tidal_windows"]
+
+    assert client.post("/tidal-windows/", json=unregistered).json()[
+        "tidal_windows"
+    ] == windows
+    assert client.post("/tidal-windows/", json=shallower).json()[
+        "tidal_windows"
+    ] != windows
+
+
+@pytest.fixture
+def process_executor(monkeypatch):
+    monkeypatch.setattr(api.main, "EXECUTOR_KIND", "process")
+    monkeypatch.setattr(api.main, "executor", None)
+    yield
+    if api.main.executor is not None:
+        api.main.executor.shutdown()
+
+
+def test_draught_index_endpoints():
+    sweep = client.post(
+        "/draught-sweep",
+        json={
+            "port_id": "AUBNE",
+            "draughts": ["14.45", "12.00"],
+            "arrival_datetime": "2024-03-01T00:00:00",
+        },
+    )
+    assert sweep.status_code == 200
+    results = sweep.json()["results"]
+    assert [result["draught"] for result in results] == [14.45, 12.0]
+    assert len(results[0]["tidal_windows"]) > len(results[1]["tidal_windows"])
+
+    max_draught = client.get(
+        "/max-draught",
+        params={
+            "port_id": "AUBNE",
+            "start_datetime": "2024-03-01T00:00:00",
+            "end_datetime": "2024-03-01T06:00:00",
+        },
+    ).json()["max_draught"]
+    # EPIPHANIA (14.45 m) can navigate through those six hours.
+    assert 14.45 < max_draught < 16.0
+
+    params = {"port_id": "AUBNE", "after": "2024-03-01T00:00:00", "min_minutes": 120}
+    window = client.get("/first-window", params=dict(params, draught=14.45))
+    assert window.status_code == 200
+    assert window.json()["start_time"] == "2024-03-01T00:00:00"
+    assert client.get("/first-window", params=dict(params, draught=30)).status_code == 404
+
+
+def test_draught_index_endpoints_on_process_workers(process_executor):
+    params = {
+        "port_id": "AUBNE",
+        "start_datetime": "2024-03-01T00:00:00",
+        "end_datetime": "2024-03-01T06:00:00",
+    }
+    expected = api.main.cassia.max_allowable_draught(
+        "AUBNE", pd.Timestamp("2024-03-01"), pd.Timestamp("2024-03-01 06:00")
+    )
+    response = client.get("/max-draught", params=params)
+    assert response.status_code == 200
+    assert response.json()["max_draught"] == expected
+
+    params = {"port_id": "AUBNE", "after": "2024-03-01T00:00:00", "draught": 14.45}
+    window = client.get("/first-window", params=params)
+    assert window.status_code == 200
+    assert window.json()["start_time"] == "2024-03-01T00:00:00"
+
+
+@pytest.mark.parametrize("kind", ["tidal-windows", "combined-windows"])
+def test_arrival_sweep(kind):
+    arrival_datetimes = ["2024-03-01T00:00:00", "2024-03-01T06:00:00"]
+    query = make_query("AUBNE", 9582116)
+    del query["arrival_datetime"]
+    response = client.post(
+        f"/{kind}/sweep", json=dict(query, arrival_datetimes=arrival_datetimes)
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["arrival_datetime"] for result in results] == arrival_datetimes
+    for arrival_datetime, result in zip(arrival_datetimes, results):
+        single = client.post(
+            f"/{kind}/", json=make_query("AUBNE", 9582116, arrival_datetime)
+        )
+        assert result["tidal_windows"] == single.json()["tidal_windows"]
+
+    empty = client.post(f"/{kind}/sweep", json=dict(query, arrival_datetimes=[]))
+    assert empty.status_code == 422
+
+
+def test_voyage_plan():
+    query = make_query("AUABP", 9582116)
+    response = client.post(
+        "/voyage-plan",
+        json={
+            "vessel_information": query["vessel_information"],
+            "calls": [
+                {"port_id": "AUABP", "transit_hours": 10, "stay_hours": 20},
+                {"port_id": "AUBNE", "transit_hours": 48, "draught": "12.00"},
+            ],
+            "departure_datetimes": [
+                f"2024-03-01T{hour:02d}:00:00" for hour in range(24)
+            ],
+            "max_wait_hours": 6,
+        },
+    )
+
+    assert response.status_code == 200
+    plan = response.json()
+    assert plan["schedules"]
+    assert plan["earliest"] in plan["schedules"]
+    assert all(len(s["arrival_datetimes"]) == 2 for s in plan["schedules"])
+
+
+@pytest.mark.parametrize("endpoint", ["/tidal-windows/", "/combined-windows/"])
+def test_columnar_response(endpoint):
+    query = make_query("AUBNE", 9582116)
+    windows = client.post(endpoint, json=query).json()["tidal_windows"]
+
+    response = client.post(endpoint, json=query, headers={"Accept": COLUMNAR_JSON})
+
+    assert response.headers["content-type"] == COLUMNAR_JSON
+    columns = response.json()
+    expected = [
+        (
+            int(pd.Timestamp(window["start_time"], tz="UTC").value // 10**6),
+            int(pd.Timestamp(window["end_time"], tz="UTC").value // 10**6),
+        )
+        for window in windows
+    ]
+    assert list(zip(columns["start_ms"], columns["end_ms"])) == expected
+
+
+def test_columnar_groups_for_sweeps():
+    sweep = client.post(
+        "/draught-sweep",
+        json={
+            "port_id": "AUBNE",
+            "draughts": ["14.45", "12.00"],
+            "arrival_datetime": "2024-03-01T00:00:00",
+        },
+    )
+    columnar_sweep = client.post(
+        "/draught-sweep",
+        json={
+            "port_id": "AUBNE",
+            "draughts": ["14.45", "12.00"],
+            "arrival_datetime": "2024-03-01T00:00:00",
+        },
+        headers={"Accept": f"application/json;q=0.5, {COLUMNAR_JSON}"},
+    ).json()
+
+    offsets = columnar_sweep["offsets"]
+    assert columnar_sweep["draughts"] == [14.45, 12.0]
+    assert [offsets[1] - offsets[0], offsets[2] - offsets[1]] == [
+        len(result["tidal_windows"]) for result in sweep.json()["results"]
+    ]
+
+
+def test_accept_negotiation():
+    assert negotiate(None) is None
+    assert negotiate("*/*") is None
+    assert negotiate("application/json") is None
+    assert negotiate(COLUMNAR_JSON) == COLUMNAR_JSON
+    assert negotiate(f"application/json, {COLUMNAR_JSON};q=0.9") is None
+    assert negotiate(f"{COLUMNAR_JSON}, */*;q=0.1") == COLUMNAR_JSON
+    expected = COLUMNAR_MSGPACK if COLUMNAR_MSGPACK in available_media_types() else None
+    assert negotiate("application/x-msgpack") == expected
+
+
+def test_msgpack_response():
+    msgpack = pytest.importorskip("msgpack")
+    query = make_query("AUBNE", 9582116)
+
+    response = client.post(
+        "/tidal-windows/", json=query, headers={"Accept": "application/msgpack"}
+    )
+    columnar = client.post(
+        "/tidal-windows/", json=query, headers={"Accept": COLUMNAR_JSON}
+    )
+
+    assert response.headers["content-type"] == COLUMNAR_MSGPACK
+    assert msgpack.unpackb(response.content) == columnar.json()
+
+
+def test_large_responses_are_gzipped():
+    query = dict(make_query("AUBNE", 9582116), horizon_days=30)
+
+    response = client.post(
+        "/tidal-windows/", json=query, headers={"Accept-Encoding": "gzip"}
+    )
+    streams = [
+        client.post(path, json=body, headers={"Accept-Encoding": "gzip"})
+        for path, body in [
+            ("/tidal-windows/stream", query),
+            ("/tidal-windows/batch", [query] * 3),
+            ("/combined-windows/batch", [query] * 3),
+        ]
+    ]
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()["tidal_windows"]) > 0
+    for stream in streams:
+        assert stream.status_code == 200
+        assert "content-encoding" not in stream.headers
+
+
+def test_subscription_events(monkeypatch):
+    """Subscribers are sent their windows, then a diff when the tides change."""
+    monkeypatch.setattr(api.main, "ADMIN_TOKEN", "secret")
+    headers = {"X-Admin-Token": "secret"}
+    query = make_query("AUBNE", 9582116, "2024-05-01T00:00:00")
+    response = client.post("/subscriptions", json=dict(query, kind="tidal-windows"))
+    assert response.status_code == 201
+    subscription_id = response.json()["id"]
+    windows = client.post("/tidal-windows/", json=query).json()["tidal_windows"]
+    assert response.json()["tidal_windows"] == windows
+
+    update = {
+        "mode": "append",
+        "rows": [
+            {
+                "port_name": "Brisbane",
+                "tide_datetime": tide_datetime,
+                "tide_height_mt": 9.0,
+            }
+            for tide_datetime in ["2024-05-03T00:00:00", "2024-05-04T00:00:00"]
+        ],
+    }
+
+    def update_then_unsubscribe():
+        # Once the stream below is listening.
+        while not api.main.subscriptions._listeners.get(subscription_id):
+            time.sleep(0.01)
+        client.post("/admin/tide-data", json=update, headers=headers)
+        assert client.delete(f"/subscriptions/{subscription_id}").status_code == 204
+
+    thread = threading.Thread(target=update_then_unsubscribe)
+    thread.start()
+    try:
+        url = f"/subscriptions/events?ids={subscription_id}"
+        with client.stream("GET", url) as stream:
+            assert stream.headers["content-type"].startswith("text/event-stream")
+            events = [
+                (event.split("\n")[0], json.loads(event.split("\n")[1][len("data: ") :]))
+                for event in stream.read().decode().strip().split("\n\n")
+            ]
+    finally:
+        thread.join()
+        client.post("/admin/tide-data/reload", headers=headers)
+
+    assert [name for name, _ in events] == [
+        "event: windows",
+        "event: diff",
+        "event: closed",
+    ]
+    assert events[0][1]["tidal_windows"] == windows
+    diff = events[1][1]
+    assert diff["id"] == subscription_id and diff["added"] and diff["removed"]
+    assert client.delete(f"/subscriptions/{subscription_id}").status_code == 404
+    assert client.get(f"/subscriptions/events?ids={subscription_id}").status_code == 404
@@ -0,0 +1,49 @@
+from benchmarks.suite import Scale, StageResult, compare, from_json, run, to_json
+from benchmarks.synthetic import synthetic_data
+
+SCALE = Scale(ports=3, fleet=5, tide_days=20, horizon_days=3)
+
+
+def test_synthetic_data_is_seeded():
+    """The same seed generates the same datasets at the requested scale."""
+    first = synthetic_data(3, 5, 20, seed=1)
+    second = synthetic_data(3, 5, 20, seed=1)
+
+    assert len(first.ports_dispatcher) == 3
+    assert len(first.vessels_dispatcher) == 5
+    assert first.tide_heights_df.equals(second.tide_heights_df)
+    assert not first.tide_heights_df.equals(
+        synthetic_data(3, 5, 20, seed=2).tide_heights_df
+    )
+
+
+def test_run_reports_selected_stages():
+    """Every selected stage gets a timing and peak memory, and the report round-trips."""
+    results = run(SCALE, repeat=1, only=["tidal", "combine"])
+
+    assert set(results) == {"tidal.grid", "tidal.analytic", "combine"}
+    assert all(result.min_ms > 0 and result.peak_kib > 0 for result in results.values())
+    assert from_json(to_json(SCALE, results)) == (SCALE, results)
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Slowdowns and memory growth past the threshold fail; noise does not."""
+    baseline = {
+        "slow": StageResult(10.0, 10.0, 100.0),
+        "fat": StageResult(10.0, 10.0, 100.0),
+        "noisy": StageResult(0.01, 0.01, 100.0),
+        "fine": StageResult(10.0, 10.0, 100.0),
+    }
+    results = {
+        "slow": StageResult(20.0, 20.0, 100.0),
+        "fat": StageResult(10.0, 10.0, 1000.0),
+        "noisy": StageResult(0.05, 0.05, 120.0),
+        "fine": StageResult(11.0, 11.0, 110.0),
+        "new": StageResult(50.0, 50.0, 100.0),
+    }
+
+    regressions = compare(results, baseline, threshold=0.25)
+
+    assert len(regressions) == 2
+    assert regressions[0].startswith("slow:")
+    assert regressions[1].startswith("fat: peak")
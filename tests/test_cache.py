@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pandas as pd  # type:ignore
+import pytest
+from cassia.cache import WindowCache
+from cassia.cassia import Cassia
+from cassia.helpers import get_tide_data
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_stats():
+    cache = WindowCache(maxsize=2)
+
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: -1)  # Hit, "b" is now least recently used
+    cache.get_or_compute("c", lambda: 3)
+
+    assert cache.get_or_compute("a", lambda: -1) == 1
+    assert cache.get_or_compute("b", lambda: 20) == 20
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (2, 4, 2, 2)
+
+
+def test_ttl_expiry():
+    clock = FakeClock()
+    cache = WindowCache(maxsize=8, ttl=60, clock=clock)
+
+    cache.get_or_compute("a", lambda: 1)
+    clock.now = 59
+    assert cache.get_or_compute("a", lambda: 2) == 1
+    clock.now = 61
+    assert cache.get_or_compute("a", lambda: 2) == 2
+
+
+def test_new_version_invalidates():
+    cache = WindowCache(versions=1)
+
+    cache.get_or_compute("a", lambda: 1, version="v1")
+
+    assert cache.get_or_compute("a", lambda: 2, version="v2") == 2
+    assert cache.stats.invalidations == 1
+
+
+def test_readers_of_the_previous_version_keep_their_hits():
+    """Old and new snapshot readers interleaving do not evict each other."""
+    cache = WindowCache()
+
+    for _ in range(3):
+        assert cache.get_or_compute("a", lambda: 1, version="v1") == 1
+        assert cache.get_or_compute("a", lambda: 2, version="v2") == 2
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.invalidations) == (4, 2, 0)
+
+    assert cache.get_or_compute("a", lambda: 3, version="v3") == 3
+    assert cache.get_or_compute("a", lambda: -1, version="v2") == 2
+    assert cache.stats.invalidations == 1
+    assert len(cache) == 2
+
+
+def test_identical_concurrent_requests_compute_once():
+    """A burst of identical requests is coalesced into one computation."""
+    cache = WindowCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "windows"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("a", compute)))
+        for _ in range(8)
+    ]
+    threads[0].start()
+    started.wait(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats.coalesced < 7 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["windows"] * 8
+
+
+def test_failed_computation_is_not_cached():
+    cache = WindowCache()
+
+    with pytest.raises(ZeroDivisionError):
+        cache.get_or_compute("a", lambda: 1 / 0)
+
+    assert cache.get_or_compute("a", lambda: 1) == 1
+
+
+def test_cassia_cache_invalidated_by_new_tide_data():
+    """Replacing the tide dataset stops cached results from being served."""
+    cassia = Cassia(cache=WindowCache())
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+
+    first = cassia.get_combined_windows(9582116, "AUBNE", arrival_time)
+    assert cassia.get_combined_windows(9582116, "AUBNE", arrival_time) is first
+
+    tide_heights_df = get_tide_data()
+    tide_heights_df["TIDE_HEIGHT_MT"] += 1.0
+    cassia.tide_heights_df = tide_heights_df
+
+    refreshed = cassia.get_combined_windows(9582116, "AUBNE", arrival_time)
+    assert refreshed is not first
+    assert refreshed.tidal_windows != first.tidal_windows
+
+
+def test_cassia_cache_keeps_time_zones_apart():
+    """The same instant in another zone is not answered in the first one."""
+    cassia = Cassia(cache=WindowCache())
+    utc = pd.Timestamp("2024-03-01 00:00", tz="UTC")
+
+    first = cassia.get_tidal_windows(9582116, "AUBNE", utc)
+    brisbane = cassia.get_tidal_windows(9582116, "AUBNE", utc.tz_convert("+10:00"))
+
+    assert brisbane is not first
+    assert brisbane.tidal_windows == first.tidal_windows
+    assert str(brisbane.tidal_windows[0][0].tz) == "UTC+10:00"
@@ -111,3 +111,88 @@ def test_vessels_without_windows(
         assert (
             len(tidal_windows) > 0
         ), f"Tidal windows should be available for vessel {vessel['name']} at port {unlocode}."
+
+
+@pytest.mark.parametrize("engine", ["grid", "analytic"])
+@pytest.mark.parametrize("unlocode", ports)
+def test_tidal_windows_many_matches_single_calls(load_vessels, engine, unlocode):
+    """Fleet windows equal the windows of one get_tidal_windows call per vessel."""
+    cassia = Cassia(engine=engine)
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+    imos = [int(imo) for imo in load_vessels["IMO"]]
+
+    fleet_windows = cassia.get_tidal_windows_many(
+        imos + [13.0], unlocode, arrival_time
+    )
+
+    for index, imo in enumerate(imos):
+        tidal_windows, _, _ = cassia.get_tidal_windows(imo, unlocode, arrival_time)
+        assert fleet_windows.windows(index) == tidal_windows
+    assert fleet_windows.draughts[-1] == 13.0
+    assert len(fleet_windows.windows(len(imos))) > 0
+
+
+def test_results_are_immutable_and_independent(cassia_instance):
+    """Each call returns its own frozen result; nothing is stored on Cassia."""
+    first = cassia_instance.get_combined_windows(
+        9582116, "AUBNE", pd.Timestamp("2024-03-01 00:00:00")
+    )
+    second = cassia_instance.get_combined_windows(
+        9790933, "AUDAM", pd.Timestamp("2024-04-01 00:00:00")
+    )
+
+    with pytest.raises(AttributeError):
+        first.combined_windows = second.combined_windows
+    # Results are shared through the cache, so their windows cannot change.
+    with pytest.raises(AttributeError):
+        first.combined_windows.append(second.combined_windows[0])
+    with pytest.raises(ValueError):
+        first.total_depths[0] = 0.0
+    assert (first.unlocode, first.draught) == ("AUBNE", 14.45)
+    assert first.combined_windows != second.combined_windows
+    assert not hasattr(cassia_instance, "combined_windows")
+
+
+def test_depth_curve_uses_the_result_tide_data(load_tide_heights):
+    """A result's curve is rebuilt from its own data after an update."""
+    cassia = Cassia(tide_heights_df=load_tide_heights, engine="analytic")
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+    before = cassia.get_tidal_windows(9582116, "AUBNE", arrival_time, 2)
+    _, depths = cassia.depth_curve(before)
+
+    brisbane = load_tide_heights[load_tide_heights["PORT_NAME"] == "Brisbane"]
+    cassia.ingest_tide_data(
+        brisbane.assign(TIDE_HEIGHT_MT=brisbane["TIDE_HEIGHT_MT"] + 1.0),
+        mode="replace",
+    )
+    after = cassia.get_tidal_windows(9582116, "AUBNE", arrival_time, 2)
+
+    assert (cassia.depth_curve(before)[1] == depths).all()
+    assert cassia.depth_curve(after)[1] == pytest.approx(depths + 1.0)
+
+
+def test_ingest_tide_data_swaps_snapshot(load_tide_heights):
+    """Ingestion publishes a new snapshot; one already taken is unaffected."""
+    cassia = Cassia(tide_heights_df=load_tide_heights)
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+    before = cassia.get_tidal_windows(9582116, "AUBNE", arrival_time)
+    snapshot = cassia.snapshot
+
+    brisbane = load_tide_heights[load_tide_heights["PORT_NAME"] == "Brisbane"]
+    updated = cassia.ingest_tide_data(
+        brisbane.assign(TIDE_HEIGHT_MT=brisbane["TIDE_HEIGHT_MT"] + 1.0),
+        mode="replace",
+    )
+
+    assert cassia.snapshot is updated and updated.serial == snapshot.serial + 1
+    assert updated.daylight_table is snapshot.daylight_table
+    assert snapshot.tide_store.get("Brisbane")[1][0] == brisbane["TIDE_HEIGHT_MT"].iloc[0]
+
+    after = cassia.get_tidal_windows(9582116, "AUBNE", arrival_time)
+    assert after.tidal_windows != before.tidal_windows
+    assert cassia._tidal_windows(
+        snapshot, 14.45, "AUBNE", arrival_time, 14
+    ).tidal_windows == before.tidal_windows
+
+    cassia.reload_tide_data(load_tide_heights)
+    assert cassia.tide_store.version == snapshot.version
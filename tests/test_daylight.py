@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from astral import LocationInfo
+from astral.sun import sun
+from cassia.daylight import DaylightTable, get_daylight_windows_corrected
+from cassia.solar import sunrise_sunset
+
+
+@pytest.mark.parametrize("unlocode", ["AUBNE", "AUABP", "AUDAM", "AUCTN"])
+def test_sunrise_sunset_matches_astral(load_ports, unlocode):
+    """The vectorised NOAA equations reproduce astral for a whole year."""
+    port = load_ports.loc[load_ports["UNLOCODE"] == unlocode].iloc[0]
+    dates = np.arange(np.datetime64("2024-01-01"), np.datetime64("2025-01-01"))
+    observer = LocationInfo(
+        latitude=port["LATITUDE"], longitude=port["LONGITUDE"]
+    ).observer
+
+    sunrises, sunsets = sunrise_sunset(port["LATITUDE"], port["LONGITUDE"], dates)
+
+    for date, sunrise, sunset in zip(dates, sunrises, sunsets):
+        s = sun(observer, date=date.astype(object))
+        assert pd.Timestamp(sunrise) == pd.Timestamp(s["sunrise"].replace(tzinfo=None))
+        assert pd.Timestamp(sunset) == pd.Timestamp(s["sunset"].replace(tzinfo=None))
+
+
+def test_sunrise_sunset_polar_night_is_missing():
+    """Where astral raises because the sun never rises, the result is NaT."""
+    sunrises, sunsets = sunrise_sunset(78.2, 15.6, np.array(["2024-12-21"], "M8[D]"))
+
+    assert np.isnat(sunrises.astype("datetime64[ns]")).all()
+    with pytest.raises(ValueError):
+        get_daylight_windows_corrected(78.2, 15.6, pd.Timestamp("2024-12-21"), days=1)
+
+
+def test_daylight_table_matches_direct_computation(cassia_instance):
+    """Slices of the precomputed table equal the windows computed on demand."""
+    table = DaylightTable.build(
+        cassia_instance.ports_dispatcher,
+        first_date=np.datetime64("2024-03-01"),
+        last_date=np.datetime64("2024-04-30"),
+    )
+    arrival_time = pd.Timestamp("2024-03-10 15:00:00")
+
+    for unlocode, port in cassia_instance.ports_dispatcher.items():
+        assert table.windows(unlocode, arrival_time, 14) == (
+            get_daylight_windows_corrected(
+                port.latitude, port.longitude, arrival_time, 14
+            )
+        )
+    assert table.windows("AUBNE", pd.Timestamp("2024-04-25"), 14) is None
+    assert table.windows("AUBNE", pd.Timestamp("2024-02-25"), 14) is None
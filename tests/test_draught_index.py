@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from cassia.cassia import Cassia
+from cassia.draught_index import DraughtIndex
+from cassia.interpolation import analytic_windows, interpolate_linear
+from cassia.tide_store import TideStore
+
+EPOCHS = np.arange(0.0, 10 * 3600.0, 3600.0)
+DEPTHS = np.array([10.0, 12.0, 9.0, 13.0, 11.0, 11.0, 8.0, 14.0, 10.0, 12.0])
+
+
+@pytest.fixture(scope="module")
+def tide_store(load_tide_heights):
+    return TideStore.from_dataframe(load_tide_heights)
+
+
+@pytest.mark.parametrize("unlocode", ["AUBNE", "AUABP", "AUDAM", "AUCTN"])
+def test_windows_match_analytic_engine(tide_store, cassia_instance, unlocode):
+    """The index gives the analytic engine's windows, to the bit."""
+    port = cassia_instance.ports_dispatcher[unlocode]
+    index = DraughtIndex.for_port(port, tide_store)
+    rng = np.random.default_rng(0)
+    first, last = index.span
+
+    for _ in range(50):
+        start = rng.uniform(first - 86_400, last)
+        end = start + rng.uniform(3600, 30 * 86_400)
+        draught = rng.uniform(port.approach_mllw_meters - 1, port.approach_mllw_meters + 4)
+
+        expected = analytic_windows(port, tide_store, np.array([draught]), start, end)
+        fleet_windows = index.fleet_windows([draught], start, end)
+
+        assert fleet_windows.start.equals(expected.start)
+        assert fleet_windows.end.equals(expected.end)
+
+
+def test_only_straddling_segments_are_visited():
+    index = DraughtIndex(EPOCHS, DEPTHS)
+
+    assert sorted(index._straddling(11.5, 0, 8)) == [0, 1, 2, 3, 6, 7, 8]
+    assert index._straddling(20.0, 0, 8) == []
+    assert index._straddling(5.0, 0, 8) == []
+
+
+def test_max_draught_is_the_shallowest_depth():
+    index = DraughtIndex(EPOCHS, DEPTHS)
+
+    assert index.max_draught(0.0, 5 * 3600.0) == 9.0
+    assert index.max_draught(1800.0, 3600.0) == 11.0
+    assert index.max_draught(3 * 3600.0, 5 * 3600.0) == 11.0
+    assert index.max_draught(3 * 3600.0, 5.5 * 3600.0) == pytest.approx(9.5)
+    assert index.max_draught(4 * 3600.0, 6.5 * 3600.0) == 8.0
+
+    grid = np.linspace(0.5 * 3600, 8.5 * 3600, 10_001)
+    assert index.max_draught(grid[0], grid[-1]) == pytest.approx(
+        interpolate_linear(EPOCHS, DEPTHS, grid).min()
+    )
+
+
+def test_first_window_of_minimum_duration():
+    index = DraughtIndex(EPOCHS, DEPTHS)
+    starts, ends = index.windows(11.5, 0.0, EPOCHS[-1])
+
+    assert index.first_window(11.5, 0.0, 0.0) == (starts[0], ends[0])
+    long_enough = np.nonzero(ends - starts >= 3600.0)[0][0]
+    assert index.first_window(11.5, 0.0, 3600.0) == (
+        starts[long_enough],
+        ends[long_enough],
+    )
+    assert index.first_window(11.5, 0.0, 5 * 3600.0) is None
+    assert index.first_window(20.0, 0.0, 0.0) is None
+
+
+def test_cassia_draught_queries():
+    cassia = Cassia()
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+
+    sweep = cassia.get_draught_sweep([14.45, 12.0], "AUBNE", arrival_time)
+    analytic = Cassia(engine="analytic").get_tidal_windows(
+        None, "AUBNE", arrival_time, draught=14.45
+    )
+    assert sweep.windows(0) == list(analytic.tidal_windows)
+    assert cassia.draught_index("AUBNE") is cassia.draught_index("AUBNE")
+
+    max_draught = cassia.max_allowable_draught(
+        "AUBNE", arrival_time, arrival_time + pd.Timedelta(hours=6)
+    )
+    window = cassia.first_tidal_window(
+        None, "AUBNE", arrival_time, pd.Timedelta(hours=2), draught=max_draught - 0.01
+    )
+    assert window[0] == arrival_time
+    assert window[1] - window[0] >= pd.Timedelta(hours=6)
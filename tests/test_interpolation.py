@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from cassia.cassia import Cassia
+from cassia.dispatchers import ports_dispatcher
+from cassia.interpolation import (
+    ENGINES,
+    calculate_depth_curve,
+    calculate_fleet_tidal_windows,
+    iter_tidal_windows,
+    solve_crossings,
+)
+from cassia.tide_store import TideStore
+
+
+@pytest.fixture(scope="module")
+def tide_store(load_tide_heights):
+    return TideStore.from_dataframe(load_tide_heights)
+
+
+@pytest.fixture(scope="module")
+def analytic_cassia():
+    return Cassia(engine="analytic")
+
+
+@pytest.mark.parametrize("vessel_imo", [9790933, 9494008, 9582116, 9991234])
+@pytest.mark.parametrize("unlocode", ["AUBNE", "AUABP", "AUDAM", "AUCTN"])
+def test_analytic_engine_matches_grid(
+    cassia_instance, analytic_cassia, vessel_imo, unlocode
+):
+    """Analytic windows agree with the minute grid to within one grid step."""
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+
+    grid_windows, _, _ = cassia_instance.get_tidal_windows(
+        vessel_imo, unlocode, arrival_time
+    )
+    analytic_windows, time_range, total_depths = analytic_cassia.get_tidal_windows(
+        vessel_imo, unlocode, arrival_time
+    )
+
+    assert time_range is None and total_depths is None
+    assert len(analytic_windows) == len(grid_windows)
+    for (grid_start, grid_end), (start, end) in zip(grid_windows, analytic_windows):
+        assert abs(grid_start - start) <= pd.Timedelta(minutes=1)
+        assert abs(grid_end - end) <= pd.Timedelta(minutes=1)
+
+
+def test_solve_crossings_is_exact():
+    """Crossings are solved on the linear segment, not snapped to a grid."""
+    knot_epochs = np.array([0.0, 100.0, 200.0])
+    knot_depths = np.array([10.0, 14.0, 10.0])
+
+    starts, ends = solve_crossings(knot_epochs, knot_depths, draught=12.0)
+
+    np.testing.assert_allclose(starts, [50.0])
+    np.testing.assert_allclose(ends, [150.0])
+
+
+def test_solve_crossings_merges_touching_extreme():
+    """A low tide that only touches the draught does not split the window."""
+    knot_epochs = np.array([0.0, 100.0, 200.0])
+    knot_depths = np.array([14.0, 12.0, 14.0])
+
+    starts, ends = solve_crossings(knot_epochs, knot_depths, draught=12.0)
+
+    np.testing.assert_array_equal(starts, [0.0])
+    np.testing.assert_array_equal(ends, [200.0])
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("chunk_hours", [5, 24, 24 * 30])
+def test_iter_tidal_windows_matches_full_horizon(tide_store, engine, chunk_hours):
+    """Streaming chunk by chunk yields the same windows as one full computation."""
+    arrival_time = pd.Timestamp("2024-03-01 03:17:00")
+    for draught in [13.0, 14.45, 30.0]:
+        fleet_windows, _, _ = calculate_fleet_tidal_windows(
+            [draught], "AUBNE", arrival_time, ports_dispatcher, tide_store, engine
+        )
+        streamed = list(
+            iter_tidal_windows(
+                draught,
+                "AUBNE",
+                arrival_time,
+                ports_dispatcher,
+                tide_store,
+                engine,
+                chunk=pd.Timedelta(hours=chunk_hours),
+            )
+        )
+
+        expected = fleet_windows.windows(0)
+        assert len(streamed) == len(expected)
+        for (start, end), (expected_start, expected_end) in zip(streamed, expected):
+            assert abs(start - expected_start) < pd.Timedelta(microseconds=10)
+            assert abs(end - expected_end) < pd.Timedelta(microseconds=10)
+
+
+def test_grid_resolution_sets_the_curve_spacing(tide_store):
+    port = ports_dispatcher["AUBNE"]
+    time_range, total_depths = calculate_depth_curve(
+        port,
+        pd.Timestamp("2024-03-01"),
+        tide_store,
+        horizon=pd.Timedelta(days=30),
+        resolution=pd.Timedelta(minutes=10),
+    )
+
+    assert len(time_range) == len(total_depths) == 30 * 24 * 6
+    assert time_range.freq == pd.Timedelta(minutes=10)
+    with pytest.raises(ValueError):
+        calculate_depth_curve(
+            port, pd.Timestamp("2024-03-01"), tide_store, resolution=pd.Timedelta(0)
+        )
@@ -0,0 +1,90 @@
+import pandas as pd  # type:ignore
+from hypothesis import given, strategies as st
+from cassia.intervals import NAT, IntervalSet
+
+HORIZON_START, HORIZON_END = 0, 1_000
+
+
+def naive_intersection(windows_a, windows_b):
+    # The nested-loop intersection combine_tidal_and_daylight_windows used to do.
+    overlaps = []
+    for start_a, end_a in windows_a:
+        for start_b, end_b in windows_b:
+            overlap_start, overlap_end = max(start_a, start_b), min(end_a, end_b)
+            if overlap_start < overlap_end:
+                overlaps.append((overlap_start, overlap_end))
+    return overlaps
+
+
+def covered(interval_set, instant):
+    return any(start <= instant <= end for start, end in interval_set)
+
+
+disjoint_windows = st.lists(
+    st.integers(min_value=HORIZON_START, max_value=HORIZON_END), unique=True
+).map(sorted).map(lambda bounds: list(zip(bounds[::2], bounds[1::2])))
+
+any_windows = st.lists(
+    st.tuples(
+        st.integers(min_value=HORIZON_START, max_value=HORIZON_END),
+        st.integers(min_value=HORIZON_START, max_value=HORIZON_END),
+    )
+)
+
+
+@given(windows_a=disjoint_windows, windows_b=disjoint_windows)
+def test_intersection_matches_nested_loop(windows_a, windows_b):
+    """The sweep gives the same windows as comparing every pair."""
+    set_a = IntervalSet([s for s, _ in windows_a], [e for _, e in windows_a])
+    set_b = IntervalSet([s for s, _ in windows_b], [e for _, e in windows_b])
+
+    intersection = set_a & set_b
+
+    assert list(intersection) == naive_intersection(windows_a, windows_b)
+
+
+@given(windows_a=any_windows, windows_b=any_windows, instant=st.integers(0, 1_000))
+def test_union_and_complement_cover_instants(windows_a, windows_b, instant):
+    """Union covers what either set covers; the complement covers the rest."""
+    set_a = IntervalSet([s for s, _ in windows_a], [e for _, e in windows_a])
+    set_b = IntervalSet([s for s, _ in windows_b], [e for _, e in windows_b])
+
+    union = set_a | set_b
+    gaps = union.complement(HORIZON_START, HORIZON_END)
+
+    assert covered(union, instant) == (covered(set_a, instant) or covered(set_b, instant))
+    assert covered(union, instant) or covered(gaps, instant)
+    assert (union & gaps).duration == pd.Timedelta(0)
+
+
+def test_windows_round_trip_and_clip():
+    windows = [
+        (pd.Timestamp("2024-03-01 08:00"), pd.Timestamp("2024-03-01 12:00")),
+        (pd.Timestamp("2024-03-01 11:00"), pd.Timestamp("2024-03-01 14:00")),
+        (pd.Timestamp("2024-03-02 08:00"), pd.Timestamp("2024-03-02 08:00")),
+        (pd.Timestamp("2024-03-03 08:00"), pd.Timestamp("2024-03-03 18:00")),
+    ]
+
+    interval_set = IntervalSet.from_windows(windows)
+    clipped = interval_set.clip(
+        pd.Timestamp("2024-03-01 10:00"), pd.Timestamp("2024-03-03 09:00")
+    )
+
+    assert interval_set.to_windows() == [
+        (pd.Timestamp("2024-03-01 08:00"), pd.Timestamp("2024-03-01 14:00")),
+        (pd.Timestamp("2024-03-03 08:00"), pd.Timestamp("2024-03-03 18:00")),
+    ]
+    assert clipped.to_windows() == [
+        (pd.Timestamp("2024-03-01 10:00"), pd.Timestamp("2024-03-01 14:00")),
+        (pd.Timestamp("2024-03-03 08:00"), pd.Timestamp("2024-03-03 09:00")),
+    ]
+
+
+@given(windows=any_windows, instant=st.integers(0, 1_000))
+def test_next_entry_is_the_first_covered_instant(windows, instant):
+    interval_set = IntervalSet([s for s, _ in windows], [e for _, e in windows])
+
+    entry = interval_set.next_entry([instant])[0]
+
+    later = [max(start, instant) for start, end in interval_set if end >= instant]
+    assert entry == (min(later) if later else NAT)
@@ -0,0 +1,53 @@
+from cassia.metrics import Metrics, server_timing
+
+
+def test_disabled_metrics_record_nothing():
+    """Disabled stages are a shared no-op and leave no histograms or counters."""
+    metrics = Metrics(enabled=False)
+
+    assert metrics.stage("a") is metrics.stage("b")
+    with metrics.stage("a"):
+        pass
+    metrics.increment("requests_total", path="/")
+
+    assert metrics.histogram("a") is None
+    assert metrics.counter("requests_total", path="/") == 0
+
+
+def test_stages_fill_histograms_and_collected_timings():
+    """Stages are observed into buckets and summed per name for the collector."""
+    metrics = Metrics(enabled=True, buckets=(0.1, 1.0))
+
+    with metrics.collect() as timings:
+        metrics.observe("solve", 0.05)
+        metrics.observe("solve", 0.5)
+        metrics.observe("solve", 5.0)
+        with metrics.stage("lookup"):
+            pass
+
+    with metrics.stage("outside"):
+        pass
+
+    assert metrics.histogram("solve").counts == [1, 1, 1]
+    assert metrics.histogram("solve").count == 3
+    assert set(timings) == {"solve", "lookup"}
+    assert timings["solve"] == 5.55
+    assert server_timing({"solve": 0.0125}) == "solve;dur=12.500"
+
+
+def test_render_prometheus_text():
+    """Histograms are cumulative and counters carry their labels."""
+    metrics = Metrics(enabled=True, buckets=(0.1, 1.0))
+    metrics.observe("solve", 0.05)
+    metrics.observe("solve", 0.5)
+    metrics.increment("cassia_requests_total", path="/tidal-windows/", status="200")
+
+    lines = metrics.render().splitlines()
+
+    assert 'cassia_stage_seconds_bucket{stage="solve",le="0.1"} 1' in lines
+    assert 'cassia_stage_seconds_bucket{stage="solve",le="1.0"} 2' in lines
+    assert 'cassia_stage_seconds_bucket{stage="solve",le="+Inf"} 2' in lines
+    assert 'cassia_stage_seconds_count{stage="solve"} 2' in lines
+    assert (
+        'cassia_requests_total{path="/tidal-windows/",status="200"} 1' in lines
+    )
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd  # type:ignore
+from cassia.cassia import Cassia
+from cassia.intervals import IntervalSet
+from cassia.planner import PortCall, plan_rotation
+
+DAY = pd.Timestamp("2024-03-01")
+
+
+def hours(*windows):
+    return IntervalSet.from_windows(
+        [(DAY + pd.Timedelta(hours=s), DAY + pd.Timedelta(hours=e)) for s, e in windows]
+    )
+
+
+PORT_WINDOWS = {"A": hours((2, 4), (10, 12)), "B": hours((8, 9), (20, 30))}
+
+
+def windows_for(unlocode, draught, first_arrival, last_arrival):
+    return PORT_WINDOWS[unlocode]
+
+
+def test_plan_rotation_with_and_without_waiting():
+    calls = [
+        PortCall("A", pd.Timedelta(hours=1)),
+        PortCall("B", pd.Timedelta(hours=5), draught=9.0, stay=pd.Timedelta(hours=2)),
+    ]
+    departures = DAY + pd.to_timedelta([0, 1, 2, 4, 12], unit="h")
+
+    plan = plan_rotation(calls, departures, 10.0, windows_for)
+
+    # Entering A at 3:00 reaches B at 8:00; at 11:00, B at 16:00, outside.
+    assert plan.feasible.tolist() == [False, False, True, False, False]
+    assert plan.draughts == [10.0, 9.0]
+    assert plan.schedules() == [
+        (
+            DAY + pd.Timedelta(hours=2),
+            [DAY + pd.Timedelta(hours=3), DAY + pd.Timedelta(hours=8)],
+            DAY + pd.Timedelta(hours=10),
+        )
+    ]
+
+    # Leaving at 4:00 waits 5 hours at A, then 5 hours at B.
+    waiting = plan_rotation(calls, departures, 10.0, windows_for, pd.Timedelta(hours=6))
+    assert waiting.feasible.tolist() == [True, True, True, True, False]
+    assert waiting.arrivals[0][3] == DAY + pd.Timedelta(hours=10)
+    assert waiting.arrivals[1][3] == DAY + pd.Timedelta(hours=20)
+    assert waiting.earliest == 0
+    assert pd.isna(waiting.completions[4])
+
+
+def test_plan_rotation_matches_combined_windows():
+    cassia = Cassia()
+    calls = [
+        PortCall("AUABP", pd.Timedelta(hours=10), stay=pd.Timedelta(hours=20)),
+        PortCall("AUBNE", pd.Timedelta(days=2), draught=12.0),
+    ]
+    departures = pd.date_range("2024-03-01", periods=200, freq="17min")
+
+    plan = cassia.plan_rotation(None, calls, departures, draught=14.45)
+
+    assert plan.feasible.any() and not plan.feasible.all()
+    for index in np.arange(0, len(departures), 7):
+        time, feasible = departures[index], True
+        for call, draught in zip(calls, plan.draughts):
+            arrival_time = time + call.transit
+            combined = cassia.get_combined_windows(
+                None, call.unlocode, arrival_time, 1, draught=draught
+            ).combined_windows
+            if not any(start <= arrival_time <= end for start, end in combined):
+                feasible = False
+                break
+            time = arrival_time + call.stay
+        assert plan.feasible[index] == feasible
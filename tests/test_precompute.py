@@ -0,0 +1,114 @@
+import pandas as pd  # type:ignore
+import pytest
+from cassia import precompute
+from cassia.cassia import Cassia
+
+UNLOCODES = ["AUBNE", "AUDAM"]
+
+
+@pytest.fixture(scope="module")
+def precomputed_path(cassia_instance, tmp_path_factory):
+    path = tmp_path_factory.mktemp("precomputed") / "windows.bin"
+    return precompute.precompute(path, cassia_instance, unlocodes=UNLOCODES, workers=2)
+
+
+@pytest.fixture(scope="module")
+def precomputed_cassia(precomputed_path):
+    return Cassia(precomputed=precomputed_path).load()
+
+
+@pytest.mark.parametrize("unlocode", UNLOCODES)
+@pytest.mark.parametrize(
+    "arrival_time", ["2024-03-05 00:00", "2024-04-10 13:37", "2024-06-01 06:00+10:00"]
+)
+@pytest.mark.parametrize("draught", [14.45, 15.0, 16.0])
+def test_lookups_match_live_windows(
+    precomputed_cassia, cassia_instance, unlocode, arrival_time, draught
+):
+    arrival_time = pd.Timestamp(arrival_time)
+    result = precomputed_cassia.get_combined_windows(
+        None, unlocode, arrival_time, draught=draught
+    )
+    expected = cassia_instance.get_combined_windows(
+        None, unlocode, arrival_time, draught=draught
+    )
+
+    assert result.time_range is None  # Looked up, not computed
+    assert result.tidal_windows == expected.tidal_windows
+    assert result.combined_windows == expected.combined_windows
+
+
+@pytest.mark.parametrize(
+    "unlocode, draught, arrival_time",
+    [
+        ("AUBNE", 15.01, "2024-04-10 13:37"),  # Between buckets
+        ("AUBNE", 15.0, "2024-04-10 13:37:30"),  # Off the grid
+        ("AUBNE", 15.0, "2024-08-20"),  # Beyond the forecast
+        ("AUCTN", 15.0, "2024-04-10 13:37"),  # Not precomputed
+    ],
+)
+def test_other_queries_are_computed(
+    precomputed_cassia, cassia_instance, unlocode, draught, arrival_time
+):
+    result = precomputed_cassia.get_tidal_windows(
+        None, unlocode, pd.Timestamp(arrival_time), draught=draught
+    )
+
+    assert result.time_range is not None
+    assert (
+        result.tidal_windows
+        == cassia_instance.get_tidal_windows(
+            None, unlocode, pd.Timestamp(arrival_time), draught=draught
+        ).tidal_windows
+    )
+
+
+def test_single_point_windows_are_kept(tmp_path):
+    # Peaks 0.01 mm above a 15 m draught: one navigable minute each.
+    tide_heights_df = pd.DataFrame(
+        {
+            "PORT_NAME": "Brisbane",
+            "TIDE_DATETIME": pd.date_range("2024-03-01", periods=9, freq="6h"),
+            "TIDE_HEIGHT_MT": [0.0, 1.00001] * 4 + [0.0],
+        }
+    )
+    cassia = Cassia(tide_heights_df=tide_heights_df)
+    path = precompute.precompute(
+        tmp_path / "windows.bin", cassia, unlocodes=["AUBNE"], workers=1
+    )
+    arrival_time = pd.Timestamp("2024-03-01")
+
+    precomputed = Cassia(tide_heights_df=tide_heights_df, precomputed=path)
+    result = precomputed.get_tidal_windows(
+        None, "AUBNE", arrival_time, 1, draught=15.0
+    )
+
+    assert result.time_range is None
+    assert result.tidal_windows == cassia.get_tidal_windows(
+        None, "AUBNE", arrival_time, 1, draught=15.0
+    ).tidal_windows
+    assert [start for start, end in result.tidal_windows if start == end] == [
+        pd.Timestamp("2024-03-01 06:00"),
+        pd.Timestamp("2024-03-01 18:00"),
+    ]
+
+
+def test_mismatched_or_missing_files_are_ignored(precomputed_path, tmp_path):
+    assert Cassia(precomputed=precomputed_path).load().snapshot.precomputed is not None
+    assert (
+        Cassia(precomputed=precomputed_path, resolution=pd.Timedelta(minutes=5))
+        .load()
+        .snapshot.precomputed
+        is None
+    )
+    assert Cassia(precomputed=tmp_path / "missing.bin").load().snapshot.precomputed is None
+
+
+def test_command_line(tmp_path, capsys):
+    output = tmp_path / "windows.bin"
+    precompute.main([str(output), "--ports", "AUBNE", "--workers", "1"])
+
+    assert "written" in capsys.readouterr().out
+    windows = precompute.PrecomputedWindows(output)
+    assert list(windows.ports) == ["AUBNE"]
+    assert windows.engine == "grid" and windows.bucket == precompute.BUCKET
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from cassia.dispatchers import Port, Vessel
+from cassia.registry import PortRegistry, Registry, VesselRegistry, vessel_draughts
+
+
+@pytest.fixture
+def vessels():
+    return VesselRegistry(
+        [9582116, 9790933, 9331866],
+        draught=[14.45, 13.418, 12.573],
+        name=["EPIPHANIA", "UNITY LIFE", "MING HUA"],
+        dwt=[80276.0, 63482.0, 55682.0],
+    )
+
+
+def test_registry_is_a_mapping_of_records(vessels):
+    assert len(vessels) == 3
+    assert list(vessels) == [9582116, 9790933, 9331866]
+    assert vessels[9790933] == Vessel(
+        imo=9790933, draught=13.418, name="UNITY LIFE", dwt=63482.0
+    )
+    assert 9582116 in vessels and 1234567 not in vessels and "AUBNE" not in vessels
+    assert vessels.get(1234567) is None
+    with pytest.raises(KeyError):
+        vessels[1234567]
+
+    as_dict = {imo: vessels[imo] for imo in vessels}
+    assert vessels == as_dict and dict(vessels.items()) == as_dict
+
+
+def test_bulk_lookups(vessels):
+    np.testing.assert_array_equal(
+        vessels.draughts([9331866, 9582116, 9331866]), [12.573, 14.45, 12.573]
+    )
+    np.testing.assert_array_equal(
+        vessel_draughts(dict(vessels.items()), [9331866]), [12.573]
+    )
+    with pytest.raises(KeyError, match="1234567"):
+        vessels.draughts([9582116, 1234567])
+
+
+def test_duplicate_keys_keep_the_last_row():
+    """As when building a dict row by row: first position, last values."""
+    vessels = VesselRegistry(
+        [3, 1, 3], draught=[1.0, 2.0, 3.0], name=["a", "b", "c"], dwt=[1.0, 1.0, 1.0]
+    )
+
+    assert list(vessels) == [3, 1]
+    assert vessels[3].draught == 3.0 and vessels[3].name == "c"
+
+
+def test_load_from_dataframe(load_ports):
+    ports = PortRegistry.from_dataframe(load_ports)
+
+    assert list(ports) == load_ports["UNLOCODE"].tolist()
+    assert ports["AUBNE"] == Port(
+        name="Brisbane",
+        latitude=-27.376286,
+        longitude=153.163766,
+        approach_mllw_meters=14.0,
+    )
+
+
+def test_registries_must_build_records():
+    class Incomplete(Registry):
+        key_column = "IMO"
+
+    with pytest.raises(TypeError, match="record"):
+        Incomplete([1, 2])
@@ -0,0 +1,51 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from cassia.rendering import decimate_minmax, render_job, render_many
+
+
+def test_decimate_minmax_keeps_the_envelope():
+    values = np.random.default_rng(0).normal(size=20_160)
+
+    keep = decimate_minmax(values, max_points=2000)
+
+    assert len(keep) <= 2000 + 4
+    assert np.all(np.diff(keep) > 0)
+    assert keep[0] == 0 and keep[-1] == len(values) - 1
+    assert values[keep].min() == values.min() and values[keep].max() == values.max()
+    np.testing.assert_array_equal(decimate_minmax(values[:100]), np.arange(100))
+
+
+@pytest.fixture(scope="module")
+def jobs(cassia_instance):
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+    return [
+        cassia_instance.render_job(
+            cassia_instance.get_tidal_windows(9582116, "AUBNE", arrival_time)
+        ),
+        cassia_instance.render_job(
+            cassia_instance.get_combined_windows(9790933, "AUDAM", arrival_time),
+            fmt="svg",
+        ),
+    ]
+
+
+def test_render_without_pyplot(jobs):
+    png, svg = (render_job(job) for job in jobs)
+
+    assert png.startswith(b"\x89PNG")
+    assert b"<svg" in svg and b"Combined Navigable Window" in svg
+    assert "matplotlib.pyplot" not in sys.modules or not sys.modules[
+        "matplotlib.pyplot"
+    ].get_fignums()
+
+
+def test_render_many_matches_serial_rendering(jobs):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        rendered = render_many(jobs, executor=executor)
+
+    assert rendered[0] == render_job(jobs[0])
+    assert len(rendered) == len(jobs)
@@ -0,0 +1,134 @@
+import json
+
+import pandas as pd  # type:ignore
+import pytest
+from cassia.cassia import Cassia
+from cassia.intervals import IntervalSet
+from cassia.restrictions import (
+    DEFAULT_RESTRICTIONS,
+    Availability,
+    Closures,
+    Daylight,
+    Filter,
+    MinimumDuration,
+    Restriction,
+    RestrictionQuery,
+    Tidal,
+    evaluate,
+    load_restrictions,
+)
+
+ARRIVAL_TIME = pd.Timestamp("2024-04-25 00:00")
+QUERY = RestrictionQuery("AUBNE", 15.0, ARRIVAL_TIME, 2)
+HOURS = [
+    (pd.Timestamp(f"2024-04-25 {start:02}:00"), pd.Timestamp(f"2024-04-25 {end:02}:00"))
+    for start, end in [(1, 2), (4, 8), (10, 11)]
+]
+
+
+def test_layers_intersect_in_order_until_empty():
+    asked = []
+
+    def source(kind, query):
+        asked.append(kind)
+        return HOURS
+
+    evaluation = evaluate(
+        (Closures([("2024-04-25 05:00", "2024-04-25 06:00")]), Tidal()), QUERY, source
+    )
+    assert evaluation.windows.to_windows() == [
+        HOURS[0],
+        (pd.Timestamp("2024-04-25 04:00"), pd.Timestamp("2024-04-25 05:00")),
+        (pd.Timestamp("2024-04-25 06:00"), pd.Timestamp("2024-04-25 08:00")),
+        HOURS[2],
+    ]
+    assert list(evaluation.layers) == ["closures", "tidal"]
+
+    closed = Closures([("2024-04-24", "2024-04-28")])
+    evaluation = evaluate((closed, Daylight(), Tidal()), QUERY, source)
+    assert evaluation.windows.is_empty
+    assert list(evaluation.layers) == ["closures"] and asked == ["tidal"]
+
+
+def test_filters_and_availability():
+    source = lambda kind, query: HOURS  # noqa: E731
+    pilots = Availability([("2024-04-25 00:30", "2024-04-25 10:30")], name="pilots")
+    evaluation = evaluate((MinimumDuration("90min"), pilots, Tidal()), QUERY, source)
+
+    assert evaluation.windows.to_windows() == [HOURS[1]]
+    assert evaluation.layers["pilots"] == IntervalSet.from_windows(pilots.periods)
+
+
+def test_layers_must_implement_their_method():
+    class Curfew(Restriction):
+        pass
+
+    class Shortest(Filter):
+        pass
+
+    with pytest.raises(TypeError, match="windows"):
+        Curfew()
+    with pytest.raises(TypeError, match="apply"):
+        Shortest()
+
+
+def test_night_rules_skip_daylight_for_shallow_vessels():
+    daylight = Daylight(night_draught=12.0)
+    source = lambda kind, query: HOURS  # noqa: E731
+
+    shallow = QUERY._replace(draught=11.0)
+    assert evaluate((daylight,), shallow, source).windows == QUERY.horizon
+    assert evaluate((daylight,), QUERY, source).windows.to_windows() == HOURS
+
+
+def test_cassia_applies_port_restrictions(cassia_instance):
+    closures = Closures([("2024-04-25", "2024-04-27 12:00")])
+    layers = (closures, Daylight(), Tidal(), MinimumDuration("1h"))
+    cassia = Cassia(restrictions={"AUBNE": layers})
+    expected = cassia_instance.get_combined_windows(None, "AUBNE", ARRIVAL_TIME, 4, 15.0)
+
+    result = cassia.get_combined_windows(None, "AUBNE", ARRIVAL_TIME, 4, 15.0)
+    windows = evaluate(
+        layers,
+        RestrictionQuery("AUBNE", 15.0, ARRIVAL_TIME, 4),
+        lambda kind, query: getattr(expected, f"{kind}_windows"),
+    ).windows.to_windows()
+    assert list(result.combined_windows) == windows
+    assert all(start >= pd.Timestamp("2024-04-27 12:00") for start, _ in windows)
+    assert all(end - start >= pd.Timedelta("1h") for start, end in windows)
+    assert cassia.get_combined_windows_many([15.0], "AUBNE", ARRIVAL_TIME, 4) == [windows]
+    sweep = cassia.get_combined_windows_sweep(None, "AUBNE", [ARRIVAL_TIME], 4, 15.0)
+    assert list(sweep[0].combined_windows) == windows
+    other_port = cassia.get_combined_windows(None, "AUDAM", ARRIVAL_TIME, 4, 15.0)
+    assert other_port.combined_windows == cassia_instance.get_combined_windows(
+        None, "AUDAM", ARRIVAL_TIME, 4, 15.0
+    ).combined_windows
+
+    cassia.set_restrictions("AUBNE", None)
+    assert cassia.restrictions("AUBNE") == DEFAULT_RESTRICTIONS
+    assert (
+        cassia.get_combined_windows(None, "AUBNE", ARRIVAL_TIME, 4, 15.0).combined_windows
+        == expected.combined_windows
+    )
+
+
+def test_load_restrictions(tmp_path):
+    path = tmp_path / "restrictions.json"
+    layers = [
+        {"layer": "closures", "periods": [["2024-04-25T00:00", "2024-04-26T00:00"]]},
+        {"layer": "daylight", "night_draught": 10.5},
+        {"layer": "tidal"},
+        {"layer": "minimum_duration", "duration": "30min"},
+    ]
+    path.write_text(json.dumps({"AUBNE": layers}))
+
+    assert load_restrictions(path)["AUBNE"] == (
+        Closures([(pd.Timestamp("2024-04-25"), pd.Timestamp("2024-04-26"))]),
+        Daylight(night_draught=10.5),
+        Tidal(),
+        MinimumDuration(pd.Timedelta(minutes=30)),
+    )
+
+    path.write_text(json.dumps({"AUBNE": [{"layer": "curfew"}]}))
+    with pytest.raises(ValueError, match="curfew"):
+        load_restrictions(path)
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from cassia import shared
+from cassia.cassia import Cassia
+from cassia.dispatchers import ports_dispatcher, vessels_dispatcher
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def shared_name(cassia_instance):
+    name = f"cassia-test-{uuid.uuid4().hex[:8]}"
+    shared.publish(
+        name,
+        cassia_instance.vessels_dispatcher,
+        cassia_instance.ports_dispatcher,
+        cassia_instance.tide_store,
+        cassia_instance.daylight_table,
+    )
+    yield name
+    shared.unlink(name)
+
+
+def test_attached_data_matches_and_is_read_only(shared_name, cassia_instance):
+    data = shared.attach(shared_name)
+
+    assert data.vessels_dispatcher == vessels_dispatcher
+    assert data.ports_dispatcher == ports_dispatcher
+    assert data.tide_store.version == cassia_instance.tide_store.version
+    for port_name in data.tide_store.port_names:
+        epochs, heights = data.tide_store.get(port_name)
+        assert not epochs.flags.writeable and not heights.flags.writeable
+        np.testing.assert_array_equal(epochs, cassia_instance.tide_store.get(port_name)[0])
+    np.testing.assert_array_equal(
+        data.daylight_table.window_starts, cassia_instance.daylight_table.window_starts
+    )
+
+
+def test_cassia_from_shared_matches_csv(shared_name, cassia_instance):
+    cassia = Cassia.from_shared(shared_name)
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+
+    assert not cassia.daylight_table.window_starts.flags.writeable
+    for unlocode in ["AUBNE", "AUDAM"]:
+        assert (
+            cassia.get_combined_windows(9582116, unlocode, arrival_time).combined_windows
+            == cassia_instance.get_combined_windows(
+                9582116, unlocode, arrival_time
+            ).combined_windows
+        )
+
+
+def test_other_processes_attach_and_leave_it_published(shared_name):
+    code = (
+        "from cassia.cassia import Cassia; "
+        f"print(len(Cassia.from_shared({shared_name!r}).load().ports_dispatcher))"
+    )
+    for _ in range(2):
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=BASE_DIR,
+        ).stdout
+        assert output.strip() == str(len(ports_dispatcher))
+
+
+def test_attach_missing_name():
+    with pytest.raises(FileNotFoundError):
+        shared.attach(f"cassia-missing-{uuid.uuid4().hex[:8]}")
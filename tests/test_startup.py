@@ -0,0 +1,59 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Seconds, measured in a fresh interpreter. Generous enough for a loaded CI
+# machine while still catching a heavy import or data load creeping back.
+IMPORT_BUDGET = 2.0
+FIRST_REQUEST_BUDGET = 1.0
+
+STARTUP_SCRIPT = """
+import json, sys, time
+
+started = time.perf_counter()
+import api.main
+imported = time.perf_counter()
+
+heavy = [name for name in ("matplotlib", "scipy", "astral") if name in sys.modules]
+loaded_at_import = api.main.cassia._snapshot is not None
+
+from fastapi.testclient import TestClient
+
+with TestClient(api.main.app) as client:  # Runs the startup hook
+    request_started = time.perf_counter()
+    response = client.post("/combined-windows/", json={
+        "port_id": "AUBNE",
+        "vessel_information": {
+            "draught": "14.45", "dwt": "80276.0", "name": "EPIPHANIA", "imo": 9582116
+        },
+        "arrival_datetime": "2024-03-01T00:00:00",
+    })
+    request_finished = time.perf_counter()
+
+print(json.dumps({
+    "import": imported - started,
+    "heavy": heavy,
+    "loaded_at_import": loaded_at_import,
+    "status": response.status_code,
+    "first_request": request_finished - request_started,
+}))
+"""
+
+
+def test_api_import_and_first_request_budget():
+    """Importing the API loads no data or plotting stack, and stays fast."""
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = json.loads(result.stdout.splitlines()[-1])
+
+    assert timings["heavy"] == []
+    assert not timings["loaded_at_import"]
+    assert timings["status"] == 200
+    assert timings["import"] < IMPORT_BUDGET
+    assert timings["first_request"] < FIRST_REQUEST_BUDGET
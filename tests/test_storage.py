@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from cassia.cassia import Cassia
+from cassia.dispatchers import ports_dispatcher, vessels_dispatcher
+from cassia.storage import compile_csv, load_compiled
+from cassia.tide_store import TideStore
+
+
+@pytest.fixture(scope="module")
+def compiled_dir(tmp_path_factory):
+    return compile_csv(tmp_path_factory.mktemp("compiled"))
+
+
+def test_compiled_data_round_trips(compiled_dir, load_tide_heights):
+    """Loading the compiled directory gives back the CSV datasets."""
+    compiled = load_compiled(compiled_dir)
+    tide_store = TideStore.from_dataframe(load_tide_heights)
+
+    assert compiled.vessels_dispatcher == vessels_dispatcher
+    assert compiled.ports_dispatcher == ports_dispatcher
+    assert compiled.tide_store.port_names == tide_store.port_names
+    assert compiled.tide_store.version == tide_store.version
+    for port_name in tide_store.port_names:
+        epochs, heights = compiled.tide_store.get(port_name)
+        assert isinstance(epochs, np.memmap) and not epochs.flags["WRITEABLE"]
+        np.testing.assert_array_equal(epochs, tide_store.get(port_name)[0])
+        np.testing.assert_array_equal(heights, tide_store.get(port_name)[1])
+
+
+def test_cassia_from_compiled_matches_csv(compiled_dir, cassia_instance):
+    cassia = Cassia.from_compiled(compiled_dir)
+    arrival_time = pd.Timestamp("2024-03-01 00:00:00")
+
+    for unlocode in ["AUBNE", "AUDAM"]:
+        assert (
+            cassia.get_combined_windows(9582116, unlocode, arrival_time).combined_windows
+            == cassia_instance.get_combined_windows(
+                9582116, unlocode, arrival_time
+            ).combined_windows
+        )
+
+
+def test_load_compiled_rejects_other_format(compiled_dir, tmp_path):
+    manifest = json.loads((compiled_dir / "manifest.json").read_text())
+    manifest["format"] += 1
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError):
+        load_compiled(tmp_path)
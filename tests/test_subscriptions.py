@@ -0,0 +1,164 @@
+import threading
+
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from cassia.cassia import Cassia
+from cassia.restrictions import Closures, Daylight, Tidal
+from cassia.subscriptions import Change, Subscriptions, Watch
+
+ARRIVAL_TIMES = ["2024-03-01", "2024-05-01", "2024-05-01 07:00"]
+
+
+@pytest.fixture
+def cassia():
+    return Cassia().load()
+
+
+@pytest.fixture
+def subscriptions(cassia):
+    subscriptions = Subscriptions(cassia).start()
+    yield subscriptions
+    subscriptions.close()
+
+
+def brisbane_rows(cassia, start, end, raise_by=0.5):
+    tide_heights_df = cassia.tide_heights_df
+    rows = tide_heights_df[
+        (tide_heights_df.PORT_NAME == "Brisbane")
+        & (tide_heights_df.TIDE_DATETIME >= start)
+        & (tide_heights_df.TIDE_DATETIME <= end)
+    ].copy()
+    rows["TIDE_HEIGHT_MT"] += raise_by
+    return rows
+
+
+def test_changed_spans(cassia):
+    previous = cassia.snapshot.tide_store
+    cassia.ingest_tide_data(brisbane_rows(cassia, "2024-05-03", "2024-05-04"))
+
+    spans = cassia.snapshot.tide_store.changed_spans(previous)
+    assert list(spans) == ["Brisbane"]
+    start, end = (pd.Timestamp(bound, unit="s") for bound in spans["Brisbane"])
+    assert pd.Timestamp("2024-05-02") < start < pd.Timestamp("2024-05-03")
+    assert pd.Timestamp("2024-05-04") < end < pd.Timestamp("2024-05-05")
+    assert cassia.snapshot.tide_store.changed_spans(cassia.snapshot.tide_store) == {}
+
+
+def test_affected_by():
+    watch = Watch("tidal", "AUBNE", 14.45, pd.Timestamp("2024-05-01"), 14)
+    may = pd.Timestamp("2024-05-10").timestamp()
+
+    assert watch.affected_by(Change("AUBNE", may, may + 3600))
+    assert not watch.affected_by(Change("AUDAM", may, may + 3600))
+    assert not watch.affected_by(Change("AUBNE", may + 30 * 86400, np.inf))
+    assert not watch.affected_by(Change("AUBNE", -np.inf, np.inf, tidal=False))
+    assert watch._replace(kind="combined").affected_by(
+        Change("AUBNE", -np.inf, np.inf, tidal=False)
+    )
+
+
+def test_tide_updates_refresh_overlapping_watches(cassia, subscriptions):
+    updates = []
+    watches = [
+        Watch("combined", "AUBNE", 14.45, pd.Timestamp(arrival_time), 14)
+        for arrival_time in ARRIVAL_TIMES
+    ]
+    watches.append(Watch("tidal", "AUDAM", 14.45, pd.Timestamp("2024-05-01"), 14))
+    subscription_ids = []
+    for watch in watches:
+        subscription_id, _ = subscriptions.subscribe(watch)
+        subscriptions.listen(subscription_id, updates.append)
+        subscription_ids.append(subscription_id)
+
+    cassia.ingest_tide_data(brisbane_rows(cassia, "2024-05-03", "2024-05-04"))
+
+    assert sorted(update.subscription_id for update in updates) == sorted(
+        subscription_ids[1:3]
+    )
+    for update in updates:
+        expected = cassia.get_combined_windows(
+            None, "AUBNE", update.watch.arrival_time, 14, draught=14.45
+        ).combined_windows
+        assert update.windows == expected
+        assert update.version == cassia.snapshot.version
+        assert set(update.added) <= set(expected)
+        assert not set(update.removed) & set(expected)
+
+
+def test_refresh_without_changes_emits_nothing(subscriptions):
+    # Subscribed one at a time but refreshed together in a sweep. A Brisbane
+    # morning is still the previous UTC date.
+    updates = []
+    for arrival_time in ["2024-05-01 07:00", "2024-05-02 05:00"]:
+        watch = Watch(
+            "combined",
+            "AUBNE",
+            14.45,
+            pd.Timestamp(arrival_time, tz="Australia/Brisbane"),
+            14,
+        )
+        subscription_id, _ = subscriptions.subscribe(watch)
+        subscriptions.listen(subscription_id, updates.append)
+
+    assert subscriptions.refresh([Change("AUBNE", -np.inf, np.inf)]) == []
+    assert updates == []
+
+
+def test_refresh_computes_without_the_lock(cassia, subscriptions, monkeypatch):
+    watch = Watch("tidal", "AUBNE", 14.45, pd.Timestamp("2024-05-01"), 14)
+    subscription_id, _ = subscriptions.subscribe(watch)
+    compute = subscriptions._compute
+    listened = []
+
+    def compute_while_listening(watches):
+        # Another thread can start listening while the windows are rebuilt.
+        thread = threading.Thread(
+            target=lambda: listened.append(subscriptions.listen(subscription_id, print))
+        )
+        thread.start()
+        thread.join(timeout=5)
+        return compute(watches)
+
+    monkeypatch.setattr(subscriptions, "_compute", compute_while_listening)
+    cassia.ingest_tide_data(brisbane_rows(cassia, "2024-05-03", "2024-05-04"))
+
+    assert len(listened) == 1
+
+
+def test_restriction_changes_refresh_combined_watches(cassia, subscriptions):
+    updates = []
+    arrival_time = pd.Timestamp("2024-05-01")
+    for kind in ["tidal", "combined"]:
+        subscription_id, _ = subscriptions.subscribe(
+            Watch(kind, "AUBNE", 14.45, arrival_time, 14)
+        )
+        subscriptions.listen(subscription_id, updates.append)
+
+    closures = Closures([("2024-05-02", "2024-05-03")])
+    cassia.set_restrictions("AUBNE", (closures, Daylight(), Tidal()))
+
+    assert [update.watch.kind for update in updates] == ["combined"]
+    assert all(
+        end <= pd.Timestamp("2024-05-02") or start >= pd.Timestamp("2024-05-03")
+        for start, end in updates[0].windows
+    )
+    cassia.set_restrictions("AUBNE", (closures, Daylight(), Tidal()))
+    assert len(updates) == 1  # Unchanged layers
+
+
+def test_unsubscribe_and_expire(subscriptions):
+    updates = []
+    watch = Watch("tidal", "AUBNE", 14.45, pd.Timestamp("2024-05-01"), 14)
+    listened, _ = subscriptions.subscribe(watch)
+    idle, _ = subscriptions.subscribe(watch)
+    subscriptions.listen(listened, updates.append)
+
+    assert subscriptions.expire(0) == 1
+    assert idle not in subscriptions and listened in subscriptions
+
+    assert subscriptions.unsubscribe(listened)
+    assert updates[-1].windows is None and len(subscriptions) == 0
+    assert not subscriptions.unsubscribe(listened)
+    with pytest.raises(KeyError):
+        subscriptions.listen(listened, updates.append)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from cassia.cassia import Cassia
+from cassia.sweep import navigable_runs
+
+# Arrivals every seven hours, plus two off the minute grid.
+ARRIVAL_TIMES = pd.date_range("2024-03-01 00:00", periods=72, freq="7h").append(
+    pd.DatetimeIndex(["2024-03-03 05:07:30", "2024-03-04 05:07:30"])
+)
+
+
+@pytest.mark.parametrize("engine", ["grid", "analytic"])
+@pytest.mark.parametrize("unlocode", ["AUBNE", "AUDAM"])
+# Local dates east of UTC start before the UTC date of the arrival.
+@pytest.mark.parametrize("tz", [None, "Australia/Brisbane"])
+def test_sweep_matches_separate_calculations(engine, unlocode, tz):
+    cassia = Cassia(engine=engine)
+    arrival_times = ARRIVAL_TIMES.tz_localize(tz)
+    sweep = cassia.get_combined_windows_sweep(9582116, unlocode, arrival_times, 7)
+
+    assert len(sweep) == len(arrival_times)
+    for arrival_time, result in zip(arrival_times, sweep):
+        expected = cassia.get_combined_windows(9582116, unlocode, arrival_time, 7)
+        assert result.arrival_time == arrival_time
+        assert result.combined_windows == expected.combined_windows
+        assert result.tidal_windows == expected.tidal_windows
+        assert result.daylight_windows == expected.daylight_windows
+        if engine == "grid":
+            assert result.time_range.equals(expected.time_range)
+            assert np.array_equal(result.total_depths, expected.total_depths)
+
+
+def test_tidal_windows_sweep():
+    cassia = Cassia()
+    sweep = cassia.get_tidal_windows_sweep(
+        None, "AUBNE", ARRIVAL_TIMES[::10], 3, draught=12.5
+    )
+
+    for arrival_time, result in zip(ARRIVAL_TIMES[::10], sweep):
+        expected = cassia.get_tidal_windows(None, "AUBNE", arrival_time, 3, draught=12.5)
+        assert result.tidal_windows == expected.tidal_windows
+    assert cassia.get_tidal_windows_sweep(9582116, "AUBNE", []) == []
+
+
+def test_navigable_runs():
+    starts, ends = navigable_runs(np.array([1, 1, 0, 0, 1, 0, 1], dtype=bool))
+
+    assert starts.tolist() == [0, 4, 6]
+    assert ends.tolist() == [1, 4, 6]
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd  # type:ignore
+import pytest
+from cassia.tide_store import TideStore
+
+
+@pytest.fixture(scope="module")
+def tide_store(load_tide_heights):
+    return TideStore.from_dataframe(load_tide_heights)
+
+
+@pytest.mark.parametrize("port_name", ["Abbot Point", "Brisbane", "Cooktown", "Dampier"])
+def test_tide_store_matches_dataframe(tide_store, load_tide_heights, port_name):
+    """Each port's arrays hold the same sorted extremes as the filtered DataFrame."""
+    port_tide_data = load_tide_heights[load_tide_heights["PORT_NAME"] == port_name]
+    port_tide_data = port_tide_data.assign(
+        TIDE_DATETIME=pd.to_datetime(port_tide_data["TIDE_DATETIME"])
+    ).sort_values(by="TIDE_DATETIME")
+
+    epochs, heights = tide_store.get(port_name)
+
+    assert epochs.flags["C_CONTIGUOUS"] and heights.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(
+        epochs, [timestamp.timestamp() for timestamp in port_tide_data["TIDE_DATETIME"]]
+    )
+    np.testing.assert_array_equal(heights, port_tide_data["TIDE_HEIGHT_MT"])
+
+
+def test_tide_store_window_brackets_horizon(tide_store):
+    """The window slice keeps the extremes either side of the requested span."""
+    start = pd.Timestamp("2024-03-05 12:00:00").timestamp()
+    end = pd.Timestamp("2024-03-06 12:00:00").timestamp()
+
+    epochs, _ = tide_store.window("Brisbane", start, end)
+
+    assert epochs[0] <= start < epochs[1]
+    assert epochs[-2] < end <= epochs[-1]
+
+
+def test_tide_store_unknown_port(tide_store):
+    with pytest.raises(KeyError):
+        tide_store.get("Atlantis")
+
+
+def make_rows(port_name, datetimes, heights):
+    return pd.DataFrame(
+        {
+            "PORT_NAME": port_name,
+            "TIDE_DATETIME": pd.to_datetime(datetimes),
+            "TIDE_HEIGHT_MT": heights,
+        }
+    )
+
+
+def test_tide_store_append_supersedes_covered_span(tide_store):
+    """Appended rows replace the extremes they overlap and keep the rest."""
+    epochs, _ = tide_store.get("Brisbane")
+    rows = make_rows(
+        "Brisbane",
+        ["2024-03-04 00:00:00", "2024-03-04 06:00:00"],
+        [9.0, 8.0],
+    )
+    start = pd.Timestamp("2024-03-04 00:00:00").timestamp()
+    end = pd.Timestamp("2024-03-04 06:00:00").timestamp()
+
+    updated = tide_store.with_updates(rows, mode="append")
+    new_epochs, new_heights = updated.get("Brisbane")
+
+    outside = (epochs < start) | (epochs > end)
+    np.testing.assert_array_equal(new_epochs[new_heights >= 8.0], [start, end])
+    np.testing.assert_array_equal(new_epochs[new_heights < 8.0], epochs[outside])
+    assert np.all(np.diff(new_epochs) > 0)
+    assert updated.version != tide_store.version
+
+
+def test_tide_store_replace_rebuilds_only_updated_ports(tide_store, load_tide_heights):
+    rows = make_rows("Brisbane", ["2024-03-04 00:00:00"], [1.0])
+
+    updated = tide_store.with_updates(rows, mode="replace")
+
+    np.testing.assert_array_equal(updated.get("Brisbane")[1], [1.0])
+    assert updated.get("Dampier")[0] is tide_store.get("Dampier")[0]
+    assert len(tide_store.get("Brisbane")[0]) > 1  # The original is unchanged
+
+    rebuilt = TideStore.from_dataframe(
+        pd.concat(
+            [load_tide_heights[load_tide_heights["PORT_NAME"] != "Brisbane"], rows]
+        )
+    )
+    assert updated.version == rebuilt.version
+
+
+def test_tide_store_update_adds_new_port(tide_store):
+    updated = tide_store.with_updates(
+        make_rows("Atlantis", ["2024-03-04", "2024-03-05"], [1.0, 2.0])
+    )
+
+    assert "Atlantis" in updated and "Atlantis" not in tide_store
+    assert len(updated) == len(tide_store) + 1
+
+
+def test_tide_store_rejects_unknown_mode(tide_store):
+    with pytest.raises(ValueError):
+        tide_store.with_updates(make_rows("Brisbane", [], []), mode="merge")